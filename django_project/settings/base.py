@@ -6,6 +6,7 @@ See https://docs.djangoproject.com/en/stable/topics/settings/
 
 from pathlib import Path
 import os
+import socket
 
 # Define the Log file path in your Root Folder
 
@@ -30,6 +31,9 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
+    "parking.sites.SiteMiddleware",
+    "parking.middleware.AdmissionControlMiddleware",
+    "parking.middleware.ReplicaMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
@@ -37,6 +41,7 @@ MIDDLEWARE = [
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
     "parking.middleware.ExceptionHandlingMiddleware",
+    "parking.middleware.InstrumentationMiddleware",
 ]
 
 ROOT_URLCONF = "django_project.urls"
@@ -66,12 +71,34 @@ DATABASES = {
     }
 }
 
+# Multi-site: garage code -> database alias holding its floors, slots and
+# tickets. Sites sharing an alias form a site group. Requests pick their site
+# from the X-Parking-Site header or PARKING_SITE_HOSTS (host -> code).
+PARKING_DEFAULT_SITE = "main"
+PARKING_SITE_DATABASES = {"main": "default"}
+PARKING_SITE_HOSTS = {}
+DATABASE_ROUTERS = ["parking.routers.SiteRouter"]
+
+# Read replicas: primary alias -> replica aliases. Views marked
+# `replica_reads` (slot browsing, admin lists) read from a replica, except for
+# clients that wrote within READ_YOUR_WRITES_SECONDS.
+DATABASE_REPLICAS = {}
+READ_YOUR_WRITES_SECONDS = 5
+READ_YOUR_WRITES_COOKIE = "parking_rw"
+
 # Caching
+# "default" is per process; "shared" holds what every worker must agree on
+# (idempotency keys, used checkout tokens, slot page versions). Create its
+# table with `manage.py createcachetable`
 CACHES = {
     "default": {
         "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
         "LOCATION": "unique-snowflake",
-    }
+    },
+    "shared": {
+        "BACKEND": "django.core.cache.backends.db.DatabaseCache",
+        "LOCATION": "parking_shared_cache",
+    },
 }
 
 # Password validation
@@ -104,9 +131,129 @@ STATIC_ROOT = BASE_DIR / "staticfiles"
 MEDIA_URL = "/media/"
 MEDIA_ROOT = BASE_DIR / "media"
 
+# QR images: stored under hash-sharded media/qrcodes/ab/cd/ unless
+# QR_STORE_FILES is off, in which case they are regenerated on demand.
+# `manage.py qr_storage purge` deletes images of tickets closed this long ago.
+QR_STORE_FILES = True
+QR_RETENTION_DAYS = 30
+
 # Default primary key field type
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
+# Slot allocation strategy per vehicle type, see services/allocation_strategies.py
+# (lowest_number, least_loaded_floor, nearest_exit, random_within_section)
+SLOT_ALLOCATION_DEFAULT_STRATEGY = "lowest_number"
+SLOT_ALLOCATION_STRATEGIES = {}
+
+# Occupancy forecasts (services/forecasting.py): hourly arrival/departure
+# rates over the last HISTORY_WEEKS weeks, refitted with the newest hours at
+# most every REFIT_SECONDS; slot pages and the "forecast_steering" strategy
+# send arrivals elsewhere when a floor fills within STEER_MINUTES
+FORECAST_HISTORY_WEEKS = 4
+FORECAST_REFIT_SECONDS = 3600
+FORECAST_HORIZON_HOURS = 12
+FORECAST_STEER_MINUTES = 30
+
+# Admission control (parking.admission), off unless ENABLED: each gate may
+# submit GATE_BURST bookings at once, refilled at GATE_RATE per second; at
+# most MAX_CONCURRENT_BOOKINGS run at once per process, others wait up to
+# QUEUE_TIMEOUT_SECONDS; rejections ask clients to come back after
+# RETRY_AFTER_SECONDS; free-slot counts are cached FREE_SLOTS_CACHE_SECONDS
+ADMISSION_CONTROL_ENABLED = False
+ADMISSION_GATE_RATE = 2.0
+ADMISSION_GATE_BURST = 10
+ADMISSION_MAX_CONCURRENT_BOOKINGS = 4
+ADMISSION_QUEUE_TIMEOUT_SECONDS = 1.0
+ADMISSION_RETRY_AFTER_SECONDS = 5
+ADMISSION_FREE_SLOTS_CACHE_SECONDS = 5
+ADMISSION_BOOKING_VIEWS = ("vehicle_form",)
+ADMISSION_LOT_FULL_VIEWS = ("view_slots", "vehicle_form")
+# Gate kiosks at these client addresses are limited per X-Parking-Gate
+# header; everyone else per client address
+ADMISSION_TRUSTED_GATE_ADDRESSES = ()
+
+# Reservations: walk-ins cannot take a slot held within the lookahead window;
+# holds are released when the customer is this late
+RESERVATION_LOOKAHEAD_MINUTES = 120
+RESERVATION_GRACE_MINUTES = 15
+
+# Passes (services/passes.py): gates check plates against an in-memory copy
+# of the valid passes, reloaded in the background after REFRESH_SECONDS;
+# `manage.py bill_passes` invoices BILLING_BATCH_SIZE passes per batch
+PASS_CACHE_REFRESH_SECONDS = 60
+PASS_BILLING_BATCH_SIZE = 1000
+# Key of each plate-reading gate ({gate: key}); cameras send the gate name in
+# X-Parking-Gate and its key in X-Parking-Gate-Key. Pass entry and exit refuse
+# every read while this is empty
+PASS_GATE_KEYS = {}
+
+# Slot leases: a holder (an app worker, PARKING_NODE_ID:pid, or an edge gate,
+# PARKING_NODE_ID) owns whole floor sections for SLOT_LEASE_TTL_SECONDS at a
+# time; no other holder allocates from them
+PARKING_NODE_ID = socket.gethostname()
+SLOT_LEASE_TTL_SECONDS = 900
+
+# Preload PDF/QR libraries, fonts and templates when a web worker starts
+# (wsgi.py/asgi.py); management commands load them only when used
+WEB_WARM_UP = True
+
+# Render QR codes and token PDFs in this many worker processes (0 = inline in
+# the request thread); beyond MAX_PENDING queued renders, or after TIMEOUT,
+# rendering falls back to inline
+RENDER_POOL_WORKERS = 0
+RENDER_POOL_MAX_PENDING = 8
+RENDER_POOL_TIMEOUT_SECONDS = 5
+
+# Receipt format per gate (sent as the X-Parking-Gate header by kiosks):
+# "pdf" (A4), "escpos58"/"escpos80" (ESC/POS) or "png58"/"png80" (1-bit PNG)
+GATE_RECEIPT_FORMATS = {}
+RECEIPT_DEFAULT_FORMAT = "pdf"
+
+# Slot pages: ETag/Last-Modified roll over at least this often, so holds and
+# leases starting with the clock show up; the floor switch is cached this long
+# (0 = not cached)
+SLOT_PAGE_MAX_STALE_SECONDS = 60
+FLOOR_NAV_CACHE_SECONDS = 0
+
+# Booking submissions are deduplicated by form nonce / Idempotency-Key for
+# this long; duplicates wait up to IDEMPOTENCY_WAIT_SECONDS for the original
+IDEMPOTENCY_KEY_TTL_SECONDS = 10 * 60
+IDEMPOTENCY_WAIT_SECONDS = 10
+
+# Used checkout tokens are remembered this long, so repeated scans of them
+# are rejected without a database query
+CHECKOUT_USED_TOKEN_TTL = 24 * 60 * 60
+
+# Slots taken with no open ticket for this long are freed by
+# `manage.py reconcile_slots`
+SLOT_LEAK_GRACE_SECONDS = 300
+
+# Tickets still open this long after check-in are billed and closed by
+# `manage.py closeout_tickets` (run nightly), in batches of CLOSEOUT_BATCH_SIZE;
+# its CSV reports go to CLOSEOUT_REPORT_DIR
+CLOSEOUT_AFTER_HOURS = 24
+CLOSEOUT_BATCH_SIZE = 1000
+CLOSEOUT_REPORT_DIR = BASE_DIR / "reports"
+
+# Edge mode: this gate books and checks out against its leased slots in a
+# local journal, synced to the central database by `manage.py edge_gate sync`
+EDGE_MODE = False
+EDGE_JOURNAL_PATH = BASE_DIR / "edge_journal.sqlite3"
+
+# Instrumentation (per-view timings served at /metrics/, sampled cProfile dumps)
+INSTRUMENTATION_ENABLED = False
+INSTRUMENTATION_PROFILE_SAMPLE_RATE = 0.0
+INSTRUMENTATION_PROFILE_HEADER = "X-Parking-Profile"
+INSTRUMENTATION_PROFILE_ALLOW_HEADER = False
+INSTRUMENTATION_PROFILE_DIR = BASE_DIR / "profiles"
+# /metrics/ is served to staff users, clients at these addresses and scrapers
+# sending "Authorization: Bearer <METRICS_TOKEN>"; it recounts the leaked
+# slots of each site database at most every METRICS_LEAKED_SLOTS_MAX_AGE
+# seconds
+METRICS_ALLOWED_ADDRESSES = ()
+METRICS_TOKEN = ""
+METRICS_LEAKED_SLOTS_MAX_AGE = 60
+
 # Custom error handlers
 handler404 = "parking.views.custom_404"
 handler500 = "parking.views.custom_500"
@@ -127,13 +274,20 @@ LOGGING = {
             "format": "{levelname} {asctime} {message}",
             "style": "{",
         },
+        "json": {
+            "()": "parking.log_handlers.JsonFormatter",
+        },
     },
     "handlers": {
+        # Records are queued and written by a background thread, so requests
+        # never wait on disk I/O. Every worker process appends to the same
+        # file, so it is rotated by logrotate, not here; the writer reopens
+        # it once it has been moved.
         "file": {
             "level": "INFO",
-            "class": "logging.FileHandler",
+            "class": "parking.log_handlers.QueuedFileHandler",
             "filename": LOG_FILE_PATH,
-            "formatter": "simple",
+            "formatter": "json",
         },
         "console": {
             "level": "DEBUG",
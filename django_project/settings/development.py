@@ -9,3 +9,6 @@ ALLOWED_HOSTS = ["localhost", "127.0.0.1", ".ngrok-free.app"]
 
 # Development-specific email backend
 EMAIL_BACKEND = "django.core.mail.backends.console.EmailBackend"
+
+# Profile any request sent with the X-Parking-Profile header
+INSTRUMENTATION_PROFILE_ALLOW_HEADER = True
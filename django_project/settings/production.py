@@ -23,6 +23,47 @@ DATABASES = {
     }
 }
 
+# Keep compiled templates in memory and cache the floor switch of slot pages
+TEMPLATES[0]["APP_DIRS"] = False
+TEMPLATES[0]["OPTIONS"]["loaders"] = [
+    (
+        "django.template.loaders.cached.Loader",
+        [
+            "django.template.loaders.filesystem.Loader",
+            "django.template.loaders.app_directories.Loader",
+        ],
+    )
+]
+FLOOR_NAV_CACHE_SECONDS = 300
+
+# Share idempotency keys, used tokens and slot page versions through Redis
+# when one is configured, instead of the database cache
+if config("REDIS_URL", default=""):
+    CACHES["shared"] = {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": config("REDIS_URL"),
+    }
+
+# Keep CPU-bound PDF/QR rendering off the request threads
+RENDER_POOL_WORKERS = 2
+
+# Plate-reading gates, as "gate1=key1,gate2=key2"
+PASS_GATE_KEYS = config(
+    "PASS_GATE_KEYS",
+    default="",
+    cast=lambda v: dict(
+        pair.strip().split("=", 1) for pair in v.split(",") if pair.strip()
+    ),
+)
+
+# Prometheus scrapers of /metrics/
+METRICS_TOKEN = config("METRICS_TOKEN", default="")
+METRICS_ALLOWED_ADDRESSES = config(
+    "METRICS_ALLOWED_ADDRESSES",
+    default="",
+    cast=lambda v: tuple(s.strip() for s in v.split(",") if s.strip()),
+)
+
 # Production email backend
 EMAIL_BACKEND = config("EMAIL_BACKEND")
 EMAIL_HOST = config("EMAIL_HOST")
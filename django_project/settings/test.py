@@ -0,0 +1,9 @@
+# In django_project/settings/test.py
+
+from .development import *
+
+# Keep test runs out of the real log file
+LOGGING = {
+    **LOGGING,
+    "handlers": {**LOGGING["handlers"], "file": {"class": "logging.NullHandler"}},
+}
@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'django_project.settings.development')
 
 application = get_wsgi_application()
+
+# Web workers only: preload PDF/QR libraries, fonts and templates
+from services.warmup import warm_up  # noqa: E402
+
+warm_up()
@@ -1,10 +1,40 @@
 from django.contrib import admin
-from .models import ParkingConfig, Floor, Slot, Ticket
+from django.db.models import Q
+from .models import (
+    ParkingConfig,
+    Floor,
+    Slot,
+    Ticket,
+    Reservation,
+    Site,
+    SlotLease,
+    SlotEvent,
+    Pass,
+    PassInvoice,
+)
+from .paginators import EstimatedCountPaginator
+from .plates import normalize_plate
+from .routers import use_replicas
+from services.slot_maintenance import SlotMaintenance
+
+
+class ReplicaReadsAdmin(admin.ModelAdmin):
+    """Serve change list pages from a replica (see DATABASE_REPLICAS)."""
+
+    def changelist_view(self, request, extra_context=None):
+        if request.method != "GET":
+            return super().changelist_view(request, extra_context)
+        with use_replicas():
+            return super().changelist_view(request, extra_context)
 
 
 @admin.register(Ticket)
-class TicketModelAdmin(admin.ModelAdmin):
-    search_fields = ("id", "vehicle_number", "phone", "email")
+class TicketModelAdmin(ReplicaReadsAdmin):
+    # Only shown to enable the search box; see get_search_results
+    search_fields = ("=id", "=edge_ref", "=phone", "=email", "plate_normalized")
+    search_help_text = (
+        "Token number, phone, email, edge reference, or the start of a plate."
+    )
     list_display = (
         "id",
         "vehicle_number",
@@ -14,9 +44,115 @@ class TicketModelAdmin(admin.ModelAdmin):
         "check_out",
         "final_amount",
     )
-    list_filter = ("vehicle_type", "check_in", "check_out", "slot__floor")
+    list_filter = ("site", "vehicle_type", "check_out")
+    list_select_related = ("slot__floor",)
+    date_hierarchy = "check_in"
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def get_search_results(self, request, queryset, search_term):
+        """Match each term against indexed columns only: exact id, phone,
+        email and edge reference, and a range scan over normalized plates
+        (rather than `icontains` over every search field)."""
+        term = search_term.strip()
+        if not term:
+            return queryset, False
+        match = Q(edge_ref=term) | Q(email=term) | Q(phone=term)
+        if term.isdigit():
+            match |= Q(id=int(term))
+        plate = normalize_plate(term)
+        if plate:
+            # Plates starting with `plate`, as an index range rather than LIKE
+            match |= Q(
+                plate_normalized__gte=plate,
+                plate_normalized__lt=plate[:-1] + chr(ord(plate[-1]) + 1),
+            )
+        return queryset.filter(match), False
+
+
+@admin.register(Reservation)
+class ReservationModelAdmin(ReplicaReadsAdmin):
+    search_fields = ("vehicle_number", "phone")
+    list_display = ("id", "vehicle_number", "slot", "start", "end", "status")
+    list_filter = ("status", "vehicle_type")
+    list_select_related = ("slot__floor",)
+    raw_id_fields = ("slot", "ticket")
+
+
+@admin.register(Pass)
+class PassModelAdmin(ReplicaReadsAdmin):
+    search_fields = ("vehicle_number", "holder", "phone")
+    list_display = (
+        "id",
+        "vehicle_number",
+        "holder",
+        "vehicle_type",
+        "slot",
+        "valid_from",
+        "valid_until",
+        "is_active",
+    )
+    list_filter = ("site", "vehicle_type", "is_active")
+    list_select_related = ("slot__floor",)
+    raw_id_fields = ("slot",)
+
+
+@admin.register(PassInvoice)
+class PassInvoiceModelAdmin(ReplicaReadsAdmin):
+    list_display = ("parking_pass", "month", "days", "visits", "amount")
+    list_filter = ("month",)
+    list_select_related = ("parking_pass",)
+    raw_id_fields = ("parking_pass",)
+
+
+@admin.register(SlotLease)
+class SlotLeaseModelAdmin(ReplicaReadsAdmin):
+    list_display = ("holder", "floor", "section", "vehicle_type", "expires_at")
+    list_filter = ("holder", "vehicle_type")
+    list_select_related = ("floor",)
+
+
+@admin.register(SlotEvent)
+class SlotEventModelAdmin(ReplicaReadsAdmin):
+    list_display = ("at", "kind", "slot_id")
+    list_filter = ("kind",)
+    search_fields = ("=slot_id",)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(Slot)
+class SlotModelAdmin(ReplicaReadsAdmin):
+    list_display = (
+        "__str__",
+        "vehicle_type",
+        "is_available",
+        "is_blocked",
+        "block_pending",
+    )
+    list_filter = ("floor", "section", "vehicle_type", "is_blocked", "block_pending")
+    list_select_related = ("floor",)
+    actions = ("block_slots", "unblock_slots")
+
+    @admin.action(description="Block selected slots for maintenance")
+    def block_slots(self, request, queryset):
+        blocked, deferred = SlotMaintenance.block(queryset)
+        self.message_user(
+            request,
+            f"Blocked {blocked} slot(s); {deferred} occupied slot(s) will be "
+            "blocked when their vehicles check out.",
+        )
+
+    @admin.action(description="Unblock selected slots")
+    def unblock_slots(self, request, queryset):
+        unblocked = SlotMaintenance.unblock(queryset)
+        self.message_user(request, f"Unblocked {unblocked} slot(s).")
 
 
+admin.site.register(Site)
 admin.site.register(ParkingConfig)
-admin.site.register(Floor)
-admin.site.register(Slot)
+admin.site.register(Floor, ReplicaReadsAdmin)
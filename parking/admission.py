@@ -0,0 +1,84 @@
+"""Admission control for booking surges.
+
+During an event rush every gate submits bookings at once; left alone they
+queue on slot row locks and the mail server, and every customer waits.
+`AdmissionControlMiddleware` (see `parking.middleware`) fails fast instead:
+
+- each gate (the client address, or the `X-Parking-Gate` header of kiosks
+  at `ADMISSION_TRUSTED_GATE_ADDRESSES`) draws from a token bucket of
+  `ADMISSION_GATE_BURST` bookings, refilled at `ADMISSION_GATE_RATE` per
+  second;
+- at most `ADMISSION_MAX_CONCURRENT_BOOKINGS` bookings run at once per
+  worker process; others wait up to `ADMISSION_QUEUE_TIMEOUT_SECONDS` for a
+  turn;
+- when the cached free-slot count (`services.free_slots`) is zero, slot
+  pages and booking forms answer "full" without querying slots. Edge gates
+  skip this check, and so does any request when the count cannot be read.
+
+Rejections carry a `Retry-After` header. Buckets and the concurrency limit
+live in each worker process.
+"""
+
+import math
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+
+# Least recently seen gates are forgotten beyond this many
+MAX_TRACKED_GATES = 10_000
+
+
+class TokenBucket:
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def take(self, now=None):
+        """Take a token; returns 0 on success, else the seconds until one is
+        available."""
+        now = time.monotonic() if now is None else now
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0
+        return (1 - self.tokens) / self.rate
+
+
+class GateLimiter:
+    """One `TokenBucket` per gate."""
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, gate):
+        """0 if `gate` may book now, else the seconds it should wait."""
+        with self._lock:
+            bucket = self._buckets.pop(gate, None) or TokenBucket(self.rate, self.burst)
+            self._buckets[gate] = bucket
+            if len(self._buckets) > MAX_TRACKED_GATES:
+                self._buckets.popitem(last=False)
+            return bucket.take()
+
+
+def gate_id(request):
+    """Client address; kiosks at a trusted address (several may share one
+    behind NAT) are told apart by their `X-Parking-Gate` header, which
+    anyone else could set to dodge their limit."""
+    address = request.META.get("REMOTE_ADDR", "")
+    gate = request.headers.get("X-Parking-Gate")
+    if gate and address in settings.ADMISSION_TRUSTED_GATE_ADDRESSES:
+        return f"{address}/{gate}"
+    return address
+
+
+def retry_after(seconds):
+    """`Retry-After` value: whole seconds, at least 1."""
+    return str(max(1, math.ceil(seconds)))
@@ -3,3 +3,22 @@ from django.apps import AppConfig
 
 class ParkingConfig(AppConfig):
     name = "parking"
+
+    def ready(self):
+        from django.db.models.signals import post_delete, post_save
+
+        from services.free_slots import invalidate_on_slot_freed
+        from services.occupancy_versions import bump_on_slot_change
+        from services.passes import apply_deleted_pass, apply_saved_pass
+
+        from .models import Pass
+        from .signals import slot_state_changed
+
+        slot_state_changed.connect(
+            bump_on_slot_change, dispatch_uid="occupancy_versions"
+        )
+        slot_state_changed.connect(
+            invalidate_on_slot_freed, dispatch_uid="free_slot_counts"
+        )
+        post_save.connect(apply_saved_pass, sender=Pass, dispatch_uid="pass_cache")
+        post_delete.connect(apply_deleted_pass, sender=Pass, dispatch_uid="pass_cache")
@@ -1,6 +1,14 @@
 from django import forms
 import re
 import logging
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import ParkingConfig
+from .plates import clean_plate, is_valid_plate
 
 # Get the logger instance
 logger = logging.getLogger(__name__)
@@ -32,14 +40,21 @@ class VehicleDetailsForm(forms.Form):
         initial=0,
         widget=forms.NumberInput(attrs={"class": "form-control"}),
     )
+    # Idempotency key: resubmitting the same form returns the same token
+    nonce = forms.CharField(
+        required=False,
+        max_length=64,
+        widget=forms.HiddenInput,
+        initial=lambda: uuid.uuid4().hex,
+    )
 
     def clean_vehicle_number(self):
-        val = self.cleaned_data.get("vehicle_number").strip().upper()
-        # Regular expression for a standard vehicle plate
-        if not re.match(r"^[A-Z0-9- ]{3,15}$", val):
+        val = clean_plate(self.cleaned_data.get("vehicle_number"))
+        # Standard vehicle plate, with at least 3 letters/digits
+        if not is_valid_plate(val):
             # LOG: Audit trail for invalid input
             logger.warning(
-                f"Form Validation Error: Invalid Vehicle Number entered: '{val}'"
+                "Form Validation Error: Invalid Vehicle Number entered: '%s'", val
             )
 
             # MESSAGE: Shown to the user in the template
@@ -54,7 +69,7 @@ class VehicleDetailsForm(forms.Form):
         if not re.match(r"^\+?1?\d{9,15}$", val):
             # LOG: Capture suspicious or malformed phone numbers
             logger.warning(
-                f"Form Validation Error: Invalid Phone Number entered: '{val}'"
+                "Form Validation Error: Invalid Phone Number entered: '%s'", val
             )
 
             # MESSAGE: Shown to the user in the template
@@ -67,3 +82,62 @@ class VehicleDetailsForm(forms.Form):
         email = self.cleaned_data.get("email").strip().lower()
         # EmailField already does basic validation, but you can add custom logic here
         return email
+
+
+class ReservationForm(VehicleDetailsForm):
+    vehicle_type = forms.ChoiceField(
+        label="Vehicle Type",
+        choices=ParkingConfig.VEHICLE_CHOICES,
+        widget=forms.Select(attrs={"class": "form-select"}),
+    )
+    floor = forms.IntegerField(
+        label="Floor",
+        min_value=1,
+        widget=forms.NumberInput(attrs={"class": "form-control"}),
+    )
+    section = forms.CharField(
+        label="Section",
+        max_length=1,
+        widget=forms.TextInput(attrs={"class": "form-control", "placeholder": "A"}),
+    )
+    start = forms.DateTimeField(
+        label="Arrival",
+        input_formats=["%Y-%m-%dT%H:%M"],
+        widget=forms.DateTimeInput(
+            attrs={"class": "form-control", "type": "datetime-local"}
+        ),
+    )
+    end = forms.DateTimeField(
+        label="Departure",
+        input_formats=["%Y-%m-%dT%H:%M"],
+        widget=forms.DateTimeInput(
+            attrs={"class": "form-control", "type": "datetime-local"}
+        ),
+    )
+    email = forms.EmailField(
+        label="Email Address",
+        required=False,
+        widget=forms.EmailInput(attrs={"class": "form-control"}),
+    )
+    # Billed at checkout like any stay
+    initial_payment = None
+    nonce = None
+
+    field_order = ["vehicle_type", "floor", "section", "start", "end"]
+
+    def clean_section(self):
+        return self.cleaned_data["section"].strip().upper()
+
+    def clean_email(self):
+        return (self.cleaned_data.get("email") or "").strip().lower() or None
+
+    def clean(self):
+        cleaned_data = super().clean()
+        start, end = cleaned_data.get("start"), cleaned_data.get("end")
+        if start and end:
+            grace = timedelta(minutes=settings.RESERVATION_GRACE_MINUTES)
+            if start < timezone.now() - grace:
+                raise forms.ValidationError("Arrival must not be in the past.")
+            if end <= start:
+                raise forms.ValidationError("Departure must be after arrival.")
+        return cleaned_data
@@ -0,0 +1,113 @@
+"""Idempotent booking submissions.
+
+A double-tap on submit or a browser retry sends the booking form twice.
+Requests carrying an `Idempotency-Key` header, or the form's hidden `nonce`,
+are carried out once per key: the first claims the key in the cache, and
+duplicates get its stored response back (waiting for it if it is still
+running) without allocating a slot or rendering again. Keys expire after
+`IDEMPOTENCY_KEY_TTL_SECONDS`.
+
+Keys live in the "shared" cache, so a retry landing on another worker
+process still finds them.
+"""
+
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse
+
+MAX_KEY_LENGTH = 64
+POLL_SECONDS = 0.05
+IGNORED_FIELDS = {"csrfmiddlewaretoken", "nonce"}
+
+
+class IdempotencyConflict(Exception):
+    pass
+
+
+def _fingerprint(request):
+    """Hash of the submitted data, so a key reused for other data is refused."""
+    fields = sorted(
+        (name, values)
+        for name, values in request.POST.lists()
+        if name not in IGNORED_FIELDS
+    )
+    return hashlib.sha256(repr((request.path, fields)).encode()).hexdigest()
+
+
+class IdempotentRequest:
+    def __init__(self, request):
+        key = request.headers.get("Idempotency-Key") or request.POST.get("nonce", "")
+        self.cache_key = None
+        if key and len(key) <= MAX_KEY_LENGTH:
+            self.cache_key = f"idempotency_{request.site}_{key}"
+        self.fingerprint = _fingerprint(request)
+        self.claimed = False
+
+    def replay(self):
+        """Response of an earlier request with this key, or None for a new key.
+
+        Waits up to `IDEMPOTENCY_WAIT_SECONDS` for a request still running.
+        Raises IdempotencyConflict if the key was used for different data or
+        the earlier request does not finish in time.
+        """
+        if self.cache_key is None:
+            return None
+        deadline = time.monotonic() + settings.IDEMPOTENCY_WAIT_SECONDS
+        while True:
+            entry = caches["shared"].get(self.cache_key)
+            if entry is None:
+                return None
+            fingerprint, stored = entry
+            if fingerprint != self.fingerprint:
+                raise IdempotencyConflict(
+                    "This request key was already used for a different booking."
+                )
+            if stored is not None:
+                status, content_type, content = stored
+                return HttpResponse(content, content_type=content_type, status=status)
+            if time.monotonic() > deadline:
+                raise IdempotencyConflict("Your booking is still being processed.")
+            time.sleep(POLL_SECONDS)
+
+    def claim(self):
+        """Reserve the key for this request; False if another request holds it."""
+        if self.cache_key is None:
+            return True
+        shared = caches["shared"]
+        deadline = time.monotonic() + settings.IDEMPOTENCY_WAIT_SECONDS
+        while True:
+            self.claimed = shared.add(
+                self.cache_key,
+                (self.fingerprint, None),
+                settings.IDEMPOTENCY_KEY_TTL_SECONDS,
+            )
+            # The database cache reports a failed write (e.g. a locked
+            # database) like a lost race; only a stored key is one
+            if self.claimed or shared.has_key(self.cache_key):
+                return self.claimed
+            if time.monotonic() > deadline:
+                return False
+            time.sleep(POLL_SECONDS)
+
+    def complete(self, response):
+        """Store a successful response for duplicates; release the key otherwise."""
+        if not self.claimed:
+            return response
+        if response.status_code == 200 and not response.streaming:
+            stored = (response.status_code, response["Content-Type"], response.content)
+            caches["shared"].set(
+                self.cache_key,
+                (self.fingerprint, stored),
+                settings.IDEMPOTENCY_KEY_TTL_SECONDS,
+            )
+        else:
+            self.release()
+        return response
+
+    def release(self):
+        if self.claimed:
+            caches["shared"].delete(self.cache_key)
+            self.claimed = False
@@ -0,0 +1,119 @@
+"""Logging handlers keeping disk I/O off the request path."""
+
+import atexit
+import json
+import logging
+import queue
+import threading
+import traceback
+from datetime import datetime, timezone
+from logging.handlers import WatchedFileHandler
+
+from parking.metrics import REGISTRY
+
+DROPPED_RECORDS = REGISTRY.counter(
+    "parking_log_records_dropped_total",
+    "Log records dropped because the log queue was full.",
+)
+
+
+class JsonFormatter(logging.Formatter):
+    """Format records as one JSON object per line."""
+
+    def format(self, record):
+        payload = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "module": record.module,
+            "process": record.process,
+            "thread": record.thread,
+            "message": record.getMessage(),
+        }
+        if record.exc_info:
+            payload["exc_info"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            payload["exc_info"] = record.exc_text
+        return json.dumps(payload, ensure_ascii=False, default=str)
+
+
+class QueuedFileHandler(logging.Handler):
+    """Enqueue log lines for a background thread writing a log file.
+
+    The request thread formats the record and puts the line on a bounded
+    queue. Every `flush_interval` seconds a writer thread takes all queued
+    lines and appends them with a single write, so the request threads are
+    rarely interrupted. When the queue is full, lines are dropped and
+    counted (in `dropped` and `parking_log_records_dropped_total`) rather
+    than blocking the caller.
+
+    The file is never rotated here: every worker process has its own
+    handler on the same file, so rotation is left to logrotate, and the
+    `WatchedFileHandler` underneath reopens the file once it has been moved.
+    """
+
+    def __init__(
+        self, filename, encoding="utf-8", queue_size=10000, flush_interval=0.05
+    ):
+        super().__init__()
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.dropped = 0
+        self.flush_interval = flush_interval
+        self.target = WatchedFileHandler(filename, encoding=encoding)
+        self._stopping = threading.Event()
+        self._writer = threading.Thread(
+            target=self._run_writer, name="log-writer", daemon=True
+        )
+        self._writer.start()
+        atexit.register(self._stop_writer)
+
+    def emit(self, record):
+        try:
+            # Format now, while lazily-formatted args are still valid.
+            line = self.format(record) + "\n"
+        except Exception:
+            self.handleError(record)
+            return
+        try:
+            self.queue.put_nowait(line)
+        except queue.Full:
+            self.dropped += 1
+            DROPPED_RECORDS.inc()
+
+    def _run_writer(self):
+        while not self._stopping.wait(self.flush_interval):
+            self._write_queued()
+
+    def _write_queued(self):
+        lines = []
+        while True:
+            try:
+                lines.append(self.queue.get_nowait())
+            except queue.Empty:
+                break
+        if lines:
+            self._write("".join(lines))
+
+    def _write(self, text):
+        with self.target.lock:
+            if self.target.stream is None:
+                return  # closed
+            try:
+                self.target.reopenIfNeeded()
+                self.target.stream.write(text)
+                self.target.flush()
+            except Exception:
+                # Keep the writer alive; a full or missing disk may recover
+                if logging.raiseExceptions:
+                    traceback.print_exc()
+
+    def _stop_writer(self):
+        # Writes out the queued lines; safe to call more than once.
+        self._stopping.set()
+        self._writer.join()
+        self._write_queued()
+
+    def close(self):
+        self._stop_writer()
+        self.target.close()
+        super().close()
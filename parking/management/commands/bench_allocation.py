@@ -0,0 +1,102 @@
+import random
+import statistics
+import threading
+import time
+from collections import Counter
+
+from django.core.management.base import BaseCommand
+from django.db import DatabaseError, connections
+
+from parking.models import Floor, Slot
+from services.allocation_strategies import STRATEGIES
+from services.scratch_db import CAR_SECTIONS, scratch_database, seed_layout
+from services.slot_allocator import SlotAllocator
+
+from ._utils import percentile
+
+
+class Command(BaseCommand):
+    help = (
+        "Simulate concurrent gates booking cars and report allocation latency "
+        "and contention for each slot allocation strategy (scratch database)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--gates", type=int, default=8, help="Concurrent threads")
+        parser.add_argument(
+            "--bookings", type=int, default=50, help="Bookings per gate per strategy"
+        )
+        parser.add_argument("--floors", type=int, default=5)
+        parser.add_argument("--seed", type=int, default=42)
+        parser.add_argument(
+            "--strategy",
+            action="append",
+            choices=sorted(STRATEGIES),
+            help="Strategy to benchmark (repeatable); defaults to all",
+        )
+
+    def handle(self, *args, **options):
+        with scratch_database():
+            seed_layout(floors=options["floors"])
+            requested_floor = Floor.objects.get(number=1)
+            for name in options["strategy"] or sorted(STRATEGIES):
+                Slot.objects.update(is_available=True)
+                random.seed(options["seed"])
+                result = self._run(name, requested_floor, options)
+                self._report(name, result)
+
+    def _run(self, strategy, floor, options):
+        latencies, claimed, errors = [], [], []
+        lock = threading.Lock()
+
+        def gate():
+            local_latencies, local_claimed, local_errors = [], [], 0
+            try:
+                for _ in range(options["bookings"]):
+                    section = random.choice(CAR_SECTIONS)
+                    start = time.perf_counter()
+                    try:
+                        slot = SlotAllocator.allocate(
+                            "CAR", floor, section, strategy=strategy
+                        )
+                    except DatabaseError:
+                        local_errors += 1
+                        continue
+                    local_latencies.append(time.perf_counter() - start)
+                    if slot:
+                        local_claimed.append(slot)
+            finally:
+                connections.close_all()
+            with lock:
+                latencies.extend(local_latencies)
+                claimed.extend(local_claimed)
+                errors.append(local_errors)
+
+        threads = [threading.Thread(target=gate) for _ in range(options["gates"])]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return {
+            "elapsed": time.perf_counter() - start,
+            "latencies": sorted(latencies),
+            "claimed": claimed,
+            "errors": sum(errors),
+        }
+
+    def _report(self, name, result):
+        ms = [value * 1000 for value in result["latencies"]]
+        by_slot = Counter(slot.id for slot in result["claimed"])
+        # The same slot handed to two gates means the strategy's first choice
+        # raced another gate (possible wherever row locks are not enforced).
+        duplicates = sum(count - 1 for count in by_slot.values() if count > 1)
+        per_floor = Counter(slot.floor_id for slot in result["claimed"])
+        spread = statistics.pstdev(per_floor.values()) if per_floor else 0.0
+        self.stdout.write(
+            f"{name:>22}: {len(result['claimed']) / result['elapsed']:8.1f} alloc/s "
+            f"| p50 {percentile(ms, 0.50):7.2f} ms | p95 {percentile(ms, 0.95):7.2f} ms "
+            f"| p99 {percentile(ms, 0.99):7.2f} ms | double-booked {duplicates:4d} "
+            f"| db errors {result['errors']:3d} | floors used {len(per_floor):2d} "
+            f"(stdev {spread:.1f})"
+        )
@@ -0,0 +1,81 @@
+import random
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from parking.models import Slot, Ticket
+from services import forecasting
+from services.forecasting import OccupancyForecast
+from services.scratch_db import scratch_database, seed_layout
+
+from ._utils import percentile
+
+
+class Command(BaseCommand):
+    help = "Time occupancy model fits and forecasts over a ticket history (scratch database)"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--tickets", type=int, default=200_000, help="Tickets in history"
+        )
+        parser.add_argument("--floors", type=int, default=10)
+        parser.add_argument("--lookups", type=int, default=500)
+        parser.add_argument("--seed", type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+        with scratch_database():
+            seed_layout(floors=options["floors"])
+            now = timezone.now()
+            slots = list(Slot.objects.values_list("id", "vehicle_type"))
+            weeks = settings.FORECAST_HISTORY_WEEKS
+
+            self.stdout.write(f"Creating {options['tickets']} tickets...")
+
+            def ticket():
+                slot_id, vehicle_type = rng.choice(slots)
+                # Busier in daytime hours
+                check_in = now - timedelta(
+                    days=rng.uniform(0, weeks * 7),
+                    hours=rng.triangular(0, 24, 12),
+                )
+                return Ticket(
+                    vehicle_number="BENCH",
+                    phone="0000000000",
+                    vehicle_type=vehicle_type,
+                    slot_id=slot_id,
+                    check_in=check_in,
+                    check_out=check_in + timedelta(hours=rng.uniform(0.5, 8)),
+                )
+
+            Ticket.objects.bulk_create(
+                (ticket() for _ in range(options["tickets"])), batch_size=5000
+            )
+
+            forecasting._models.clear()
+            start = time.perf_counter()
+            model = forecasting.get_model("default", now=now)
+            full_fit = time.perf_counter() - start
+
+            model.fitted_at = None
+            start = time.perf_counter()
+            forecasting.get_model("default", now=now + timedelta(hours=1))
+            refit = time.perf_counter() - start
+
+            latencies = []
+            for _ in range(options["lookups"]):
+                start = time.perf_counter()
+                OccupancyForecast.floors(rng.choice(("CAR", "BIKE")), now=now)
+                latencies.append((time.perf_counter() - start) * 1000)
+
+        latencies.sort()
+        self.stdout.write(
+            f"{options['tickets']} tickets over {weeks} weeks"
+            f" | full fit {full_fit * 1000:.0f} ms"
+            f" | hourly refit {refit * 1000:.1f} ms"
+            f" | forecast p50 {percentile(latencies, 0.50):.2f} ms"
+            f" p99 {percentile(latencies, 0.99):.2f} ms"
+        )
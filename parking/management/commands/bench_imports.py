@@ -0,0 +1,126 @@
+import json
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+# What each kind of process imports before doing any work. Management
+# commands run system checks, which load the URLconf and so the views.
+SCENARIOS = {
+    "command": "import django; django.setup(); import django_project.urls",
+    "web": "import django_project.wsgi; import django_project.urls",
+}
+HEAVY_PACKAGES = ("reportlab", "qrcode", "PIL", "numpy")
+
+
+def _parse_importtime(stderr):
+    """`{module: (self_us, cumulative_us, depth)}` from `-X importtime` output."""
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:") :].split("|")
+        # Nested imports are indented by two spaces per level
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        modules[name.strip()] = (int(self_us), int(cumulative_us), depth)
+    return modules
+
+
+def _git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=settings.BASE_DIR,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = "Measure process import time with `python -X importtime`, per scenario"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--runs", type=int, default=5)
+        parser.add_argument(
+            "--top", type=int, default=10, help="Slowest top-level imports shown"
+        )
+        parser.add_argument(
+            "--record",
+            type=Path,
+            help="Append results to this JSON lines file and compare with the "
+            "previous entry (e.g. benchmarks/import_times.jsonl)",
+        )
+
+    def handle(self, *args, **options):
+        results = {}
+        for scenario, code in SCENARIOS.items():
+            totals, walls, modules = [], [], {}
+            for _ in range(options["runs"]):
+                start = time.perf_counter()
+                proc = subprocess.run(
+                    [sys.executable, "-X", "importtime", "-c", code],
+                    cwd=settings.BASE_DIR,
+                    capture_output=True,
+                    text=True,
+                )
+                walls.append((time.perf_counter() - start) * 1000)
+                if proc.returncode:
+                    self.stderr.write(proc.stderr.splitlines()[-1])
+                    return
+                modules = _parse_importtime(proc.stderr)
+                totals.append(sum(s for s, _, _ in modules.values()) / 1000)
+
+            heavy = [p for p in HEAVY_PACKAGES if p in modules]
+            results[scenario] = {
+                "import_ms": round(statistics.median(totals), 1),
+                "process_ms": round(statistics.median(walls), 1),
+                "heavy": heavy,
+            }
+            self.stdout.write(
+                f"{scenario}: imports {results[scenario]['import_ms']:.1f} ms"
+                f" | process {results[scenario]['process_ms']:.1f} ms"
+                f" | heavy packages loaded: {', '.join(heavy) or 'none'}"
+            )
+            top_level = [
+                (cumulative, name)
+                for name, (_, cumulative, depth) in modules.items()
+                if depth == 0
+            ]
+            for cumulative, name in sorted(top_level, reverse=True)[: options["top"]]:
+                self.stdout.write(f"    {cumulative / 1000:8.1f} ms  {name}")
+
+        if options["record"]:
+            self._record(options["record"], results)
+
+    def _record(self, path, results):
+        previous = None
+        if path.exists():
+            lines = path.read_text().splitlines()
+            previous = json.loads(lines[-1]) if lines else None
+        entry = {
+            "at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "revision": _git_revision(),
+            "python": sys.version.split()[0],
+            "scenarios": results,
+        }
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with path.open("a") as f:
+            f.write(json.dumps(entry) + "\n")
+
+        if previous:
+            for scenario, result in results.items():
+                before = previous["scenarios"].get(scenario)
+                if before:
+                    delta = result["import_ms"] - before["import_ms"]
+                    self.stdout.write(
+                        f"{scenario}: {delta:+.1f} ms since {previous['revision']}"
+                        f" ({previous['at']})"
+                    )
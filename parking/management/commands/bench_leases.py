@@ -0,0 +1,130 @@
+import random
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import Manager, get_context
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import DatabaseError, connections
+
+from parking.models import Floor, Slot, SlotLease
+from services.scratch_db import CAR_SECTIONS, scratch_database, seed_layout
+from services.slot_allocator import SlotAllocator
+
+from ._utils import percentile
+
+
+def _node(db_name, node_id, strategy, bookings, seed, barrier):
+    """One app node: allocate `bookings` cars against the shared scratch DB."""
+    settings.PARKING_NODE_ID = node_id
+    connection = connections["default"]
+    connection.settings_dict["NAME"] = db_name
+    connection.close()
+    floor = Floor.objects.get(number=1)
+    rng = random.Random(seed)
+
+    latencies, claimed, errors = [], [], 0
+    barrier.wait()
+    start = time.perf_counter()
+    for _ in range(bookings):
+        begin = time.perf_counter()
+        try:
+            slot = SlotAllocator.allocate(
+                "CAR", floor, rng.choice(CAR_SECTIONS), strategy=strategy
+            )
+        except DatabaseError:
+            errors += 1
+            continue
+        latencies.append(time.perf_counter() - begin)
+        if slot:
+            claimed.append(slot.id)
+    elapsed = time.perf_counter() - start
+    connections.close_all()
+    return elapsed, latencies, claimed, errors
+
+
+class Command(BaseCommand):
+    help = (
+        "Run N app-node processes allocating cars concurrently and report "
+        "throughput per node count, with and without slot leases (scratch database)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--nodes",
+            default="1,2,4",
+            help="Comma-separated node (process) counts to compare",
+        )
+        parser.add_argument(
+            "--bookings", type=int, default=40, help="Bookings per node per run"
+        )
+        parser.add_argument("--floors", type=int, default=5)
+        parser.add_argument("--seed", type=int, default=42)
+        parser.add_argument(
+            "--strategy",
+            action="append",
+            help="Strategy to compare (repeatable); defaults to "
+            "lowest_number and leased_section",
+        )
+
+    def handle(self, *args, **options):
+        node_counts = [int(n) for n in options["nodes"].split(",")]
+        strategies = options["strategy"] or ["lowest_number", "leased_section"]
+        with scratch_database() as connection:
+            seed_layout(floors=options["floors"])
+            db_name = connection.settings_dict["NAME"]
+            connection.close()
+            for strategy in strategies:
+                for nodes in node_counts:
+                    Slot.objects.update(is_available=True)
+                    SlotLease.objects.all().delete()
+                    connection.close()
+                    self._report(
+                        strategy, nodes, self._run(db_name, strategy, nodes, options)
+                    )
+
+    def _run(self, db_name, strategy, nodes, options):
+        # Every node connects and loads the layout first, then all start
+        # allocating together.
+        with Manager() as manager, ProcessPoolExecutor(
+            max_workers=nodes,
+            mp_context=get_context("spawn"),
+            initializer=django.setup,
+        ) as pool:
+            barrier = manager.Barrier(nodes + 1, timeout=120)
+            futures = [
+                pool.submit(
+                    _node,
+                    db_name,
+                    f"node{i}",
+                    strategy,
+                    options["bookings"],
+                    options["seed"] + i,
+                    barrier,
+                )
+                for i in range(nodes)
+            ]
+            barrier.wait()
+            start = time.perf_counter()
+            outcomes = [future.result() for future in futures]
+            elapsed = time.perf_counter() - start
+        return {
+            "elapsed": elapsed,
+            "latencies": sorted(l for _, lat, _, _ in outcomes for l in lat),
+            "claimed": [slot for _, _, claimed, _ in outcomes for slot in claimed],
+            "errors": sum(errors for _, _, _, errors in outcomes),
+        }
+
+    def _report(self, strategy, nodes, result):
+        ms = [value * 1000 for value in result["latencies"]]
+        by_slot = Counter(result["claimed"])
+        duplicates = sum(count - 1 for count in by_slot.values() if count > 1)
+        self.stdout.write(
+            f"{strategy:>16} x {nodes:2d} nodes: "
+            f"{len(result['claimed']) / result['elapsed']:8.1f} alloc/s "
+            f"| p50 {percentile(ms, 0.50):7.2f} ms | p99 {percentile(ms, 0.99):7.2f} ms "
+            f"| claimed {len(result['claimed']):5d} | double-booked {duplicates:3d} "
+            f"| db errors {result['errors']:3d}"
+        )
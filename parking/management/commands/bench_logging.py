@@ -0,0 +1,127 @@
+import logging
+import logging.handlers
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.test import RequestFactory
+
+from parking import views
+from parking.log_handlers import JsonFormatter, QueuedFileHandler
+
+from ._utils import percentile
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark request latency under heavy logging: FileHandler vs the "
+        "default WatchedFileHandler vs the queued handler"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=2000)
+        parser.add_argument(
+            "--lines",
+            type=int,
+            default=20,
+            help="Extra log records emitted per request, on top of the view's own",
+        )
+        parser.add_argument(
+            "--write-delay",
+            type=float,
+            default=0.0,
+            help="Milliseconds added to every file write, to emulate a slow disk",
+        )
+
+    def handle(self, *args, **options):
+        factory = RequestFactory()
+        view_logger = logging.getLogger("parking.views")
+
+        def noisy_checkout(request):
+            for i in range(options["lines"]):
+                view_logger.info("Processing step %s for token %s", i, "garbage")
+            # Invalid token: logs a warning and renders the error page, no DB.
+            return views.checkout(request)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            delay = options["write_delay"] / 1000
+            modes = {
+                "file": lambda: self._file_handler(Path(tmp) / "sync.log", delay),
+                "watched": lambda: self._watched_handler(
+                    Path(tmp) / "watched.log", delay
+                ),
+                "queued": lambda: self._queued_handler(Path(tmp) / "queued.log", delay),
+            }
+            for name, make_handler in modes.items():
+                latencies = self._run(
+                    factory, noisy_checkout, make_handler, options["requests"]
+                )
+                self._report(name, latencies)
+
+    @staticmethod
+    def _slow_down(handler, delay):
+        if delay:
+            emit = handler.emit
+
+            def slow_emit(record):
+                time.sleep(delay)
+                emit(record)
+
+            handler.emit = slow_emit
+        return handler
+
+    def _file_handler(self, path, delay):
+        handler = logging.FileHandler(path)
+        handler.setFormatter(JsonFormatter())
+        return self._slow_down(handler, delay)
+
+    def _watched_handler(self, path, delay):
+        handler = logging.handlers.WatchedFileHandler(path)
+        handler.setFormatter(JsonFormatter())
+        return self._slow_down(handler, delay)
+
+    def _queued_handler(self, path, delay):
+        handler = QueuedFileHandler(path)
+        handler.setFormatter(JsonFormatter())
+        if delay:
+            write = handler._write
+
+            def slow_write(text):
+                time.sleep(delay)
+                write(text)
+
+            handler._write = slow_write
+        return handler
+
+    @staticmethod
+    def _run(factory, view, make_handler, count):
+        parking_logger = logging.getLogger("parking")
+        saved_handlers = parking_logger.handlers[:]
+        saved_propagate = parking_logger.propagate
+        handler = make_handler()
+        parking_logger.handlers = [handler]
+        parking_logger.propagate = False
+        latencies = []
+        try:
+            for _ in range(count):
+                request = factory.post("/checkout/", {"token": "garbage"})
+                request.site = settings.PARKING_DEFAULT_SITE
+                start = time.perf_counter()
+                view(request)
+                latencies.append(time.perf_counter() - start)
+        finally:
+            parking_logger.handlers = saved_handlers
+            parking_logger.propagate = saved_propagate
+            handler.close()
+        return latencies
+
+    def _report(self, name, latencies):
+        ms = sorted(value * 1000 for value in latencies)
+        self.stdout.write(
+            f"{name:>7}: mean {statistics.mean(ms):.3f} ms "
+            f"| p50 {percentile(ms, 0.50):.3f} ms | p95 {percentile(ms, 0.95):.3f} ms "
+            f"| p99 {percentile(ms, 0.99):.3f} ms"
+        )
@@ -0,0 +1,101 @@
+import random
+import string
+import time
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from parking.models import Slot, Ticket
+from parking.plates import normalize_plate
+from parking.sites import get_current_site
+from services.plate_search import PlateSearch
+from services.scratch_db import scratch_database, seed_layout
+
+from ._utils import percentile
+
+
+def _plate(rng):
+    letters = string.ascii_uppercase
+    return (
+        f"{rng.choice(letters)}{rng.choice(letters)}{rng.randint(1, 99):02d}-"
+        f"{rng.choice(letters)}{rng.choice(letters)}-{rng.randint(1, 9999):04d}"
+    )
+
+
+def _typo(rng, plate):
+    """What a customer types: separators dropped and one character missed."""
+    chars = list(normalize_plate(plate))
+    del chars[rng.randrange(len(chars))]
+    return "".join(chars).lower()
+
+
+class Command(BaseCommand):
+    help = "Time fuzzy plate lookups against a large ticket history (scratch database)"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--tickets", type=int, default=200_000, help="Closed tickets in history"
+        )
+        parser.add_argument("--floors", type=int, default=10)
+        parser.add_argument("--lookups", type=int, default=500)
+        parser.add_argument("--seed", type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+        with scratch_database():
+            seed_layout(floors=options["floors"])
+            now = timezone.now()
+            slots = list(Slot.objects.values_list("id", flat=True))
+
+            self.stdout.write(f"Creating {options['tickets']} closed tickets...")
+            Ticket.objects.bulk_create(
+                (
+                    Ticket(
+                        vehicle_number=plate,
+                        plate_normalized=normalize_plate(plate),
+                        phone="0000000000",
+                        vehicle_type="CAR",
+                        slot_id=rng.choice(slots),
+                        check_in=now,
+                        check_out=now,
+                    )
+                    for plate in (_plate(rng) for _ in range(options["tickets"]))
+                ),
+                batch_size=5000,
+            )
+            open_plates = [_plate(rng) for _ in slots]
+            Ticket.objects.bulk_create(
+                Ticket(
+                    vehicle_number=plate,
+                    plate_normalized=normalize_plate(plate),
+                    phone="0000000000",
+                    vehicle_type="CAR",
+                    slot_id=slot_id,
+                    check_in=now,
+                )
+                for plate, slot_id in zip(open_plates, slots)
+            )
+
+            start = time.perf_counter()
+            PlateSearch.lookup("warmup", site=get_current_site())
+            build = time.perf_counter() - start
+
+            latencies, found = [], 0
+            for _ in range(options["lookups"]):
+                plate = rng.choice(open_plates)
+                start = time.perf_counter()
+                candidates = PlateSearch.lookup(
+                    _typo(rng, plate), site=get_current_site()
+                )
+                latencies.append((time.perf_counter() - start) * 1000)
+                if candidates and candidates[0][0].vehicle_number == plate:
+                    found += 1
+
+        latencies.sort()
+        self.stdout.write(
+            f"{len(open_plates)} open of {options['tickets'] + len(open_plates)} tickets"
+            f" | index build {build * 1000:.1f} ms"
+            f" | lookup p50 {percentile(latencies, 0.50):.2f} ms"
+            f" p99 {percentile(latencies, 0.99):.2f} ms"
+            f" | typo'd plate ranked first {found / options['lookups']:.0%}"
+        )
@@ -0,0 +1,47 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from services.pdf_generator import render_token_pdf
+from services.qr_generator import render_qr_png
+from services.receipts import RECEIPT_FORMATS, render_receipt
+from services.warmup import preload_render_libraries
+
+from ._utils import percentile
+from .bench_rendering import _fields
+
+
+def _render_pdf(ticket, checkout_url):
+    return render_token_pdf(ticket, render_qr_png(checkout_url))
+
+
+class Command(BaseCommand):
+    help = "Compare receipt formats for gate printers with the A4 PDF: bytes and render time"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--renders", type=int, default=200)
+
+    def handle(self, *args, **options):
+        preload_render_libraries()
+        baseline = None
+        for fmt in RECEIPT_FORMATS:
+            timings, size = [], 0
+            for i in range(options["renders"]):
+                url = f"https://parking.example/qrcheckout/{i}-AbCdEfGhIjKlMnOp/"
+                start = time.perf_counter()
+                if fmt == "pdf":
+                    body = _render_pdf(_fields(i), url)
+                else:
+                    body = render_receipt(fmt, _fields(i), url)
+                timings.append((time.perf_counter() - start) * 1000)
+                size += len(body)
+
+            timings.sort()
+            mean_bytes = size / options["renders"]
+            p50 = percentile(timings, 0.50)
+            baseline = baseline or (mean_bytes, p50)
+            self.stdout.write(
+                f"{fmt:>9}: {mean_bytes:8.0f} bytes ({mean_bytes / baseline[0]:6.1%} of A4)"
+                f" | render p50 {p50:7.2f} ms p99 {percentile(timings, 0.99):7.2f} ms"
+                f" ({p50 / baseline[1]:6.1%} of A4)"
+            )
@@ -0,0 +1,89 @@
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+from services.pdf_generator import render_token_pdf
+from services.qr_generator import render_qr_png
+from services.render_pool import RenderPool
+
+from ._utils import percentile
+
+
+def _fields(i):
+    return {
+        "id": i,
+        "code": f"{i}-K7QX9P",
+        "vehicle_number": f"RJ14-CC-{i:04d}",
+        "phone": "+919876543210",
+        "email": "driver@example.com",
+        "vehicle_type": "CAR",
+        "slot": "Floor 1-A-1",
+        "check_in": "01 January 2026, 09:00 AM",
+        "initial_payment": 0,
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        "Token rendering throughput of a threaded worker, inline vs the render "
+        "pool, and how long light requests stall meanwhile"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--threads", type=int, default=8, help="Request threads per worker"
+        )
+        parser.add_argument("--renders", type=int, default=200)
+        parser.add_argument(
+            "--workers",
+            default="0,2",
+            help="Comma-separated pool sizes to compare (0 = inline rendering)",
+        )
+
+    def handle(self, *args, **options):
+        for workers in [int(w) for w in options["workers"].split(",")]:
+            pool = RenderPool(workers, max_pending=options["threads"], timeout=60)
+            pool.start()
+            try:
+                self._run(pool, workers, options["threads"], options["renders"])
+            finally:
+                pool.shutdown()
+
+    def _run(self, pool, workers, threads, renders):
+        def book(i):
+            # Unique URLs: every booking renders a new QR code
+            png = pool.run(render_qr_png, f"https://parking.example/qrcheckout/{i}/")
+            return len(pool.run(render_token_pdf, _fields(i), png))
+
+        # A light request every 10 ms: how late does it get to run?
+        stop = threading.Event()
+        stalls = []
+
+        def probe():
+            while not stop.is_set():
+                start = time.perf_counter()
+                time.sleep(0.01)
+                stalls.append((time.perf_counter() - start - 0.01) * 1000)
+
+        prober = threading.Thread(target=probe)
+        prober.start()
+        try:
+            start = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=threads) as executor:
+                sizes = list(executor.map(book, range(renders)))
+            elapsed = time.perf_counter() - start
+        finally:
+            stop.set()
+            prober.join()
+
+        stalls.sort()
+        mode = f"pool x{workers}" if workers else "inline"
+        self.stdout.write(
+            f"{mode:>8}: {renders / elapsed:6.1f} tokens/s"
+            f" | avg PDF {statistics.mean(sizes) / 1024:.0f} KiB"
+            f" | light request delay p50 {percentile(stalls, 0.50):.1f} ms"
+            f" p99 {percentile(stalls, 0.99):.1f} ms"
+        )
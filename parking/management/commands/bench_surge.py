@@ -0,0 +1,124 @@
+import random
+import tempfile
+import threading
+import time
+from collections import Counter
+
+from django.core.cache import caches
+from django.core.management.base import BaseCommand
+from django.test import Client, override_settings
+from django.test.client import ClientHandler
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from parking.models import Slot, Ticket
+from services.scratch_db import scratch_database, seed_layout
+
+from ._utils import percentile
+
+
+def _gate(handler, gate, slot_ids, bookings, seed, barrier, results):
+    """One gate kiosk submitting `bookings` bookings back to back."""
+    client = Client(raise_request_exception=False, HTTP_X_PARKING_GATE=gate)
+    client.handler = handler
+    rng = random.Random(seed)
+    barrier.wait()
+    for i in range(bookings):
+        data = {
+            "vehicle_number": f"SURGE{seed:03d}{i:04d}",
+            "phone": "9876543210",
+            "email": "surge@example.com",
+            "initial_payment": 0,
+        }
+        begin = time.perf_counter()
+        response = client.post(f"/vehicle/{rng.choice(slot_ids)}/", data)
+        results.append((response.status_code, time.perf_counter() - begin))
+
+
+class Command(BaseCommand):
+    help = (
+        "Fire a booking surge from many gates at once and report tail latency "
+        "with and without admission control (scratch database)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--gates", type=int, default=16)
+        parser.add_argument(
+            "--bookings", type=int, default=40, help="Bookings per gate"
+        )
+        parser.add_argument("--floors", type=int, default=10)
+        parser.add_argument("--seed", type=int, default=42)
+
+    def handle(self, *args, **options):
+        setup_test_environment()
+        try:
+            # Bookings write QR images; keep them out of the real media root
+            with scratch_database(), tempfile.TemporaryDirectory() as media_root:
+                seed_layout(floors=options["floors"])
+                for enabled in (False, True):
+                    Ticket.objects.all().delete()
+                    Slot.objects.update(is_available=True)
+                    for cache in caches.all():
+                        cache.clear()
+                    # Every gate posts from the test client's address
+                    with override_settings(
+                        ADMISSION_CONTROL_ENABLED=enabled,
+                        ADMISSION_TRUSTED_GATE_ADDRESSES=("127.0.0.1",),
+                        MEDIA_ROOT=media_root,
+                    ):
+                        self._report(enabled, self._run(options))
+        finally:
+            teardown_test_environment()
+
+    def _run(self, options):
+        slot_ids = list(
+            Slot.objects.filter(vehicle_type="CAR").values_list("id", flat=True)
+        )
+        # One handler (one middleware stack) shared by every gate, as in a
+        # single worker process
+        handler = ClientHandler(enforce_csrf_checks=False)
+        handler.load_middleware()
+        gates = options["gates"]
+        barrier = threading.Barrier(gates + 1)
+        results = []
+        threads = [
+            threading.Thread(
+                target=_gate,
+                args=(
+                    handler,
+                    f"gate{i}",
+                    slot_ids,
+                    options["bookings"],
+                    options["seed"] + i,
+                    barrier,
+                    results,
+                ),
+            )
+            for i in range(gates)
+        ]
+        for thread in threads:
+            thread.start()
+        barrier.wait()
+        start = time.perf_counter()
+        for thread in threads:
+            thread.join()
+        return time.perf_counter() - start, results
+
+    def _report(self, enabled, run):
+        elapsed, results = run
+        statuses = Counter(status for status, _ in results)
+        rejected = statuses[429] + statuses[503]
+        ms = sorted(latency * 1000 for _, latency in results)
+        # Only successful bookings count as served; other failures (e.g.
+        # "database is locked" 500s) are reported as errors.
+        served = sorted(
+            latency * 1000 for status, latency in results if 200 <= status < 400
+        )
+        errors = len(results) - len(served) - rejected
+        self.stdout.write(
+            f"admission {'on ' if enabled else 'off'}: "
+            f"{len(results) / elapsed:7.1f} req/s "
+            f"| p50 {percentile(ms, 0.50):7.1f} ms | p99 {percentile(ms, 0.99):7.1f} ms "
+            f"| served p99 {percentile(served, 0.99):7.1f} ms "
+            f"| served {len(served):4d} | rejected {rejected:4d} | errors {errors:4d} "
+            f"| statuses {dict(sorted(statuses.items()))}"
+        )
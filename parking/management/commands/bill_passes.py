@@ -0,0 +1,33 @@
+from datetime import datetime
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from parking.sites import site_databases
+from services.passes import PassBilling, previous_month
+
+
+class Command(BaseCommand):
+    help = "Invoice monthly passes for a month (default: last month)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--month", help="Month to bill, as YYYY-MM")
+        parser.add_argument(
+            "--batch-size", type=int, default=settings.PASS_BILLING_BATCH_SIZE
+        )
+
+    def handle(self, *args, **options):
+        if options["month"]:
+            try:
+                month = datetime.strptime(options["month"], "%Y-%m").date()
+            except ValueError:
+                raise CommandError("--month must look like 2026-09.")
+        else:
+            month = previous_month()
+        for alias in site_databases():
+            invoiced, amount = PassBilling.run(
+                month, using=alias, batch_size=options["batch_size"]
+            )
+            self.stdout.write(
+                f"{alias}: invoiced {invoiced} pass(es) for {month:%b %Y}, Rs {amount}"
+            )
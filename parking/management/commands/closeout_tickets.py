@@ -0,0 +1,62 @@
+import csv
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from parking.sites import site_databases
+from services.closeout import REPORT_FIELDS, Closeout
+
+
+class Command(BaseCommand):
+    help = "Bill and close tickets left open past the closeout threshold"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--after-hours",
+            type=int,
+            default=settings.CLOSEOUT_AFTER_HOURS,
+            help="Close tickets checked in more than N hours ago "
+            "(default: CLOSEOUT_AFTER_HOURS)",
+        )
+        parser.add_argument(
+            "--batch-size", type=int, default=settings.CLOSEOUT_BATCH_SIZE
+        )
+        parser.add_argument(
+            "--report",
+            help="CSV report path (default: closeout-<date>.csv in "
+            "CLOSEOUT_REPORT_DIR)",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Bill and report the tickets but leave them open",
+        )
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        path = Path(
+            options["report"]
+            or settings.CLOSEOUT_REPORT_DIR
+            / f"closeout-{timezone.localdate(now):%Y-%m-%d}.csv"
+        )
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with path.open("w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=REPORT_FIELDS)
+            writer.writeheader()
+            for alias in site_databases():
+                closed, freed, billed = Closeout.run(
+                    using=alias,
+                    after_hours=options["after_hours"],
+                    batch_size=options["batch_size"],
+                    now=now,
+                    report=writer.writerow,
+                    dry_run=options["dry_run"],
+                )
+                verb = "would close" if options["dry_run"] else "closed"
+                self.stdout.write(
+                    f"{alias}: {verb} {closed} ticket(s), billed Rs {billed}, "
+                    f"freed {freed} slot(s)"
+                )
+        self.stdout.write(f"Report written to {path}")
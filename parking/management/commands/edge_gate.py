@@ -0,0 +1,76 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError
+
+from services.edge import EdgeGate, EdgeSync
+from services.slot_leases import LeaseCoordinator
+
+
+class Command(BaseCommand):
+    help = "Lease slots to this gate and sync its edge journal to the central database"
+
+    def add_arguments(self, parser):
+        sub = parser.add_subparsers(dest="action", required=True)
+
+        lease = sub.add_parser("lease", help="Lease a section and snapshot it locally")
+        lease.add_argument("--vehicle-type", nargs="+", default=["CAR", "BIKE"])
+
+        sync = sub.add_parser("sync", help="Replay the journal and renew leases")
+        sync.add_argument(
+            "--interval",
+            type=int,
+            default=0,
+            help="Keep running, syncing every N seconds (0 = run once)",
+        )
+        sync.add_argument("--batch-size", type=int, default=100)
+
+        sub.add_parser("status", help="Show the unsynced backlog and conflicts")
+
+    def handle(self, *args, **options):
+        gate = EdgeGate.from_settings()
+        getattr(self, f"_{options['action']}")(gate, options)
+
+    def _lease(self, gate, options):
+        # Replay first so the snapshot does not resurrect slots freed locally.
+        if not self._replay(gate, 1000):
+            raise CommandError("Central database unreachable; lease not refreshed.")
+        for vehicle_type in options["vehicle_type"]:
+            lease = gate.refresh_lease(vehicle_type.upper())
+            if lease is None:
+                self.stderr.write(f"No free section to lease for {vehicle_type}")
+            else:
+                self.stdout.write(f"{vehicle_type}: {lease}")
+
+    def _sync(self, gate, options):
+        while True:
+            if self._replay(gate, options["batch_size"]):
+                try:
+                    LeaseCoordinator.renew(gate.gate_id)
+                except DatabaseError as e:
+                    self.stderr.write(f"Lease heartbeat failed: {e}")
+            if not options["interval"]:
+                break
+            time.sleep(options["interval"])
+
+    def _replay(self, gate, batch_size):
+        """Drain the journal; False if the central database is unreachable."""
+        sync = EdgeSync(gate.journal, gate.gate_id)
+        try:
+            while True:
+                applied, conflicts = sync.replay(batch_size)
+                if not applied:
+                    return True
+                self.stdout.write(
+                    f"Replayed {applied} entries, {len(conflicts)} conflict(s)"
+                )
+        except DatabaseError as e:
+            self.stderr.write(f"Sync paused, central database unreachable: {e}")
+            return False
+
+    def _status(self, gate, options):
+        self.stdout.write(f"Gate {gate.gate_id}, journal {settings.EDGE_JOURNAL_PATH}")
+        self.stdout.write(f"Unsynced entries: {gate.journal.backlog()}")
+        for seq, reason in gate.journal.conflicts():
+            self.stdout.write(f"  conflict at entry {seq}: {reason}")
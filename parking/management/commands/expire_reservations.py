@@ -0,0 +1,30 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from parking.sites import site_databases
+from services.reservations import ReservationService
+
+
+class Command(BaseCommand):
+    help = "Release reservation holds of customers who did not show up"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--interval",
+            type=int,
+            default=0,
+            help="Keep running, sweeping every N seconds (0 = run once)",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            expired = sum(
+                ReservationService.expire_no_shows(using=alias)
+                for alias in site_databases()
+            )
+            if expired or not options["interval"]:
+                self.stdout.write(f"Released {expired} no-show reservation(s)")
+            if not options["interval"]:
+                break
+            time.sleep(options["interval"])
@@ -1,61 +1,107 @@
-from django.core.management.base import BaseCommand
-from parking.models import Floor, Slot, ParkingConfig
-from config import (
-    BASE_PRICE,
-    BASE_HOURS,
-    EXTRA_PER_HOUR,
-    BIKE_BASE_PRICE,
-    BIKE_EXTRA_PER_HOUR,
-    VEHICLE_TYPE_CAR,
-    VEHICLE_TYPE_BIKE,
-)
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from parking.models import Floor, Slot, ParkingConfig, Site
+from parking.sites import site_codes, use_site
 
 
 class Command(BaseCommand):
     help = "Initialize floors and slots"
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--site",
+            default=settings.PARKING_DEFAULT_SITE,
+            help="Site code to initialize (see PARKING_SITE_DATABASES)",
+        )
+        parser.add_argument("--site-name", help="Display name for a new site")
+        parser.add_argument("--floors", type=int, default=10)
+        parser.add_argument("--slots-per-section", type=int, default=50)
+        parser.add_argument("--price-increment", type=int, default=5)
+        parser.add_argument("--car-base-price", type=int, default=50)
+        parser.add_argument("--bike-base-price", type=int, default=30)
+
     def handle(self, *args, **options):
+        site = options["site"]
+        if site not in site_codes():
+            raise CommandError(
+                f"Unknown site {site!r}; add it to PARKING_SITE_DATABASES."
+            )
+
+        Site.objects.get_or_create(
+            code=site, defaults={"name": options["site_name"] or site}
+        )
+        with use_site(site):
+            self._init_layout(site, options)
+
+    def _init_layout(self, site, options):
         CAR_SECTIONS = ["A", "B", "C", "D"]
         BIKE_SECTIONS = ["E", "F", "G"]
-        TOTAL_FLOORS = 10
-        SLOTS_PER_SECTION = 50
+        TOTAL_FLOORS = options["floors"]
+        SLOTS_PER_SECTION = options["slots_per_section"]
+        CAR_SLOT_WIDTH = 2.5
+        BIKE_SLOT_WIDTH = 1.0
+        ROW_SPACING = 6.0
 
         for floor_no in range(1, TOTAL_FLOORS + 1):
             floor, created = Floor.objects.get_or_create(
-                number=floor_no, defaults={"price_increment": (floor_no - 1) * 5}
+                site=site,
+                number=floor_no,
+                defaults={
+                    "price_increment": (floor_no - 1) * options["price_increment"]
+                },
             )
             if created:
                 self.stdout.write(f"Created Floor {floor_no}")
 
-            for section in CAR_SECTIONS:
+            # Sections are rows ROW_SPACING metres apart, numbered away from
+            # the lift/exit at the origin of the floor plan.
+            for row, section in enumerate(CAR_SECTIONS):
                 for slot_no in range(1, SLOTS_PER_SECTION + 1):
                     Slot.objects.get_or_create(
                         floor=floor,
                         section=section,
                         slot_number=slot_no,
                         vehicle_type="CAR",
-                        defaults={"is_available": True},
+                        defaults={
+                            "is_available": True,
+                            "x": slot_no * CAR_SLOT_WIDTH,
+                            "y": row * ROW_SPACING,
+                        },
                     )
 
-            for section in BIKE_SECTIONS:
+            for row, section in enumerate(BIKE_SECTIONS, start=len(CAR_SECTIONS)):
                 for slot_no in range(1, SLOTS_PER_SECTION + 1):
                     Slot.objects.get_or_create(
                         floor=floor,
                         section=section,
                         slot_number=slot_no,
                         vehicle_type="BIKE",
-                        defaults={"is_available": True},
+                        defaults={
+                            "is_available": True,
+                            "x": slot_no * BIKE_SLOT_WIDTH,
+                            "y": row * ROW_SPACING,
+                        },
                     )
 
-        self.stdout.write(self.style.SUCCESS("Data initialized"))
+        self.stdout.write(self.style.SUCCESS(f"Data initialized for site {site}"))
 
         # After creating slots...
         ParkingConfig.objects.get_or_create(
+            site=site,
             vehicle_type="BIKE",
-            defaults={"base_price": 30, "base_hours": 5, "extra_per_hour": 5},
+            defaults={
+                "base_price": options["bike_base_price"],
+                "base_hours": 5,
+                "extra_per_hour": 5,
+            },
         )
         ParkingConfig.objects.get_or_create(
+            site=site,
             vehicle_type="CAR",
-            defaults={"base_price": 50, "base_hours": 5, "extra_per_hour": 10},
+            defaults={
+                "base_price": options["car_base_price"],
+                "base_hours": 5,
+                "extra_per_hour": 10,
+            },
         )
         self.stdout.write(self.style.SUCCESS("Parking configurations set"))
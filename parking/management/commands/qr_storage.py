@@ -0,0 +1,43 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from parking.sites import site_databases
+from services.qr_storage import QRStorage
+
+
+class Command(BaseCommand):
+    help = "Purge QR images of closed tickets or migrate them to the sharded layout"
+
+    def add_arguments(self, parser):
+        sub = parser.add_subparsers(dest="action", required=True)
+
+        purge = sub.add_parser(
+            "purge", help="Delete images of tickets checked out long ago"
+        )
+        purge.add_argument(
+            "--older-than-days",
+            type=int,
+            default=settings.QR_RETENTION_DAYS,
+            help="Checked out more than N days ago (default: QR_RETENTION_DAYS)",
+        )
+        purge.add_argument("--batch-size", type=int, default=500)
+
+        migrate = sub.add_parser(
+            "migrate", help="Move flat qrcodes/*.png files into sharded directories"
+        )
+        migrate.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        for alias in site_databases():
+            if options["action"] == "purge":
+                purged = QRStorage.purge(
+                    options["older_than_days"], options["batch_size"], using=alias
+                )
+                self.stdout.write(f"{alias}: purged {purged} QR image(s)")
+            else:
+                moved, missing = QRStorage.migrate_layout(
+                    options["batch_size"], using=alias
+                )
+                self.stdout.write(
+                    f"{alias}: moved {moved} QR image(s), {missing} missing file(s) cleared"
+                )
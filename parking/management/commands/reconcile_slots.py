@@ -0,0 +1,52 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from parking.sites import site_databases
+from services.slot_reconciler import SlotReconciler
+
+
+class Command(BaseCommand):
+    help = "Free slots left unavailable without an open ticket"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--interval",
+            type=int,
+            default=0,
+            help="Keep running, sweeping every N seconds (0 = run once)",
+        )
+        parser.add_argument(
+            "--grace-seconds",
+            type=int,
+            default=settings.SLOT_LEAK_GRACE_SECONDS,
+            help="Only free slots taken longer ago (default: SLOT_LEAK_GRACE_SECONDS)",
+        )
+        parser.add_argument(
+            "--include-untracked",
+            action="store_true",
+            help="Also free leaked slots with no logged event (e.g. set by hand)",
+        )
+        parser.add_argument(
+            "--dry-run", action="store_true", help="Only report leaked slots"
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            for alias in site_databases():
+                if options["dry_run"]:
+                    leaked, freed = SlotReconciler.observe(using=alias), []
+                else:
+                    leaked, freed = SlotReconciler.reclaim(
+                        using=alias,
+                        grace_seconds=options["grace_seconds"],
+                        include_untracked=options["include_untracked"],
+                    )
+                if leaked or not options["interval"]:
+                    self.stdout.write(
+                        f"{alias}: {leaked} leaked slot(s), freed {len(freed)}"
+                    )
+            if not options["interval"]:
+                break
+            time.sleep(options["interval"])
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from services.site_reports import occupancy_report
+
+
+class Command(BaseCommand):
+    help = "Occupancy and today's revenue for every site, queried in parallel"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--site", action="append", help="Limit to these sites")
+
+    def handle(self, *args, **options):
+        rows = occupancy_report(options["site"])
+        for row in rows:
+            self.stdout.write(
+                f"{row['name']:<20} occupied {row['occupied']:>5}/{row['slots']:<5} "
+                f"open tickets {row['open_tickets']:>5} | closed today "
+                f"{row['closed_tickets']:>5} | revenue ₹{row['revenue']}"
+            )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Total: {sum(r['occupied'] for r in rows)}/"
+                f"{sum(r['slots'] for r in rows)} occupied, "
+                f"revenue ₹{sum(r['revenue'] for r in rows)}"
+            )
+        )
@@ -0,0 +1,51 @@
+import time
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from parking.sites import site_databases
+from services.slot_events import SlotEventLog
+
+
+class Command(BaseCommand):
+    help = "Snapshot the slot event log, or rebuild occupancy at a past time"
+
+    def add_arguments(self, parser):
+        sub = parser.add_subparsers(dest="action", required=True)
+
+        snapshot = sub.add_parser("snapshot", help="Fold new events into a snapshot")
+        snapshot.add_argument(
+            "--interval",
+            type=int,
+            default=0,
+            help="Keep running, snapshotting every N seconds (0 = run once)",
+        )
+
+        at = sub.add_parser("at", help="Occupancy at a timestamp")
+        at.add_argument("timestamp", help="ISO 8601, e.g. 2026-01-31T18:30")
+
+    def handle(self, *args, **options):
+        if options["action"] == "at":
+            return self._at(options["timestamp"])
+        while True:
+            for alias in site_databases():
+                snapshot = SlotEventLog.snapshot(using=alias)
+                if snapshot or not options["interval"]:
+                    self.stdout.write(f"{alias}: {snapshot or 'no new events'}")
+            if not options["interval"]:
+                break
+            time.sleep(options["interval"])
+
+    def _at(self, timestamp):
+        try:
+            when = datetime.fromisoformat(timestamp)
+        except ValueError:
+            raise CommandError(f"Invalid timestamp {timestamp!r}.")
+        if timezone.is_naive(when):
+            when = timezone.make_aware(when)
+        for alias in site_databases():
+            bitmap = SlotEventLog.occupancy_at(when, using=alias)
+            self.stdout.write(
+                f"{alias}: {bitmap.occupied_count()} occupied at {when:%d %b %Y %H:%M}"
+            )
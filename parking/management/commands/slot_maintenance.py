@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from parking.models import Floor, Slot
+from parking.sites import get_current_site, site_codes, use_site
+from services.slot_maintenance import SlotMaintenance
+
+
+class Command(BaseCommand):
+    help = "Block or unblock the slots of a floor or section for maintenance"
+
+    def add_arguments(self, parser):
+        parser.add_argument("action", choices=["block", "unblock"])
+        parser.add_argument("--floor", type=int, required=True, help="Floor number")
+        parser.add_argument("--section", help="Only this section (default: all)")
+        parser.add_argument("--vehicle-type", help="Only CAR or BIKE slots")
+        parser.add_argument("--site", help="Site code (default: PARKING_DEFAULT_SITE)")
+
+    def handle(self, *args, **options):
+        site = options["site"] or get_current_site()
+        if site not in site_codes():
+            raise CommandError(f"Unknown site {site!r}")
+        with use_site(site):
+            floor = Floor.objects.filter(site=site, number=options["floor"]).first()
+            if floor is None:
+                raise CommandError(f"{site} has no floor {options['floor']}")
+            slots = Slot.objects.filter(floor=floor)
+            if options["section"]:
+                slots = slots.filter(section=options["section"].upper())
+            if options["vehicle_type"]:
+                slots = slots.filter(vehicle_type=options["vehicle_type"].upper())
+
+            if options["action"] == "block":
+                blocked, deferred = SlotMaintenance.block(slots)
+                self.stdout.write(
+                    f"{site}: blocked {blocked} slot(s), {deferred} more when "
+                    "their vehicles check out"
+                )
+            else:
+                unblocked = SlotMaintenance.unblock(slots)
+                self.stdout.write(f"{site}: unblocked {unblocked} slot(s)")
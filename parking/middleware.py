@@ -1,5 +1,26 @@
+import cProfile
+import logging
+import random
+import threading
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import DatabaseError, connections
 from django.http import Http404
 from django.shortcuts import render
+from django.urls import Resolver404, resolve
+from django.utils import timezone
+
+from services.free_slots import FreeSlotCounts
+
+from . import metrics, routers
+from .admission import GateLimiter, gate_id, retry_after
+from .models import ParkingConfig
+from .sites import get_current_site
+
+logger = logging.getLogger(__name__)
 
 
 class ExceptionHandlingMiddleware:
@@ -22,3 +43,246 @@ class ExceptionHandlingMiddleware:
         except Exception:
             # For any other unhandled exception, render a friendly 500 page
             return render(request, "500.html", status=500)
+
+
+class ReplicaMiddleware:
+    """Read-your-writes for replica routing (see `parking.routers`).
+
+    A request that wrote to any database gets a short-lived cookie; while
+    it lasts, that client's reads stay on the primaries, so a customer sees
+    their own booking even if the replicas lag. Not used unless
+    `DATABASE_REPLICAS` is configured.
+    """
+
+    def __init__(self, get_response):
+        if not settings.DATABASE_REPLICAS:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        cookie = settings.READ_YOUR_WRITES_COOKIE
+        state = {"pinned": cookie in request.COOKIES, "wrote": False}
+        token = routers.request_state.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            routers.request_state.reset(token)
+        if state["wrote"]:
+            response.set_cookie(
+                cookie,
+                "1",
+                max_age=settings.READ_YOUR_WRITES_SECONDS,
+                httponly=True,
+                samesite="Lax",
+            )
+        return response
+
+
+ADMISSION_REJECTIONS = metrics.REGISTRY.counter(
+    "parking_admission_rejections_total",
+    "Requests turned away by admission control, by reason.",
+)
+BOOKINGS_IN_FLIGHT = metrics.REGISTRY.gauge(
+    "parking_bookings_in_flight", "Booking submissions being processed."
+)
+
+
+class AdmissionControlMiddleware:
+    """Fail fast under booking surges (see `parking.admission`).
+
+    POSTs to `ADMISSION_BOOKING_VIEWS` are rate limited per gate and run at
+    most `ADMISSION_MAX_CONCURRENT_BOOKINGS` at a time; `ADMISSION_LOT_FULL_VIEWS`
+    answer "full" from the cached free-slot count. Rejections are 429 (gate
+    over its rate) or 503 (busy, full) with `Retry-After`. Not used unless
+    `ADMISSION_CONTROL_ENABLED`.
+    """
+
+    def __init__(self, get_response):
+        if not settings.ADMISSION_CONTROL_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.gates = GateLimiter(
+            settings.ADMISSION_GATE_RATE, settings.ADMISSION_GATE_BURST
+        )
+        self.bookings = threading.BoundedSemaphore(
+            settings.ADMISSION_MAX_CONCURRENT_BOOKINGS
+        )
+        self.in_flight = 0
+        self.lock = threading.Lock()
+
+    def __call__(self, request):
+        try:
+            match = resolve(request.path_info)
+        except Resolver404:
+            return self.get_response(request)
+
+        if match.url_name in settings.ADMISSION_LOT_FULL_VIEWS and self._lot_full(
+            match.kwargs.get("vehicle_type")
+        ):
+            return self._reject(
+                request,
+                "lot_full",
+                503,
+                settings.ADMISSION_RETRY_AFTER_SECONDS,
+                "Parking Full",
+                "There are no free slots at the moment.",
+            )
+
+        if (
+            request.method != "POST"
+            or match.url_name not in settings.ADMISSION_BOOKING_VIEWS
+        ):
+            return self.get_response(request)
+
+        wait = self.gates.take(gate_id(request))
+        if wait:
+            return self._reject(
+                request,
+                "rate_limited",
+                429,
+                wait,
+                "Too Many Bookings",
+                "This gate is sending bookings faster than we can take them.",
+            )
+        if not self.bookings.acquire(timeout=settings.ADMISSION_QUEUE_TIMEOUT_SECONDS):
+            return self._reject(
+                request,
+                "overloaded",
+                503,
+                settings.ADMISSION_RETRY_AFTER_SECONDS,
+                "Busy",
+                "We are handling many bookings right now.",
+            )
+        try:
+            self._track(1)
+            return self.get_response(request)
+        finally:
+            self._track(-1)
+            self.bookings.release()
+
+    def _track(self, delta):
+        with self.lock:
+            self.in_flight += delta
+            BOOKINGS_IN_FLIGHT.set(self.in_flight)
+
+    @staticmethod
+    def _lot_full(vehicle_type=None):
+        """Whether the cached counts show no free slot. Edge gates book from
+        their own snapshot, and a failing count lets the request through to
+        the view's own checks."""
+        if settings.EDGE_MODE:
+            return False
+        if vehicle_type:
+            vehicle_types = [vehicle_type.upper()]
+        else:
+            vehicle_types = [code for code, _ in ParkingConfig.VEHICLE_CHOICES]
+        site = get_current_site()
+        try:
+            return not any(FreeSlotCounts.get(site, kind) for kind in vehicle_types)
+        except DatabaseError:
+            logger.warning("Free-slot count unavailable; admitting the request.")
+            return False
+
+    @staticmethod
+    def _reject(request, reason, status, seconds, title, message):
+        ADMISSION_REJECTIONS.inc(reason=reason)
+        response = render(
+            request,
+            "busy.html",
+            {"error_title": title, "error_message": message},
+            status=status,
+        )
+        response["Retry-After"] = retry_after(seconds)
+        return response
+
+
+class _QueryRecorder:
+    """`execute_wrapper` hook counting queries and their wall time."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.duration += time.perf_counter() - start
+
+
+class InstrumentationMiddleware:
+    """Opt-in per-view timing, query counting and sampled cProfile dumps.
+
+    Enabled by `INSTRUMENTATION_ENABLED`. Observations are recorded in the
+    in-memory registry of `parking.metrics` and served at `/metrics/`.
+    A profile is dumped to `INSTRUMENTATION_PROFILE_DIR` for a random
+    `INSTRUMENTATION_PROFILE_SAMPLE_RATE` fraction of requests, or when the
+    `INSTRUMENTATION_PROFILE_HEADER` header is sent and
+    `INSTRUMENTATION_PROFILE_ALLOW_HEADER` is on.
+    """
+
+    def __init__(self, get_response):
+        if not settings.INSTRUMENTATION_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.profile_header = (
+            "HTTP_" + settings.INSTRUMENTATION_PROFILE_HEADER.upper().replace("-", "_")
+        )
+
+    def __call__(self, request):
+        recorder = _QueryRecorder()
+        profiler = cProfile.Profile() if self._should_profile(request) else None
+        token = metrics.start_service_timings()
+        start = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for alias in connections:
+                    stack.enter_context(connections[alias].execute_wrapper(recorder))
+                if profiler:
+                    profiler.enable()
+                try:
+                    response = self.get_response(request)
+                finally:
+                    if profiler:
+                        profiler.disable()
+        finally:
+            elapsed = time.perf_counter() - start
+            services = metrics.stop_service_timings(token)
+
+        view = self._view_name(request)
+        metrics.VIEW_DURATION.observe(elapsed, view=view)
+        metrics.VIEW_DB_QUERIES.observe(recorder.count, view=view)
+        metrics.VIEW_DB_DURATION.observe(recorder.duration, view=view)
+        for service, duration in services.items():
+            metrics.VIEW_SERVICE_DURATION.observe(duration, view=view, service=service)
+        if profiler:
+            self._dump_profile(profiler, view)
+        return response
+
+    def _should_profile(self, request):
+        if settings.INSTRUMENTATION_PROFILE_ALLOW_HEADER and request.META.get(
+            self.profile_header
+        ):
+            return True
+        rate = settings.INSTRUMENTATION_PROFILE_SAMPLE_RATE
+        return rate > 0 and random.random() < rate
+
+    @staticmethod
+    def _view_name(request):
+        match = getattr(request, "resolver_match", None)
+        if match is None:
+            return "unresolved"
+        return match.view_name or match._func_path
+
+    @staticmethod
+    def _dump_profile(profiler, view):
+        directory = settings.INSTRUMENTATION_PROFILE_DIR
+        try:
+            directory.mkdir(parents=True, exist_ok=True)
+            stamp = timezone.now().strftime("%Y%m%dT%H%M%S%f")
+            path = directory / f"{view.replace(':', '_')}-{stamp}.prof"
+            profiler.dump_stats(path)
+        except OSError as e:
+            logger.warning("Failed to write profile for %s: %s", view, e)
@@ -0,0 +1,33 @@
+# Generated by Django 6.0 on 2026-10-19 02:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("parking", "0006_alter_slot_is_available_alter_ticket_check_out_and_more"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="floor",
+            name="exit_x",
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddField(
+            model_name="floor",
+            name="exit_y",
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddField(
+            model_name="slot",
+            name="x",
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddField(
+            model_name="slot",
+            name="y",
+            field=models.FloatField(default=0),
+        ),
+    ]
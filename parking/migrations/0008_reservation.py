@@ -0,0 +1,77 @@
+# Generated by Django 6.0 on 2026-10-19 02:17
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("parking", "0007_floor_exit_slot_position"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Reservation",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("vehicle_number", models.CharField(max_length=20)),
+                ("phone", models.CharField(max_length=15)),
+                ("email", models.EmailField(blank=True, max_length=254, null=True)),
+                ("vehicle_type", models.CharField(max_length=10)),
+                ("start", models.DateTimeField()),
+                ("end", models.DateTimeField()),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("HELD", "Held"),
+                            ("FULFILLED", "Fulfilled"),
+                            ("EXPIRED", "Expired (no-show)"),
+                            ("CANCELLED", "Cancelled"),
+                        ],
+                        default="HELD",
+                        max_length=10,
+                    ),
+                ),
+                ("created_at", models.DateTimeField(default=django.utils.timezone.now)),
+                (
+                    "slot",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="reservations",
+                        to="parking.slot",
+                    ),
+                ),
+                (
+                    "ticket",
+                    models.OneToOneField(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        to="parking.ticket",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["slot", "status", "start"],
+                        name="parking_res_slot_id_a12403_idx",
+                    ),
+                    models.Index(
+                        fields=["status", "start"], name="parking_res_status_dd5077_idx"
+                    ),
+                ],
+            },
+        ),
+    ]
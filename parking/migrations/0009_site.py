@@ -0,0 +1,75 @@
+# Generated by Django 6.0 on 2026-10-19 02:18
+
+import parking.sites
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("parking", "0008_reservation"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Site",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("code", models.SlugField(max_length=20, unique=True)),
+                ("name", models.CharField(max_length=100)),
+            ],
+        ),
+        migrations.AddField(
+            model_name="floor",
+            name="site",
+            field=models.CharField(
+                default=parking.sites.get_current_site, max_length=20
+            ),
+        ),
+        migrations.AddField(
+            model_name="parkingconfig",
+            name="site",
+            field=models.CharField(
+                default=parking.sites.get_current_site, max_length=20
+            ),
+        ),
+        migrations.AddField(
+            model_name="ticket",
+            name="site",
+            field=models.CharField(
+                db_index=True, default=parking.sites.get_current_site, max_length=20
+            ),
+        ),
+        migrations.AlterField(
+            model_name="floor",
+            name="number",
+            field=models.IntegerField(),
+        ),
+        migrations.AlterField(
+            model_name="parkingconfig",
+            name="vehicle_type",
+            field=models.CharField(
+                choices=[("BIKE", "2 Wheeler"), ("CAR", "4 Wheeler")], max_length=10
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="floor",
+            constraint=models.UniqueConstraint(
+                fields=("site", "number"), name="unique_site_floor"
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="parkingconfig",
+            constraint=models.UniqueConstraint(
+                fields=("site", "vehicle_type"), name="unique_site_vehicle_type"
+            ),
+        ),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 6.0 on 2026-10-19 02:21
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("parking", "0009_site"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="ticket",
+            name="edge_ref",
+            field=models.CharField(blank=True, max_length=40, null=True, unique=True),
+        ),
+        migrations.CreateModel(
+            name="SlotLease",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("holder", models.CharField(db_index=True, max_length=64)),
+                ("section", models.CharField(max_length=1)),
+                ("vehicle_type", models.CharField(max_length=10)),
+                ("expires_at", models.DateTimeField(db_index=True)),
+                ("created_at", models.DateTimeField(default=django.utils.timezone.now)),
+                (
+                    "floor",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE, to="parking.floor"
+                    ),
+                ),
+            ],
+            options={
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("floor", "section"), name="unique_lease_per_section"
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 6.0 on 2026-10-19 02:39
+
+import re
+
+from django.db import migrations, models
+
+
+def backfill_plates(apps, schema_editor):
+    Ticket = apps.get_model("parking", "Ticket")
+    db = schema_editor.connection.alias
+    batch = []
+    for ticket in Ticket.objects.using(db).only("id", "vehicle_number").iterator():
+        ticket.plate_normalized = re.sub(
+            r"[^A-Z0-9]", "", ticket.vehicle_number.upper()
+        )
+        batch.append(ticket)
+        if len(batch) == 2000:
+            Ticket.objects.using(db).bulk_update(batch, ["plate_normalized"])
+            batch = []
+    Ticket.objects.using(db).bulk_update(batch, ["plate_normalized"])
+
+
+def create_trigram_index(apps, schema_editor):
+    # Postgres only: trigram index over open tickets for fuzzy plate lookup.
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    schema_editor.execute(
+        "CREATE INDEX IF NOT EXISTS parking_ticket_open_plate_trgm "
+        "ON parking_ticket USING gin (plate_normalized gin_trgm_ops) "
+        "WHERE check_out IS NULL"
+    )
+
+
+def drop_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute("DROP INDEX IF EXISTS parking_ticket_open_plate_trgm")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("parking", "0010_slotlease_ticket_edge_ref"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="ticket",
+            name="plate_normalized",
+            field=models.CharField(
+                db_index=True, default="", editable=False, max_length=20
+            ),
+        ),
+        migrations.RunPython(backfill_plates, migrations.RunPython.noop),
+        migrations.RunPython(create_trigram_index, drop_trigram_index),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 6.0 on 2026-10-19 02:43
+
+import parking.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("parking", "0011_ticket_plate_normalized"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="ticket",
+            name="qr_code",
+            field=models.ImageField(
+                blank=True, null=True, upload_to=parking.models.qr_upload_to
+            ),
+        ),
+    ]
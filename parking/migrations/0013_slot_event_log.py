@@ -0,0 +1,88 @@
+# Generated by Django 6.0 on 2026-10-19 02:46
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def baseline_snapshot(apps, schema_editor):
+    """Current occupancy as the starting point for event replay."""
+    Slot = apps.get_model("parking", "Slot")
+    OccupancySnapshot = apps.get_model("parking", "OccupancySnapshot")
+    db = schema_editor.connection.alias
+    bits = 0
+    for slot_id in (
+        Slot.objects.using(db).filter(is_available=False).values_list("id", flat=True)
+    ):
+        bits |= 1 << slot_id
+    OccupancySnapshot.objects.using(db).create(
+        at=django.utils.timezone.now(),
+        last_event_id=0,
+        occupied=bits.to_bytes((bits.bit_length() + 7) // 8, "little"),
+        blocked=b"",
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("parking", "0012_ticket_qr_code_sharded"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="OccupancySnapshot",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("at", models.DateTimeField(db_index=True)),
+                ("last_event_id", models.BigIntegerField()),
+                ("occupied", models.BinaryField()),
+                ("blocked", models.BinaryField()),
+            ],
+        ),
+        migrations.CreateModel(
+            name="SlotEvent",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("slot_id", models.BigIntegerField()),
+                (
+                    "kind",
+                    models.CharField(
+                        choices=[
+                            ("ALLOCATE", "Allocated"),
+                            ("RELEASE", "Released"),
+                            ("BLOCK", "Blocked"),
+                            ("UNBLOCK", "Unblocked"),
+                        ],
+                        max_length=8,
+                    ),
+                ),
+                (
+                    "at",
+                    models.DateTimeField(
+                        db_index=True, default=django.utils.timezone.now
+                    ),
+                ),
+            ],
+        ),
+        migrations.RunPython(
+            baseline_snapshot,
+            migrations.RunPython.noop,
+            hints={"model_name": "occupancysnapshot"},
+        ),
+    ]
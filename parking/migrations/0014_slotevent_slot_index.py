@@ -0,0 +1,19 @@
+# Generated by Django 6.0 on 2026-10-19 02:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("parking", "0013_slot_event_log"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="slotevent",
+            index=models.Index(
+                fields=["slot_id", "at"], name="parking_slo_slot_id_16cb44_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 6.0 on 2026-10-19 03:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("parking", "0014_slotevent_slot_index"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="slot",
+            name="block_pending",
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name="slot",
+            name="is_blocked",
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddIndex(
+            model_name="slot",
+            index=models.Index(
+                condition=models.Q(("is_available", True), ("is_blocked", False)),
+                fields=["vehicle_type", "floor", "section", "slot_number"],
+                name="slot_allocatable_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 6.0 on 2026-10-19 03:09
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("parking", "0015_slot_maintenance"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="ticket",
+            name="check_in",
+            field=models.DateTimeField(
+                db_index=True, default=django.utils.timezone.now
+            ),
+        ),
+    ]
@@ -0,0 +1,132 @@
+# Generated by Django 6.0 on 2026-10-19 03:44
+
+import django.db.models.deletion
+import django.utils.timezone
+import parking.sites
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("parking", "0016_ticket_check_in_index"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Pass",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "site",
+                    models.CharField(
+                        default=parking.sites.get_current_site, max_length=20
+                    ),
+                ),
+                ("holder", models.CharField(max_length=100)),
+                ("vehicle_number", models.CharField(max_length=20)),
+                (
+                    "plate_normalized",
+                    models.CharField(default="", editable=False, max_length=20),
+                ),
+                ("phone", models.CharField(max_length=15)),
+                ("email", models.EmailField(blank=True, max_length=254, null=True)),
+                (
+                    "vehicle_type",
+                    models.CharField(
+                        choices=[("BIKE", "2 Wheeler"), ("CAR", "4 Wheeler")],
+                        max_length=10,
+                    ),
+                ),
+                ("valid_from", models.DateField()),
+                (
+                    "valid_until",
+                    models.DateField(help_text="Last day the pass is valid."),
+                ),
+                ("monthly_fee", models.IntegerField()),
+                ("is_active", models.BooleanField(default=True)),
+                (
+                    "slot",
+                    models.ForeignKey(
+                        blank=True,
+                        help_text="Reserved slot; leave empty for a pooled pass.",
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="passes",
+                        to="parking.slot",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name_plural": "passes",
+            },
+        ),
+        migrations.AddField(
+            model_name="ticket",
+            name="parking_pass",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="tickets",
+                to="parking.pass",
+            ),
+        ),
+        migrations.CreateModel(
+            name="PassInvoice",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("month", models.DateField()),
+                ("days", models.IntegerField()),
+                ("visits", models.IntegerField()),
+                ("amount", models.IntegerField()),
+                ("created_at", models.DateTimeField(default=django.utils.timezone.now)),
+                (
+                    "parking_pass",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.PROTECT,
+                        related_name="invoices",
+                        to="parking.pass",
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name="pass",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("is_active", True)),
+                fields=("site", "plate_normalized"),
+                name="unique_active_pass_per_plate",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="pass",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("is_active", True)),
+                fields=("slot",),
+                name="unique_active_pass_per_slot",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="passinvoice",
+            constraint=models.UniqueConstraint(
+                fields=("parking_pass", "month"), name="unique_pass_invoice_month"
+            ),
+        ),
+    ]
@@ -0,0 +1,60 @@
+# Generated by Django 6.0 on 2026-10-19 04:05
+
+import re
+
+from django.db import migrations
+
+# 0011 ran its backfill and trigram index without model hints, so SiteRouter
+# skipped them on site databases; run them again with hints. Both are
+# idempotent, so databases that already have them only pay a quick scan.
+
+
+def backfill_plates(apps, schema_editor):
+    Ticket = apps.get_model("parking", "Ticket")
+    db = schema_editor.connection.alias
+    tickets = (
+        Ticket.objects.using(db)
+        .filter(plate_normalized="")
+        .exclude(vehicle_number="")
+        .only("id", "vehicle_number")
+    )
+    batch = []
+    for ticket in tickets.iterator():
+        ticket.plate_normalized = re.sub(
+            r"[^A-Z0-9]", "", ticket.vehicle_number.upper()
+        )
+        batch.append(ticket)
+        if len(batch) == 2000:
+            Ticket.objects.using(db).bulk_update(batch, ["plate_normalized"])
+            batch = []
+    Ticket.objects.using(db).bulk_update(batch, ["plate_normalized"])
+
+
+def create_trigram_index(apps, schema_editor):
+    # Postgres only: trigram index over open tickets for fuzzy plate lookup.
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    schema_editor.execute(
+        "CREATE INDEX IF NOT EXISTS parking_ticket_open_plate_trgm "
+        "ON parking_ticket USING gin (plate_normalized gin_trgm_ops) "
+        "WHERE check_out IS NULL"
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("parking", "0017_passes"),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            backfill_plates, migrations.RunPython.noop, hints={"model_name": "ticket"}
+        ),
+        migrations.RunPython(
+            create_trigram_index,
+            migrations.RunPython.noop,
+            hints={"model_name": "ticket"},
+        ),
+    ]
@@ -1,6 +1,24 @@
+import hashlib
+
 from django.db import models
+from django.urls import reverse
 from django.utils import timezone
 
+from .plates import normalize_plate
+from .sites import get_current_site
+from .tokens import checkout_code, sign_checkout_token
+
+
+class Site(models.Model):
+    """A garage. Its floors, slots and tickets live on the database
+    configured for its code in `PARKING_SITE_DATABASES`."""
+
+    code = models.SlugField(max_length=20, unique=True)
+    name = models.CharField(max_length=100)
+
+    def __str__(self):
+        return self.name
+
 
 class ParkingConfig(models.Model):
     VEHICLE_CHOICES = (
@@ -8,18 +26,37 @@ class ParkingConfig(models.Model):
         ("CAR", "4 Wheeler"),
     )
 
-    vehicle_type = models.CharField(max_length=10, choices=VEHICLE_CHOICES, unique=True)
+    site = models.CharField(max_length=20, default=get_current_site)
+    vehicle_type = models.CharField(max_length=10, choices=VEHICLE_CHOICES)
     base_price = models.IntegerField(default=30)
     base_hours = models.IntegerField(default=5)
     extra_per_hour = models.IntegerField(default=5)
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["site", "vehicle_type"], name="unique_site_vehicle_type"
+            ),
+        ]
+
     def __str__(self):
         return self.vehicle_type
 
 
 class Floor(models.Model):
-    number = models.IntegerField(unique=True)
+    site = models.CharField(max_length=20, default=get_current_site)
+    number = models.IntegerField()
     price_increment = models.IntegerField(default=0)  # +5 per floor
+    # Position of the lift/exit on the floor plan, in metres
+    exit_x = models.FloatField(default=0)
+    exit_y = models.FloatField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["site", "number"], name="unique_site_floor"
+            ),
+        ]
 
     def __str__(self):
         return f"Floor {self.number}"
@@ -31,28 +68,273 @@ class Slot(models.Model):
     slot_number = models.IntegerField()
     vehicle_type = models.CharField(max_length=10)
     is_available = models.BooleanField(default=True, db_index=True)
+    # Out of service for maintenance; `block_pending` marks an occupied slot
+    # to be blocked once its ticket checks out (see services/slot_maintenance.py)
+    is_blocked = models.BooleanField(default=False)
+    block_pending = models.BooleanField(default=False)
+    # Position of the slot on the floor plan, in metres
+    x = models.FloatField(default=0)
+    y = models.FloatField(default=0)
 
     class Meta:
         unique_together = ("floor", "section", "slot_number")
         indexes = [
             models.Index(fields=["floor", "vehicle_type", "is_available"]),
+            # Allocator candidates: only free slots in service are indexed
+            models.Index(
+                fields=["vehicle_type", "floor", "section", "slot_number"],
+                condition=models.Q(is_available=True, is_blocked=False),
+                name="slot_allocatable_idx",
+            ),
         ]
 
     def __str__(self):
         return f"{self.floor}-{self.section}-{self.slot_number}"
 
 
+def qr_upload_to(instance, filename):
+    """Shard QR images into qrcodes/ab/cd/ by a hash of the file name, so no
+    directory grows past a few hundred files."""
+    digest = hashlib.sha1(filename.encode()).hexdigest()
+    return f"qrcodes/{digest[:2]}/{digest[2:4]}/{filename}"
+
+
 class Ticket(models.Model):
-    qr_code = models.ImageField(upload_to="qrcodes/", blank=True, null=True)
+    site = models.CharField(max_length=20, default=get_current_site, db_index=True)
+    qr_code = models.ImageField(upload_to=qr_upload_to, blank=True, null=True)
     vehicle_number = models.CharField(max_length=20, db_index=True)
+    # Separator-free plate for lost-token lookup (see services/plate_search.py)
+    plate_normalized = models.CharField(
+        max_length=20, db_index=True, editable=False, default=""
+    )
     phone = models.CharField(max_length=15, db_index=True)
     vehicle_type = models.CharField(max_length=10)
     slot = models.ForeignKey(Slot, on_delete=models.SET_NULL, null=True)
-    check_in = models.DateTimeField(default=timezone.now)
+    check_in = models.DateTimeField(default=timezone.now, db_index=True)
     check_out = models.DateTimeField(null=True, blank=True, db_index=True)
     initial_payment = models.IntegerField(default=0)
     final_amount = models.IntegerField(null=True, blank=True)
     email = models.EmailField(blank=True, null=True, db_index=True)
+    # Reference of a ticket issued offline by an edge gate (see services/edge.py)
+    edge_ref = models.CharField(max_length=40, unique=True, null=True, blank=True)
+    # Stay of a pass holder, paid by the pass (see services/passes.py)
+    parking_pass = models.ForeignKey(
+        "Pass",
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="tickets",
+    )
 
     def __str__(self):
         return f"Token #{self.id}"
+
+    @property
+    def checkout_token(self):
+        """Signed token of the QR checkout link (see parking/tokens.py)."""
+        return sign_checkout_token(self.site, self.id)
+
+    @property
+    def checkout_code(self):
+        """Short code printed on the token for manual checkout."""
+        return checkout_code(self.site, self.id)
+
+    @property
+    def qr_url(self):
+        """Stored QR image if there is one, else the on-demand QR view (open
+        tickets only)."""
+        if self.qr_code:
+            return self.qr_code.url
+        if self.check_out is None:
+            return reverse("ticket_qr", args=[self.checkout_token])
+        return None
+
+    def save(self, *args, **kwargs):
+        self.plate_normalized = normalize_plate(self.vehicle_number)
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and "vehicle_number" in update_fields:
+            kwargs["update_fields"] = {*update_fields, "plate_normalized"}
+        super().save(*args, **kwargs)
+
+
+class Reservation(models.Model):
+    """A pre-booked hold on a slot for the interval [start, end)."""
+
+    HELD = "HELD"
+    FULFILLED = "FULFILLED"
+    EXPIRED = "EXPIRED"
+    CANCELLED = "CANCELLED"
+    STATUS_CHOICES = (
+        (HELD, "Held"),
+        (FULFILLED, "Fulfilled"),
+        (EXPIRED, "Expired (no-show)"),
+        (CANCELLED, "Cancelled"),
+    )
+
+    slot = models.ForeignKey(
+        Slot, on_delete=models.CASCADE, related_name="reservations"
+    )
+    vehicle_number = models.CharField(max_length=20)
+    phone = models.CharField(max_length=15)
+    email = models.EmailField(blank=True, null=True)
+    vehicle_type = models.CharField(max_length=10)
+    start = models.DateTimeField()
+    end = models.DateTimeField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=HELD)
+    ticket = models.OneToOneField(
+        Ticket, on_delete=models.SET_NULL, null=True, blank=True
+    )
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            # Overlap checks for one slot, and the allocator's anti-join
+            models.Index(fields=["slot", "status", "start"]),
+            # No-show expiry sweep
+            models.Index(fields=["status", "start"]),
+        ]
+
+    def __str__(self):
+        return f"Reservation #{self.id} ({self.slot}, {self.start:%d %b %H:%M})"
+
+
+class Pass(models.Model):
+    """A monthly pass. Its vehicle enters and leaves by plate (see
+    services/passes.py) and parks on its reserved `slot`, or on any free slot
+    of its type when it has none (pooled)."""
+
+    site = models.CharField(max_length=20, default=get_current_site)
+    holder = models.CharField(max_length=100)
+    vehicle_number = models.CharField(max_length=20)
+    plate_normalized = models.CharField(max_length=20, editable=False, default="")
+    phone = models.CharField(max_length=15)
+    email = models.EmailField(blank=True, null=True)
+    vehicle_type = models.CharField(
+        max_length=10, choices=ParkingConfig.VEHICLE_CHOICES
+    )
+    slot = models.ForeignKey(
+        Slot,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="passes",
+        help_text="Reserved slot; leave empty for a pooled pass.",
+    )
+    valid_from = models.DateField()
+    valid_until = models.DateField(help_text="Last day the pass is valid.")
+    monthly_fee = models.IntegerField()
+    is_active = models.BooleanField(default=True)
+
+    class Meta:
+        verbose_name_plural = "passes"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["site", "plate_normalized"],
+                condition=models.Q(is_active=True),
+                name="unique_active_pass_per_plate",
+            ),
+            models.UniqueConstraint(
+                fields=["slot"],
+                condition=models.Q(is_active=True),
+                name="unique_active_pass_per_slot",
+            ),
+        ]
+
+    def __str__(self):
+        return f"Pass #{self.id} ({self.vehicle_number})"
+
+    def save(self, *args, **kwargs):
+        self.plate_normalized = normalize_plate(self.vehicle_number)
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and "vehicle_number" in update_fields:
+            kwargs["update_fields"] = {*update_fields, "plate_normalized"}
+        super().save(*args, **kwargs)
+
+
+class PassInvoice(models.Model):
+    """Monthly charge of a pass, from `manage.py bill_passes`."""
+
+    parking_pass = models.ForeignKey(
+        Pass, on_delete=models.PROTECT, related_name="invoices"
+    )
+    month = models.DateField()  # first day of the month
+    days = models.IntegerField()  # days of the month the pass was valid
+    visits = models.IntegerField()
+    amount = models.IntegerField()
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["parking_pass", "month"], name="unique_pass_invoice_month"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.parking_pass} {self.month:%b %Y}: Rs {self.amount}"
+
+
+class SlotLease(models.Model):
+    """Exclusive right of one node (app server or edge gate) to allocate the
+    slots of a floor section until `expires_at`."""
+
+    holder = models.CharField(max_length=64, db_index=True)
+    floor = models.ForeignKey(Floor, on_delete=models.CASCADE)
+    section = models.CharField(max_length=1)
+    vehicle_type = models.CharField(max_length=10)
+    expires_at = models.DateTimeField(db_index=True)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["floor", "section"], name="unique_lease_per_section"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.floor}-{self.section} leased to {self.holder}"
+
+
+class SlotEvent(models.Model):
+    """Append-only history of slot state changes (see services/slot_events.py)."""
+
+    ALLOCATE = "ALLOCATE"
+    RELEASE = "RELEASE"
+    BLOCK = "BLOCK"
+    UNBLOCK = "UNBLOCK"
+    KIND_CHOICES = (
+        (ALLOCATE, "Allocated"),
+        (RELEASE, "Released"),
+        (BLOCK, "Blocked"),
+        (UNBLOCK, "Unblocked"),
+    )
+
+    # Plain id rather than a foreign key: history outlives deleted slots.
+    slot_id = models.BigIntegerField()
+    kind = models.CharField(max_length=8, choices=KIND_CHOICES)
+    at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    class Meta:
+        indexes = [
+            # Latest event of a slot (leak reconciler)
+            models.Index(fields=["slot_id", "at"]),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} slot {self.slot_id} at {self.at:%d %b %H:%M:%S}"
+
+
+class OccupancySnapshot(models.Model):
+    """Compact state of every slot on this database after event `last_event_id`.
+
+    Bit n of `occupied` / `blocked` (little-endian) is slot id n.
+    """
+
+    at = models.DateTimeField(db_index=True)
+    last_event_id = models.BigIntegerField()
+    occupied = models.BinaryField()
+    blocked = models.BinaryField()
+
+    def __str__(self):
+        return f"Snapshot at {self.at:%d %b %H:%M:%S} (event {self.last_event_id})"
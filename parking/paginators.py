@@ -0,0 +1,65 @@
+"""Admin pagination without an exact COUNT(*) over large tables."""
+
+from functools import cached_property
+
+from django.core.paginator import Paginator
+from django.db import connections
+
+# Below this many rows an exact count is cheap enough, and is used.
+EXACT_COUNT_BELOW = 10_000
+
+
+class CappedCount(int):
+    """A count that stopped at `int(self)` rows; shown as "N+"."""
+
+    def __str__(self):
+        return f"{int(self) - 1}+"
+
+
+def estimated_row_count(model, using):
+    """Approximate row count of `model`'s table from catalogue data, or None.
+
+    Postgres keeps an estimate from the last ANALYZE; on SQLite the highest
+    rowid is read from the end of the table's B-tree, close enough for
+    append-mostly tables.
+    """
+    connection = connections[using]
+    table = model._meta.db_table
+    with connection.cursor() as cursor:
+        if connection.vendor == "postgresql":
+            cursor.execute(
+                "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+                [table],
+            )
+        elif connection.vendor == "sqlite":
+            cursor.execute(
+                f"SELECT MAX(_rowid_) FROM {connection.ops.quote_name(table)}"
+            )
+        else:
+            return None
+        row = cursor.fetchone()
+    if row is None or row[0] is None or row[0] < 0:
+        return None
+    return row[0]
+
+
+class EstimatedCountPaginator(Paginator):
+    """Paginator that never counts more than `EXACT_COUNT_BELOW` rows.
+
+    The full table is estimated from catalogue data. Filtered or searched
+    querysets are counted up to `EXACT_COUNT_BELOW` rows only; beyond that
+    the count is a `CappedCount`, shown as "10000+".
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not getattr(queryset, "query", None):
+            return super().count
+        if queryset.query.has_filters():
+            count = queryset[: EXACT_COUNT_BELOW + 1].count()
+            return count if count <= EXACT_COUNT_BELOW else CappedCount(count)
+        estimate = estimated_row_count(queryset.model, queryset.db)
+        if estimate is None or estimate < EXACT_COUNT_BELOW:
+            return super().count
+        return estimate
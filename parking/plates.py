@@ -0,0 +1,31 @@
+"""Vehicle plate cleaning shared by the booking form, tickets and plate search.
+
+Plates are stored as typed (upper-cased, e.g. "RJ14-CC-1234") for display and
+as a normalized form with separators removed ("RJ14CC1234") for matching.
+"""
+
+import re
+
+PLATE_PATTERN = re.compile(r"^[A-Z0-9- ]{3,15}$")
+_SEPARATORS = re.compile(r"[^A-Z0-9]")
+
+
+def clean_plate(value):
+    """Plate as displayed: trimmed and upper-cased."""
+    return (value or "").strip().upper()
+
+
+def normalize_plate(value):
+    """Plate for matching: upper-cased alphanumerics only."""
+    return _SEPARATORS.sub("", clean_plate(value))
+
+
+def is_valid_plate(value):
+    return bool(PLATE_PATTERN.match(value)) and len(normalize_plate(value)) >= 3
+
+
+def trigrams(value):
+    """Character trigrams of a normalized plate, padded so short plates and
+    plate prefixes still produce grams."""
+    padded = f"  {value} "
+    return {padded[i : i + 3] for i in range(len(padded) - 2)}
@@ -0,0 +1,120 @@
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+from django.db import connections
+
+from .sites import site_database, site_databases
+
+# Per-site data; everything else (Site, auth, sessions, admin) lives on default.
+SITE_MODELS = {
+    "floor",
+    "slot",
+    "ticket",
+    "parkingconfig",
+    "reservation",
+    "pass",
+    "passinvoice",
+    "slotlease",
+    "slotevent",
+    "occupancysnapshot",
+}
+
+
+# Set by `replica_reads` around read-only views.
+_replica_reads = ContextVar("parking_replica_reads", default=False)
+# Per-request {"pinned": bool, "wrote": bool}, set by ReplicaMiddleware.
+request_state = ContextVar("parking_replica_request", default=None)
+
+
+def _is_site_model(model):
+    return model._meta.app_label == "parking" and model._meta.model_name in SITE_MODELS
+
+
+def _primary_of(alias):
+    for primary, replicas in settings.DATABASE_REPLICAS.items():
+        if alias in replicas:
+            return primary
+    return alias
+
+
+@contextmanager
+def use_replicas():
+    token = _replica_reads.set(True)
+    try:
+        yield
+    finally:
+        _replica_reads.reset(token)
+
+
+def replica_reads(view):
+    """Let a read-only view read from the replicas in `DATABASE_REPLICAS`."""
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        with use_replicas():
+            return view(request, *args, **kwargs)
+
+    return wrapper
+
+
+class SiteRouter:
+    """Shard per-site parking data across databases.
+
+    Rows of the current site's models are read and written on the alias
+    configured for it in `PARKING_SITE_DATABASES`; sites sharing an alias
+    form a site group. Existing instances stay on the database they came
+    from (their primary, if they were read from a replica).
+    """
+
+    def _db_for(self, model, **hints):
+        if not _is_site_model(model):
+            return None
+        instance = hints.get("instance")
+        if instance is not None and instance._state.db:
+            return _primary_of(instance._state.db)
+        return site_database()
+
+    def db_for_read(self, model, **hints):
+        """The primary, or one of its replicas inside `replica_reads` views.
+
+        Reads stay on the primary inside transactions (so
+        `select_for_update` locks the real rows) and for clients that wrote
+        within the last `READ_YOUR_WRITES_SECONDS`.
+        """
+        instance = hints.get("instance")
+        if instance is not None and instance._state.db:
+            return instance._state.db  # related rows come from the same copy
+        primary = self._db_for(model, **hints)
+        # Only site data may be read from a replica: the shared cache,
+        # sessions and auth must never be stale
+        if primary is None or not _replica_reads.get():
+            return primary
+        state = request_state.get()
+        if state and state["pinned"]:
+            return primary
+        replicas = settings.DATABASE_REPLICAS.get(primary)
+        if not replicas or connections[primary].in_atomic_block:
+            return primary
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        state = request_state.get()
+        if state is not None:
+            state["wrote"] = True
+        return self._db_for(model, **hints)
+
+    def allow_relation(self, obj1, obj2, **hints):
+        if _is_site_model(type(obj1)) and _is_site_model(type(obj2)):
+            return _primary_of(obj1._state.db) == _primary_of(obj2._state.db)
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        db = _primary_of(db)  # replicas carry their primary's schema
+        if db == "default":
+            return None
+        if db in site_databases():
+            return app_label == "parking" and model_name in SITE_MODELS
+        return None
@@ -0,0 +1,6 @@
+from django.dispatch import Signal
+
+# Sent once the transaction that changed slot states commits, with
+# `events` ([(slot_id, kind, at)], kinds as in SlotEvent) and `using`
+# (the database alias). Lets caches follow occupancy without polling.
+slot_state_changed = Signal()
@@ -0,0 +1,62 @@
+"""Current-site resolution for multi-garage deployments.
+
+Each request runs on behalf of one garage ("site"). The site's code selects
+the database holding its floors, slots and tickets (see
+`parking.routers.SiteRouter`) and scopes queries on shared databases.
+"""
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.http import Http404
+
+_current_site = ContextVar("parking_site", default=None)
+
+
+def get_current_site():
+    return _current_site.get() or settings.PARKING_DEFAULT_SITE
+
+
+def site_database(site=None):
+    """Database alias holding the data of `site` (default: the current site)."""
+    return settings.PARKING_SITE_DATABASES.get(site or get_current_site(), "default")
+
+
+def site_codes():
+    return list(settings.PARKING_SITE_DATABASES) or [settings.PARKING_DEFAULT_SITE]
+
+
+def site_databases():
+    """Distinct database aliases holding site data."""
+    return sorted({site_database(code) for code in site_codes()})
+
+
+@contextmanager
+def use_site(code):
+    token = _current_site.set(code)
+    try:
+        yield code
+    finally:
+        _current_site.reset(token)
+
+
+class SiteMiddleware:
+    """Resolve the site from the `X-Parking-Site` header (gate kiosks), then
+    the request host via `PARKING_SITE_HOSTS`, then `PARKING_DEFAULT_SITE`.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        code = request.META.get(
+            "HTTP_X_PARKING_SITE"
+        ) or settings.PARKING_SITE_HOSTS.get(
+            request.get_host().split(":")[0], settings.PARKING_DEFAULT_SITE
+        )
+        if code not in site_codes():
+            raise Http404(f"Unknown site {code!r}")
+        request.site = code
+        with use_site(code):
+            return self.get_response(request)
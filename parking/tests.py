@@ -1,3 +1,1176 @@
-from django.test import TestCase
+import json
+import logging
+import math
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.core.management import call_command
+from django.db import connections, router
+from django.test import Client, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from services import forecasting, passes, plate_search, slot_leases
+from services.closeout import Closeout
+from services.edge import EdgeJournal, EdgeSync
+from services.qr_generator import generate_and_save_qr
+from services.qr_storage import QRStorage
+from services.render_pool import RenderPool, _ping
+from services.slot_allocator import SlotAllocator
+from services.slot_maintenance import SlotMaintenance
+from services.ticketing import TicketService
+
+from .admission import TokenBucket
+from .log_handlers import JsonFormatter, QueuedFileHandler
+from .paginators import EstimatedCountPaginator
+from .models import Floor, Pass, Reservation, Slot, SlotEvent, SlotLease, Ticket
+from .routers import SiteRouter, use_replicas
+from .sites import use_site
+
+
+# The threads below share one process, and so a local cache; SQLite's
+# in-memory test database fails concurrent reads of the cache table instead
+# of waiting for the lock
+@override_settings(
+    QR_STORE_FILES=False,
+    CACHES={
+        "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+        "shared": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "shared",
+        },
+    },
+)
+class IdempotentBookingTests(TransactionTestCase):
+    """Duplicate booking submissions must open one ticket and burn one slot."""
+
+    def setUp(self):
+        for cache in caches.all():
+            cache.clear()
+        with open(os.devnull, "w") as devnull:
+            call_command(
+                "init_parking_data", floors=1, slots_per_section=3, stdout=devnull
+            )
+        self.slot = Slot.objects.filter(vehicle_type="CAR").order_by("id").first()
+        self.url = reverse("vehicle_form", args=[self.slot.id])
+        self.data = {
+            "vehicle_number": "RJ14-CC-1234",
+            "phone": "+919876543210",
+            "email": "driver@example.com",
+            "initial_payment": "0",
+            "nonce": "3f1c2d4e5a6b7c8d9e0f1a2b3c4d5e6f",
+        }
+
+    def _post_in_parallel(self, copies, **headers):
+        barrier = threading.Barrier(copies)
+        responses = [None] * copies
+
+        def submit(index):
+            barrier.wait()
+            try:
+                responses[index] = Client().post(self.url, self.data, **headers)
+            finally:
+                connections.close_all()
+
+        threads = [
+            threading.Thread(target=submit, args=(index,)) for index in range(copies)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return responses
+
+    def test_parallel_duplicates_open_one_ticket(self):
+        responses = self._post_in_parallel(4)
+
+        self.assertEqual([r.status_code for r in responses], [200] * 4)
+        self.assertEqual(len({r.content for r in responses}), 1)
+        self.assertEqual(Ticket.objects.count(), 1)
+        self.assertEqual(Slot.objects.filter(is_available=False).count(), 1)
+
+    def test_retry_returns_original_ticket(self):
+        first = self.client.post(self.url, self.data)
+        retry = self.client.post(self.url, self.data)
+
+        self.assertEqual(retry.status_code, 200)
+        self.assertEqual(retry.content, first.content)
+        self.assertEqual(Ticket.objects.count(), 1)
+
+    def test_header_key_takes_precedence(self):
+        del self.data["nonce"]
+        responses = self._post_in_parallel(3, HTTP_IDEMPOTENCY_KEY="retry-1")
+
+        self.assertEqual(len({r.content for r in responses}), 1)
+        self.assertEqual(Ticket.objects.count(), 1)
+
+    def test_key_reused_for_other_data_is_refused(self):
+        self.client.post(self.url, self.data)
+        other = dict(self.data, vehicle_number="RJ14-CC-9999")
+        response = self.client.post(self.url, other)
+
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(Ticket.objects.count(), 1)
+
+    def test_new_nonce_books_again(self):
+        self.client.post(self.url, self.data)
+        free = Slot.objects.filter(vehicle_type="CAR", is_available=True).first()
+        self.client.post(
+            reverse("vehicle_form", args=[free.id]), dict(self.data, nonce="another")
+        )
+
+        self.assertEqual(Ticket.objects.count(), 2)
+
+
+@override_settings(QR_STORE_FILES=False)
+class TicketAccessTests(TransactionTestCase):
+    """Ticket pages and manual checkout need the signed token or the code."""
+
+    def setUp(self):
+        for cache in caches.all():
+            cache.clear()
+        with open(os.devnull, "w") as devnull:
+            call_command(
+                "init_parking_data", floors=1, slots_per_section=3, stdout=devnull
+            )
+        slot = Slot.objects.filter(vehicle_type="CAR").first()
+        slot.is_available = False
+        slot.save()
+        self.ticket = Ticket.objects.create(
+            vehicle_number="RJ14-CC-1234",
+            phone="9876543210",
+            vehicle_type="CAR",
+            slot=slot,
+        )
+
+    def test_ticket_id_alone_is_refused(self):
+        for name in ("token_success", "download_pdf", "ticket_receipt", "ticket_qr"):
+            with self.subTest(name):
+                response = self.client.get(reverse(name, args=[str(self.ticket.id)]))
+                self.assertEqual(response.status_code, 404)
+
+    def test_signed_token_opens_ticket_pages(self):
+        token = self.ticket.checkout_token
+        response = self.client.get(reverse("ticket_qr", args=[token]))
+
+        self.assertEqual(response["Content-Type"], "image/png")
+        self.assertEqual(
+            self.client.get(reverse("download_pdf", args=[token])).status_code, 200
+        )
+
+    def test_manual_checkout_takes_code_not_id(self):
+        refused = self.client.post(reverse("checkout"), {"token": str(self.ticket.id)})
+        code = self.ticket.checkout_code.lower()
+        response = self.client.post(reverse("checkout"), {"token": code})
+
+        self.assertEqual(refused.status_code, 404)
+        self.assertContains(response, "Checkout Completed")
+
+    @override_settings(GATE_RECEIPT_FORMATS={"gate-1": "escpos99"})
+    def test_unknown_gate_format_falls_back_to_default(self):
+        slot = Slot.objects.filter(vehicle_type="CAR", is_available=True).first()
+        response = self.client.post(
+            reverse("vehicle_form", args=[slot.id]),
+            {
+                "vehicle_number": "RJ14-CC-9999",
+                "phone": "9876543210",
+                "email": "driver@example.com",
+                "initial_payment": "0",
+            },
+            HTTP_X_PARKING_GATE="gate-1",
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn("receipt_url", response.context)
+        self.assertTrue(response.context["pdf_data_url"])
+
+
+@override_settings(PASS_GATE_KEYS={"gate-1": "s3cret"})
+class PassGateTests(TransactionTestCase):
+    """Pass entry and exit answer only gates with a valid key."""
+
+    def setUp(self):
+        passes._caches.clear()
+        with open(os.devnull, "w") as devnull:
+            call_command(
+                "init_parking_data", floors=1, slots_per_section=3, stdout=devnull
+            )
+        today = timezone.localdate()
+        Pass.objects.create(
+            holder="A. Commuter",
+            vehicle_number="KA01AB1234",
+            phone="9876543210",
+            vehicle_type="CAR",
+            valid_from=today,
+            valid_until=today,
+            monthly_fee=3000,
+        )
+
+    def _read(self, name, **headers):
+        return self.client.post(reverse(name), {"plate": "KA01AB1234"}, **headers)
+
+    def test_reads_without_valid_key_are_refused(self):
+        for headers in (
+            {},
+            {"HTTP_X_PARKING_GATE": "gate-1"},
+            {"HTTP_X_PARKING_GATE": "gate-1", "HTTP_X_PARKING_GATE_KEY": "guess"},
+            {"HTTP_X_PARKING_GATE": "gate-2", "HTTP_X_PARKING_GATE_KEY": "s3cret"},
+        ):
+            with self.subTest(headers):
+                self.assertEqual(self._read("pass_entry", **headers).status_code, 401)
+                self.assertEqual(self._read("pass_exit", **headers).status_code, 401)
+        self.assertFalse(Ticket.objects.exists())
+
+    def test_gate_with_key_opens_and_closes_stay(self):
+        headers = {"HTTP_X_PARKING_GATE": "gate-1", "HTTP_X_PARKING_GATE_KEY": "s3cret"}
+
+        self.assertTrue(self._read("pass_entry", **headers).json()["open"])
+        self.assertTrue(self._read("pass_exit", **headers).json()["open"])
+        self.assertIsNotNone(Ticket.objects.get().check_out)
+
+    def test_repeated_entry_read_returns_open_stay(self):
+        headers = {"HTTP_X_PARKING_GATE": "gate-1", "HTTP_X_PARKING_GATE_KEY": "s3cret"}
+        first = self._read("pass_entry", **headers).json()
+        second = self._read("pass_entry", **headers).json()
+
+        self.assertEqual(second["ticket"], first["ticket"])
+        self.assertEqual(Ticket.objects.count(), 1)
+        self.assertEqual(Slot.objects.filter(is_available=False).count(), 1)
+
+
+class LeastLoadedFloorTests(TransactionTestCase):
+    """The least-loaded floor strategy only hands out allocatable slots."""
+
+    def setUp(self):
+        with open(os.devnull, "w") as devnull:
+            call_command(
+                "init_parking_data", floors=2, slots_per_section=3, stdout=devnull
+            )
+        self.floor1 = Floor.objects.get(number=1)
+        # Floor 1 has one car slot of section A taken, floor 2 none
+        taken = Slot.objects.filter(floor=self.floor1, section="A").first()
+        Slot.objects.filter(id=taken.id).update(is_available=False)
+
+    def _allocate(self):
+        return SlotAllocator.allocate(
+            "CAR", self.floor1, "A", strategy="least_loaded_floor"
+        )
+
+    def test_picks_floor_with_most_free_slots(self):
+        self.assertEqual(self._allocate().floor.number, 2)
+
+    def test_skips_floor_whose_free_slots_are_held(self):
+        today = timezone.localdate()
+        for slot in Slot.objects.filter(floor__number=2, section="A"):
+            Pass.objects.create(
+                holder="A. Commuter",
+                vehicle_number=f"KA01AB{slot.id:04d}",
+                phone="9876543210",
+                vehicle_type="CAR",
+                slot=slot,
+                valid_from=today,
+                valid_until=today,
+                monthly_fee=3000,
+            )
+
+        slot = self._allocate()
+        self.assertEqual(slot.floor, self.floor1)
+        self.assertEqual(slot.section, "A")
+
+
+class EdgeCheckoutReplayTests(TransactionTestCase):
+    """Replayed edge checkouts free a slot only once nothing else is on it."""
+
+    def setUp(self):
+        with open(os.devnull, "w") as devnull:
+            call_command(
+                "init_parking_data", floors=1, slots_per_section=3, stdout=devnull
+            )
+        self.slot = Slot.objects.filter(vehicle_type="CAR").first()
+        Slot.objects.filter(id=self.slot.id).update(is_available=False)
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.journal = EdgeJournal(os.path.join(directory.name, "journal.sqlite3"))
+
+    def _ticket(self, **fields):
+        return Ticket.objects.create(
+            vehicle_number="KA01AB1234",
+            phone="9876543210",
+            vehicle_type="CAR",
+            slot=self.slot,
+            **fields,
+        )
+
+    def _replay_checkout(self, ref):
+        self.journal.append(
+            "CHECKOUT",
+            ref,
+            {"check_out": timezone.now().isoformat(), "final_amount": 50},
+        )
+        EdgeSync(self.journal, "gate-1").replay()
+        self.slot.refresh_from_db()
+
+    def test_checkout_frees_slot(self):
+        self._ticket(edge_ref="edge-1")
+        self._replay_checkout("edge-1")
+
+        self.assertTrue(self.slot.is_available)
+
+    def test_slot_with_other_open_ticket_stays_taken(self):
+        self._ticket()
+        self._ticket(edge_ref="edge-1")
+        self._replay_checkout("edge-1")
+
+        self.assertIsNotNone(Ticket.objects.get(edge_ref="edge-1").check_out)
+        self.assertFalse(self.slot.is_available)
+
+
+@override_settings(INSTRUMENTATION_ENABLED=True, METRICS_TOKEN="s3cret")
+class MetricsAccessTests(TransactionTestCase):
+    """/metrics/ is for staff, allow-listed scrapers and token bearers."""
+
+    def setUp(self):
+        for cache in caches.all():
+            cache.clear()
+        with open(os.devnull, "w") as devnull:
+            call_command(
+                "init_parking_data", floors=1, slots_per_section=3, stdout=devnull
+            )
+
+    def _scrape(self, **headers):
+        return self.client.get(reverse("metrics"), **headers)
+
+    def test_anonymous_scrape_is_refused(self):
+        self.assertEqual(self._scrape().status_code, 403)
+        self.assertEqual(
+            self._scrape(HTTP_AUTHORIZATION="Bearer guess").status_code, 403
+        )
+
+    def test_token_staff_and_allowed_address_are_served(self):
+        self.assertEqual(
+            self._scrape(HTTP_AUTHORIZATION="Bearer s3cret").status_code, 200
+        )
+        with self.settings(METRICS_ALLOWED_ADDRESSES=("127.0.0.1",)):
+            self.assertEqual(self._scrape().status_code, 200)
+        self.client.force_login(
+            User.objects.create_user("ops", password="x", is_staff=True)
+        )
+        self.assertEqual(self._scrape().status_code, 200)
+
+    def test_leaked_slots_count_is_shared_between_scrapes(self):
+        gauge = 'parking_leaked_slots{database="default"}'
+        self.assertContains(
+            self._scrape(HTTP_AUTHORIZATION="Bearer s3cret"), f"{gauge} 0"
+        )
+        Slot.objects.filter(id=Slot.objects.first().id).update(is_available=False)
+
+        self.assertContains(
+            self._scrape(HTTP_AUTHORIZATION="Bearer s3cret"), f"{gauge} 0"
+        )
+        caches["shared"].clear()
+        self.assertContains(
+            self._scrape(HTTP_AUTHORIZATION="Bearer s3cret"), f"{gauge} 1"
+        )
+
+
+@override_settings(QR_STORE_FILES=False)
+class ReservationTests(TransactionTestCase):
+    """Customers reserve a section online and check in with the code."""
+
+    def setUp(self):
+        for cache in caches.all():
+            cache.clear()
+        with open(os.devnull, "w") as devnull:
+            call_command(
+                "init_parking_data", floors=1, slots_per_section=3, stdout=devnull
+            )
+        start = timezone.localtime() + timedelta(minutes=5)
+        self.data = {
+            "vehicle_type": "CAR",
+            "floor": "1",
+            "section": "a",
+            "start": f"{start:%Y-%m-%dT%H:%M}",
+            "end": f"{start + timedelta(hours=2):%Y-%m-%dT%H:%M}",
+            "vehicle_number": "RJ14-CC-1234",
+            "phone": "9876543210",
+            "email": "",
+        }
+
+    def _reserve(self):
+        response = self.client.post(reverse("reserve"), self.data)
+        self.assertEqual(response.status_code, 200)
+        return response.context["reservation"], response.context["code"]
+
+    def test_reserve_holds_slot_of_section(self):
+        reservation, code = self._reserve()
+
+        self.assertEqual(reservation.status, Reservation.HELD)
+        self.assertEqual(reservation.slot.section, "A")
+        self.assertTrue(code.startswith(f"{reservation.id}-"))
+
+    def test_fully_held_section_is_refused(self):
+        for _ in range(3):
+            self._reserve()
+        response = self.client.post(reverse("reserve"), self.data)
+
+        self.assertContains(response, "already held")
+        self.assertEqual(Reservation.objects.count(), 3)
+
+    def test_check_in_opens_ticket_on_held_slot(self):
+        reservation, code = self._reserve()
+        response = self.client.post(reverse("reservation_check_in"), {"code": code})
+
+        self.assertEqual(response.status_code, 200)
+        reservation.refresh_from_db()
+        self.assertEqual(reservation.status, Reservation.FULFILLED)
+        self.assertEqual(reservation.ticket.slot_id, reservation.slot_id)
+        self.assertFalse(Slot.objects.get(id=reservation.slot_id).is_available)
+
+    def test_check_in_needs_genuine_unused_code(self):
+        reservation, code = self._reserve()
+        url = reverse("reservation_check_in")
+
+        self.assertEqual(
+            self.client.post(url, {"code": str(reservation.id)}).status_code, 404
+        )
+        self.client.post(url, {"code": code})
+        self.assertEqual(self.client.post(url, {"code": code}).status_code, 404)
+        self.assertEqual(Ticket.objects.count(), 1)
+
+    def test_occupied_slot_is_reported(self):
+        reservation, code = self._reserve()
+        Slot.objects.filter(id=reservation.slot_id).update(is_available=False)
+        response = self.client.post(reverse("reservation_check_in"), {"code": code})
+
+        self.assertEqual(response.status_code, 409)
+        self.assertFalse(Ticket.objects.exists())
+
+
+class DoubleCheckoutTests(TransactionTestCase):
+    """A ticket is billed, and its slot freed, by one checkout only."""
+
+    def setUp(self):
+        with open(os.devnull, "w") as devnull:
+            call_command(
+                "init_parking_data", floors=1, slots_per_section=3, stdout=devnull
+            )
+        self.ticket = TicketService.open(
+            "CAR",
+            Floor.objects.get(number=1),
+            "A",
+            vehicle_number="KA01AB1234",
+            phone="9876543210",
+        )
+
+    def test_second_checkout_of_same_ticket_is_refused(self):
+        first = Ticket.objects.get(id=self.ticket.id)
+        second = Ticket.objects.get(id=self.ticket.id)
+
+        self.assertIsNotNone(TicketService.check_out(first))
+        # The freed slot is taken again before the late checkout lands
+        Slot.objects.filter(id=self.ticket.slot_id).update(is_available=False)
+        self.assertIsNone(TicketService.check_out(second))
+
+        self.assertFalse(Slot.objects.get(id=self.ticket.slot_id).is_available)
+        self.assertEqual(
+            Ticket.objects.get(id=self.ticket.id).check_out, first.check_out
+        )
+        self.assertEqual(
+            SlotEvent.objects.filter(
+                slot_id=self.ticket.slot_id, kind=SlotEvent.RELEASE
+            ).count(),
+            1,
+        )
+
+
+@override_settings(DATABASE_REPLICAS={"default": ["replica"]})
+class ReplicaRoutingTests(TransactionTestCase):
+    """Inside `replica_reads` views only site data is read from replicas."""
+
+    def test_site_models_read_from_replica(self):
+        with use_replicas():
+            self.assertEqual(SiteRouter().db_for_read(Slot), "replica")
+        self.assertEqual(SiteRouter().db_for_read(Slot), "default")
+
+    def test_other_models_stay_on_default(self):
+        with use_replicas():
+            self.assertIsNone(SiteRouter().db_for_read(User))
+            self.assertEqual(
+                router.db_for_read(caches["shared"].cache_model_class), "default"
+            )
+
+
+class QueuedFileHandlerTests(TransactionTestCase):
+    """Queued log lines reach the file, also after logrotate moved it."""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, "parking.log")
+        self.logger = logging.getLogger("parking.tests.queued")
+        self.logger.propagate = False
+        self.addCleanup(setattr, self.logger, "propagate", True)
+
+    def _handler(self, **options):
+        handler = QueuedFileHandler(self.path, flush_interval=0.01, **options)
+        handler.setFormatter(JsonFormatter())
+        self.logger.addHandler(handler)
+        self.addCleanup(self.logger.removeHandler, handler)
+        return handler
+
+    def _messages(self, path):
+        with open(path) as log:
+            return [json.loads(line)["message"] for line in log]
+
+    def test_lines_are_written_and_file_reopened_after_move(self):
+        handler = self._handler()
+        self.logger.warning("Ticket %s", 1)
+        handler._stop_writer()  # writes out the queue; the rest is by hand
+        os.rename(self.path, self.path + ".1")
+        self.logger.warning("Ticket %s", 2)
+        handler._write_queued()
+        handler.close()
+
+        self.assertEqual(self._messages(self.path + ".1"), ["Ticket 1"])
+        self.assertEqual(self._messages(self.path), ["Ticket 2"])
+
+    def test_full_queue_drops_records(self):
+        handler = self._handler(queue_size=1)
+        handler._stop_writer()
+        for i in range(3):
+            self.logger.warning("Ticket %s", i)
+        handler.close()
+
+        self.assertEqual(handler.dropped, 2)
+        self.assertEqual(self._messages(self.path), ["Ticket 0"])
+
+
+@mock.patch("parking.paginators.EXACT_COUNT_BELOW", 5)
+class EstimatedCountPaginatorTests(TransactionTestCase):
+    """Admin change lists never count more rows than they must."""
+
+    def setUp(self):
+        with open(os.devnull, "w") as devnull:
+            call_command(
+                "init_parking_data", floors=1, slots_per_section=3, stdout=devnull
+            )
+        self.last_id = Slot.objects.order_by("-id").values_list("id", flat=True)[0]
+        # The estimate reads the highest rowid, so it misses deleted rows
+        Slot.objects.order_by("id").first().delete()
+
+    def _count(self, queryset):
+        return EstimatedCountPaginator(queryset.order_by("id"), 10).count
+
+    def test_full_table_is_estimated(self):
+        self.assertEqual(self._count(Slot.objects.all()), self.last_id)
+
+    def test_filtered_count_stops_at_cap(self):
+        count = self._count(Slot.objects.filter(vehicle_type="CAR"))
+
+        self.assertEqual(count, 6)
+        self.assertEqual(str(count), "5+")
+
+    def test_small_filtered_count_is_exact(self):
+        queryset = Slot.objects.filter(vehicle_type="CAR", section="B")
+
+        self.assertEqual(self._count(queryset), queryset.count())
+        self.assertEqual(str(self._count(queryset)), str(queryset.count()))
+
+    def test_ticket_change_list_shows_capped_count(self):
+        slot = Slot.objects.filter(vehicle_type="CAR").first()
+        for i in range(7):
+            Ticket.objects.create(
+                vehicle_number=f"KA01AB{i:04d}",
+                phone="9876543210",
+                vehicle_type="CAR",
+                slot=slot,
+            )
+        self.client.force_login(
+            User.objects.create_superuser("admin", password="x", email="")
+        )
+        response = self.client.get(
+            reverse("admin:parking_ticket_changelist"), {"vehicle_type__exact": "CAR"}
+        )
+
+        self.assertContains(response, "5+ tickets")
+
+
+@override_settings(QR_STORE_FILES=False)
+class CheckoutTests(TransactionTestCase):
+    """Checkout bills the ticket once and frees, or blocks, its slot."""
+
+    def setUp(self):
+        for cache in caches.all():
+            cache.clear()
+        with open(os.devnull, "w") as devnull:
+            call_command(
+                "init_parking_data", floors=1, slots_per_section=3, stdout=devnull
+            )
+        self.ticket = TicketService.open(
+            "CAR",
+            Floor.objects.get(number=1),
+            "A",
+            vehicle_number="KA01AB1234",
+            phone="9876543210",
+            check_in=timezone.now() - timedelta(hours=2, minutes=59),
+        )
+        self.url = reverse("auto_checkout", args=[self.ticket.checkout_token])
+
+    def _events(self, kind):
+        return SlotEvent.objects.filter(slot_id=self.ticket.slot_id, kind=kind)
+
+    def test_qr_checkout_bills_ticket_and_frees_slot(self):
+        response = self.client.get(self.url)
+
+        self.assertContains(response, "Checkout Completed")
+        self.ticket.refresh_from_db()
+        self.assertIsNotNone(self.ticket.check_out)
+        self.assertEqual(self.ticket.final_amount, response.context["total"])
+        self.assertEqual(response.context["hours"], 3)
+        self.assertTrue(Slot.objects.get(id=self.ticket.slot_id).is_available)
+        self.assertEqual(self._events(SlotEvent.RELEASE).count(), 1)
+
+    def test_used_token_is_refused(self):
+        self.client.get(self.url)
+        check_out = Ticket.objects.get(id=self.ticket.id).check_out
+
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+        # Also once the used-token marks are gone, from the closed ticket
+        for cache in caches.all():
+            cache.clear()
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+        self.assertEqual(Ticket.objects.get(id=self.ticket.id).check_out, check_out)
+        self.assertEqual(self._events(SlotEvent.RELEASE).count(), 1)
+
+    def test_slot_waiting_for_maintenance_is_blocked(self):
+        slots = Slot.objects.filter(id=self.ticket.slot_id)
+        self.assertEqual(SlotMaintenance.block(slots), (0, 1))
+
+        self.client.get(self.url)
+
+        slot = slots.get()
+        self.assertTrue(slot.is_blocked)
+        self.assertFalse(slot.block_pending)
+        self.assertEqual(self._events(SlotEvent.BLOCK).count(), 1)
+        allocated = SlotAllocator.allocate(
+            "CAR", slot.floor, "A", strategy="lowest_number"
+        )
+        self.assertNotEqual(allocated.id, slot.id)
+
+
+@override_settings(
+    QR_STORE_FILES=False,
+    PARKING_SITE_DATABASES={"main": "default", "north": "north"},
+)
+class SiteTests(TransactionTestCase):
+    """Requests run for one site, on that site's database."""
+
+    def setUp(self):
+        for cache in caches.all():
+            cache.clear()
+        with open(os.devnull, "w") as devnull:
+            call_command(
+                "init_parking_data", floors=1, slots_per_section=3, stdout=devnull
+            )
+        self.ticket = TicketService.open(
+            "CAR",
+            Floor.objects.get(number=1),
+            "A",
+            vehicle_number="KA01AB1234",
+            phone="9876543210",
+        )
+
+    def test_site_models_are_routed_to_site_database(self):
+        with use_site("north"):
+            self.assertEqual(router.db_for_write(Slot), "north")
+            self.assertEqual(router.db_for_read(Ticket), "north")
+            self.assertEqual(router.db_for_write(User), "default")
+        self.assertEqual(router.db_for_write(Slot), "default")
+        self.assertEqual(self.ticket.site, "main")
+
+    def test_unknown_site_is_refused(self):
+        response = self.client.get(reverse("home"), HTTP_X_PARKING_SITE="south")
+
+        self.assertEqual(response.status_code, 404)
+
+    def test_token_is_only_valid_at_its_site(self):
+        url = reverse("auto_checkout", args=[self.ticket.checkout_token])
+
+        self.assertEqual(
+            self.client.get(url, HTTP_X_PARKING_SITE="north").status_code, 404
+        )
+        self.assertContains(self.client.get(url), "Checkout Completed")
+
+
+class SlotLeaseTests(TransactionTestCase):
+    """Workers allocate from the floor sections leased to them."""
+
+    def setUp(self):
+        slot_leases._held.clear()
+        self.addCleanup(slot_leases._held.clear)
+        with open(os.devnull, "w") as devnull:
+            call_command(
+                "init_parking_data", floors=2, slots_per_section=2, stdout=devnull
+            )
+        self.floor = Floor.objects.get(number=1)
+
+    def _allocate(self):
+        return SlotAllocator.allocate("CAR", self.floor, "A", strategy="leased_section")
+
+    def test_allocations_stay_in_lease_until_it_runs_dry(self):
+        first, second, third = self._allocate(), self._allocate(), self._allocate()
+
+        self.assertEqual(
+            (first.floor_id, first.section), (second.floor_id, second.section)
+        )
+        self.assertNotEqual(
+            (third.floor_id, third.section), (first.floor_id, first.section)
+        )
+        lease = SlotLease.objects.get(holder=slot_leases.current_holder())
+        self.assertEqual(
+            (lease.floor_id, lease.section), (third.floor_id, third.section)
+        )
+
+    def test_section_leased_to_another_worker_is_skipped(self):
+        lease = slot_leases.LeaseCoordinator.acquire("gate-1", "CAR")
+
+        mine = self._allocate()
+        self.assertNotEqual(
+            (mine.floor_id, mine.section), (lease.floor_id, lease.section)
+        )
+        self.assertIsNone(
+            SlotAllocator.allocate(
+                "CAR", lease.floor, lease.section, strategy="lowest_number"
+            )
+        )
+
+
+@override_settings(QR_STORE_FILES=False)
+class PlateLookupTests(TransactionTestCase):
+    """Staff find open tickets by a mistyped plate."""
+
+    def setUp(self):
+        plate_search._indexes.clear()
+        self.addCleanup(plate_search._indexes.clear)
+        with open(os.devnull, "w") as devnull:
+            call_command(
+                "init_parking_data", floors=1, slots_per_section=3, stdout=devnull
+            )
+        floor = Floor.objects.get(number=1)
+        self.ticket = TicketService.open(
+            "CAR", floor, "A", vehicle_number="RJ14-CC-1234", phone="9876543210"
+        )
+        TicketService.open(
+            "CAR", floor, "A", vehicle_number="MH01AB9999", phone="9876543210"
+        )
+        User.objects.create_superuser("admin", "admin@example.com", "pw")
+
+    def _lookup(self, query):
+        return self.client.get(reverse("plate_lookup"), {"q": query})
+
+    def test_near_miss_finds_the_open_ticket(self):
+        self.client.login(username="admin", password="pw")
+
+        candidates = self._lookup("rj14 c1234").json()["candidates"]
+
+        self.assertEqual([c["token"] for c in candidates], [self.ticket.id])
+        self.assertEqual(self._lookup("--").status_code, 400)
+
+    def test_closed_tickets_are_not_offered(self):
+        self.client.login(username="admin", password="pw")
+        self.assertEqual(len(self._lookup("RJ14CC1234").json()["candidates"]), 1)
+
+        TicketService.check_out(self.ticket)
+
+        self.assertEqual(self._lookup("RJ14CC1234").json()["candidates"], [])
+
+    def test_lookup_needs_staff(self):
+        self.assertEqual(self._lookup("RJ14CC1234").status_code, 302)
+
+
+@override_settings(QR_STORE_FILES=True)
+class QRStorageTests(TransactionTestCase):
+    """Stored QR images are sharded by token and purged after checkout."""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.enterContext(self.settings(MEDIA_ROOT=directory.name))
+        with open(os.devnull, "w") as devnull:
+            call_command(
+                "init_parking_data", floors=1, slots_per_section=2, stdout=devnull
+            )
+        floor = Floor.objects.get(number=1)
+        self.tickets = [
+            TicketService.open(
+                "CAR", floor, "A", vehicle_number=plate, phone="9876543210"
+            )
+            for plate in ("KA01AB1234", "KA01AB5678")
+        ]
+        for ticket in self.tickets:
+            generate_and_save_qr(ticket, f"http://testserver/checkout/{ticket.id}/")
+
+    def test_images_are_stored_in_sharded_directories(self):
+        ticket = self.tickets[0]
+
+        self.assertRegex(
+            ticket.qr_code.name,
+            rf"^qrcodes/[0-9a-f]{{2}}/[0-9a-f]{{2}}/qr_{ticket.checkout_token}\.png$",
+        )
+        with open(ticket.qr_code.path, "rb") as image:
+            self.assertTrue(image.read().startswith(b"\x89PNG"))
+
+    def test_purge_removes_only_images_of_old_closed_tickets(self):
+        closed, still_open = self.tickets
+        TicketService.check_out(closed)
+        path = closed.qr_code.path
+
+        self.assertEqual(QRStorage.purge(30), 0)
+        purged = QRStorage.purge(30, now=timezone.now() + timedelta(days=31))
+
+        self.assertEqual(purged, 1)
+        self.assertFalse(os.path.exists(path))
+        closed.refresh_from_db()
+        self.assertFalse(closed.qr_code)
+        still_open.refresh_from_db()
+        self.assertTrue(os.path.exists(still_open.qr_code.path))
+
+
+# One time bucket for the whole test, so only occupancy changes move the ETag
+@override_settings(QR_STORE_FILES=False, SLOT_PAGE_MAX_STALE_SECONDS=10**6)
+class ConditionalSlotPageTests(TransactionTestCase):
+    """Unchanged slot pages are answered with 304 Not Modified."""
+
+    def setUp(self):
+        for cache in caches.all():
+            cache.clear()
+        with open(os.devnull, "w") as devnull:
+            call_command(
+                "init_parking_data", floors=2, slots_per_section=3, stdout=devnull
+            )
+        self.url = reverse("view_slots", args=["car"]) + "?floor=1"
+
+    def _get(self, etag):
+        return self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+
+    def _open(self, floor_number, plate):
+        return TicketService.open(
+            "CAR",
+            Floor.objects.get(number=floor_number),
+            "A",
+            vehicle_number=plate,
+            phone="9876543210",
+        )
+
+    def test_etag_follows_the_floor_occupancy(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("no-cache", response["Cache-Control"])
+        etag = response["ETag"]
+        self.assertEqual(self._get(etag).status_code, 304)
+
+        self._open(2, "KA01AB0002")
+        self.assertEqual(self._get(etag).status_code, 304)
+
+        ticket = self._open(1, "KA01AB0001")
+        response = self._get(etag)
+        self.assertEqual(response.status_code, 200)
+
+        TicketService.check_out(ticket)
+        self.assertEqual(self._get(response["ETag"]).status_code, 200)
+
+
+class LazyImportTests(TransactionTestCase):
+    """Non-web processes load the URLconf without the rendering libraries."""
+
+    def test_urlconf_does_not_import_render_libraries(self):
+        heavy = ("reportlab", "qrcode", "PIL", "numpy")
+        script = (
+            "import sys, django; django.setup(); import django_project.urls; "
+            f"print(','.join(m for m in {heavy!r} if m in sys.modules))"
+        )
+
+        # A fresh interpreter: this one has imported them for other tests
+        result = subprocess.run(
+            [sys.executable, "-c", script],
+            capture_output=True,
+            text=True,
+            check=True,
+            env={
+                **os.environ,
+                "DJANGO_SETTINGS_MODULE": "django_project.settings.test",
+            },
+        )
+
+        self.assertEqual(result.stdout.strip(), "")
+
+
+class RenderPoolTests(TransactionTestCase):
+    """Renders run in worker processes and fall back to inline when saturated."""
+
+    def setUp(self):
+        self.pool = RenderPool(workers=1, max_pending=0, timeout=60)
+        self.addCleanup(self.pool.shutdown)
+
+    def test_render_runs_in_a_worker_process(self):
+        self.assertNotEqual(self.pool.run(_ping), os.getpid())
+
+    def test_saturated_pool_renders_inline(self):
+        self.pool._slots.acquire()
+
+        with self.assertLogs("services.render_pool", "WARNING") as logs:
+            self.assertEqual(self.pool.run(_ping), os.getpid())
+
+        self.assertIn("pool saturated", logs.output[0])
+
+    def test_pool_without_workers_renders_inline(self):
+        self.assertEqual(RenderPool(0, 0, 60).run(_ping), os.getpid())
+
+
+@override_settings(QR_STORE_FILES=False)
+class BulkMaintenanceTests(TransactionTestCase):
+    """Whole floors are blocked at once, occupied slots when they empty."""
+
+    def setUp(self):
+        for cache in caches.all():
+            cache.clear()
+        with open(os.devnull, "w") as devnull:
+            call_command(
+                "init_parking_data", floors=2, slots_per_section=3, stdout=devnull
+            )
+        self.floor = Floor.objects.get(number=1)
+        self.ticket = TicketService.open(
+            "CAR", self.floor, "A", vehicle_number="KA01AB1234", phone="9876543210"
+        )
+
+    def test_block_defers_occupied_slots_and_unblock_restores_service(self):
+        slots = Slot.objects.filter(floor=self.floor)
+
+        blocked, deferred = SlotMaintenance.block(slots)
+
+        self.assertEqual((blocked, deferred), (slots.count() - 1, 1))
+        self.assertEqual(SlotMaintenance.block(slots), (0, 0))
+        self.assertIsNone(
+            SlotAllocator.allocate("CAR", self.floor, "A", strategy="lowest_number")
+        )
+
+        self.assertEqual(SlotMaintenance.unblock(slots), slots.count() - 1)
+        self.assertFalse(slots.filter(block_pending=True).exists())
+        slot = SlotAllocator.allocate("CAR", self.floor, "A", strategy="lowest_number")
+        self.assertEqual(slot.floor_id, self.floor.id)
+
+    def test_admin_action_blocks_selected_slots(self):
+        User.objects.create_superuser("admin", "admin@example.com", "pw")
+        self.client.login(username="admin", password="pw")
+        ids = list(
+            Slot.objects.filter(is_available=True).values_list("id", flat=True)[:3]
+        )
+
+        response = self.client.post(
+            reverse("admin:parking_slot_changelist"),
+            {"action": "block_slots", "_selected_action": ids},
+        )
+
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(
+            set(Slot.objects.filter(is_blocked=True).values_list("id", flat=True)),
+            set(ids),
+        )
+
+
+@override_settings(QR_STORE_FILES=False, CLOSEOUT_AFTER_HOURS=24)
+class CloseoutTests(TransactionTestCase):
+    """Abandoned tickets are billed, closed and their slots freed in batches."""
+
+    def setUp(self):
+        for cache in caches.all():
+            cache.clear()
+        with open(os.devnull, "w") as devnull:
+            call_command(
+                "init_parking_data", floors=1, slots_per_section=10, stdout=devnull
+            )
+        floor = Floor.objects.get(number=1)
+        self.tickets = [
+            TicketService.open(
+                "CAR",
+                floor,
+                "A",
+                vehicle_number=f"KA01AB000{i}",
+                phone="9876543210",
+                initial_payment=50,
+            )
+            for i in range(5)
+        ]
+        # Four abandoned a day or more ago, each for a different stay
+        for hours, ticket in zip((30, 40, 50, 60), self.tickets):
+            Ticket.objects.filter(id=ticket.id).update(
+                check_in=timezone.now() - timedelta(hours=hours)
+            )
+
+    def test_each_ticket_gets_its_own_bill(self):
+        bills = []
+
+        closed, freed, billed = Closeout.run(batch_size=3, report=bills.append)
+
+        self.assertEqual((closed, freed), (4, 4))
+        self.assertEqual(len({bill["total"] for bill in bills}), 4)
+        self.assertEqual(billed, sum(bill["total"] for bill in bills))
+        for bill in bills:
+            ticket = Ticket.objects.get(id=bill["ticket"])
+            self.assertIsNotNone(ticket.check_out)
+            self.assertEqual(ticket.final_amount, bill["total"])
+            self.assertTrue(ticket.slot.is_available)
+        recent = Ticket.objects.get(id=self.tickets[4].id)
+        self.assertIsNone(recent.check_out)
+        self.assertFalse(recent.slot.is_available)
+        self.assertEqual(Closeout.run(), (0, 0, 0))
+
+    def test_dry_run_leaves_tickets_open(self):
+        self.assertEqual(Closeout.run(dry_run=True)[0], 4)
+
+        self.assertEqual(Ticket.objects.filter(check_out__isnull=True).count(), 5)
+
+    def test_slot_with_another_open_ticket_or_pending_block_is_not_freed(self):
+        shared, blocked = self.tickets[0].slot, self.tickets[1].slot
+        Ticket.objects.create(
+            vehicle_number="KA01AB9999",
+            phone="9876543210",
+            vehicle_type="CAR",
+            slot=shared,
+        )
+        SlotMaintenance.block(Slot.objects.filter(id=blocked.id))
+
+        closed, freed, _ = Closeout.run()
+
+        self.assertEqual((closed, freed), (4, 3))
+        self.assertFalse(Slot.objects.get(id=shared.id).is_available)
+        blocked.refresh_from_db()
+        self.assertTrue(blocked.is_available)
+        self.assertTrue(blocked.is_blocked)
+        self.assertFalse(blocked.block_pending)
+
+
+class ForecastTests(TransactionTestCase):
+    """Floors about to fill up are predicted from past weeks and avoided."""
+
+    def setUp(self):
+        forecasting._models.clear()
+        self.addCleanup(forecasting._models.clear)
+        for cache in caches.all():
+            cache.clear()
+        with open(os.devnull, "w") as devnull:
+            call_command(
+                "init_parking_data", floors=2, slots_per_section=5, stdout=devnull
+            )
+        self.now = timezone.now().replace(minute=5, second=0, microsecond=0)
+        self.enterContext(
+            mock.patch("django.utils.timezone.now", return_value=self.now)
+        )
+
+    def test_minutes_until_full(self):
+        import numpy as np
+
+        minutes = forecasting.minutes_until_full(
+            [10, 5, 0, 100], np.full((4, 3), 12.0), np.full((4, 3), 2.0), 0
+        )
+
+        self.assertAlmostEqual(minutes[0], 60)
+        self.assertAlmostEqual(minutes[1], 30)
+        self.assertEqual(minutes[2], 0)
+        self.assertTrue(math.isnan(minutes[3]))
+
+    def test_arrivals_are_steered_off_a_filling_floor(self):
+        slot = Slot.objects.filter(floor__number=1, vehicle_type="CAR").first()
+        # A rush on floor 1 at this hour of the week, the last two weeks
+        Ticket.objects.bulk_create(
+            Ticket(
+                vehicle_number="KA01AB1234",
+                phone="9876543210",
+                vehicle_type="CAR",
+                slot=slot,
+                check_in=self.now - timedelta(weeks=weeks, minutes=-1),
+                check_out=self.now - timedelta(weeks=weeks, hours=-5),
+            )
+            for weeks in (1, 2)
+            for _ in range(150)
+        )
+
+        first, second = forecasting.OccupancyForecast.floors("CAR", now=self.now)
+
+        self.assertIsNotNone(first.minutes_until_full)
+        self.assertIsNone(second.minutes_until_full)
+        self.assertEqual(
+            forecasting.OccupancyForecast.steer([first, second], 1).floor_number, 2
+        )
+        response = self.client.get(reverse("occupancy_forecast", args=["car"]))
+        self.assertEqual(response.json()["recommended_floor"], 2)
+
+
+@override_settings(
+    QR_STORE_FILES=False,
+    ADMISSION_CONTROL_ENABLED=True,
+    ADMISSION_GATE_BURST=2,
+    ADMISSION_GATE_RATE=0.01,
+)
+class AdmissionControlTests(TransactionTestCase):
+    """Each gate gets a token bucket of bookings; an empty one gets 429."""
+
+    def setUp(self):
+        for cache in caches.all():
+            cache.clear()
+        with open(os.devnull, "w") as devnull:
+            call_command(
+                "init_parking_data", floors=1, slots_per_section=3, stdout=devnull
+            )
+        self.slot_ids = list(
+            Slot.objects.filter(vehicle_type="CAR").values_list("id", flat=True)
+        )
+
+    def _book(self, client, slot_id, **headers):
+        return client.post(
+            reverse("vehicle_form", args=[slot_id]),
+            {
+                "vehicle_number": "KA01AB1234",
+                "phone": "9876543210",
+                "email": "driver@example.com",
+                "initial_payment": 10,
+            },
+            **headers,
+        )
+
+    def test_bucket_refills_at_its_rate(self):
+        bucket = TokenBucket(2.0, 2)
+
+        self.assertEqual(bucket.take(now=bucket.updated), 0)
+        self.assertEqual(bucket.take(now=bucket.updated), 0)
+        self.assertAlmostEqual(bucket.take(now=bucket.updated), 0.5)
+        self.assertEqual(bucket.take(now=bucket.updated + 0.5), 0)
+
+    @override_settings(ADMISSION_TRUSTED_GATE_ADDRESSES=("127.0.0.1",))
+    def test_trusted_gate_is_limited_on_its_own(self):
+        client = Client(HTTP_X_PARKING_GATE="gate-1")
+
+        codes = [self._book(client, i).status_code for i in self.slot_ids[:3]]
+
+        self.assertEqual(codes, [200, 200, 429])
+        response = self._book(client, self.slot_ids[3])
+        self.assertGreaterEqual(int(response["Retry-After"]), 1)
+        other = self._book(client, self.slot_ids[3], HTTP_X_PARKING_GATE="gate-2")
+        self.assertEqual(other.status_code, 200)
+
+    def test_untrusted_gate_header_is_ignored(self):
+        client = Client()
+
+        codes = [
+            self._book(client, i, HTTP_X_PARKING_GATE=f"gate-{i}").status_code
+            for i in self.slot_ids[:3]
+        ]
+
+        self.assertEqual(codes, [200, 200, 429])
@@ -0,0 +1,110 @@
+"""Signed checkout tokens carried in QR codes and checkout links.
+
+A token is the ticket id followed by a truncated HMAC of the site code and
+the id ("1234-Qm9Hx2...") so a scan is verified in constant time before any
+query. Guessed ids, and tokens of another site, fail the check. Tokens that
+were already used are remembered in the "shared" cache, so every worker
+refuses them, and in the process's own cache, so scanning them again there
+does not reach any database or cache server.
+
+Customers typing at manual checkout use the shorter checkout code instead:
+the id and six characters of a separate HMAC ("1234-K7QX9P"). Pages, PDFs and
+QR images of a ticket are only served to holders of its signed token.
+Reservations get a code of the same shape, shown at the gate to check in.
+"""
+
+import base64
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.utils.crypto import constant_time_compare, salted_hmac
+
+SALT = "parking.checkout_token"
+SIGNATURE_BYTES = 12
+MAX_ID_DIGITS = 18
+CODE_SALT = "parking.checkout_code"
+CODE_CHARS = 6
+RESERVATION_CODE_SALT = "parking.reservation_code"
+
+
+def _signature(site, ticket_id):
+    digest = salted_hmac(SALT, f"{site}:{ticket_id}").digest()[:SIGNATURE_BYTES]
+    return base64.urlsafe_b64encode(digest).decode().rstrip("=")
+
+
+def sign_checkout_token(site, ticket_id):
+    return f"{ticket_id}-{_signature(site, ticket_id)}"
+
+
+def _ticket_id(token):
+    ticket_id, _, rest = token.partition("-")
+    if not (ticket_id.isascii() and ticket_id.isdigit()):
+        return None, rest
+    if len(ticket_id) > MAX_ID_DIGITS:
+        return None, rest
+    return int(ticket_id), rest
+
+
+def verify_checkout_token(site, token):
+    """Ticket id of a genuine `site` token, or None. Never queries the database."""
+    ticket_id, signature = _ticket_id(token)
+    if ticket_id is None:
+        return None
+    if not constant_time_compare(signature, _signature(site, ticket_id)):
+        return None
+    return ticket_id
+
+
+def _code(salt, site, object_id):
+    digest = salted_hmac(salt, f"{site}:{object_id}").digest()
+    return f"{object_id}-{base64.b32encode(digest).decode()[:CODE_CHARS]}"
+
+
+def _verify_code(salt, site, code):
+    code = "".join(code.split()).upper()
+    object_id, _ = _ticket_id(code)
+    if object_id is None:
+        return None
+    if not constant_time_compare(code, _code(salt, site, object_id)):
+        return None
+    return object_id
+
+
+def checkout_code(site, ticket_id):
+    return _code(CODE_SALT, site, ticket_id)
+
+
+def verify_checkout_code(site, code):
+    """Ticket id of a genuine `site` checkout code, or None; case and spaces
+    are ignored."""
+    return _verify_code(CODE_SALT, site, code)
+
+
+def reservation_code(site, reservation_id):
+    """Code a customer shows at the gate to check in a reservation."""
+    return _code(RESERVATION_CODE_SALT, site, reservation_id)
+
+
+def verify_reservation_code(site, code):
+    """Reservation id of a genuine `site` reservation code, or None."""
+    return _verify_code(RESERVATION_CODE_SALT, site, code)
+
+
+def _used_key(site, ticket_id):
+    return f"used_checkout_token_{site}_{ticket_id}"
+
+
+def mark_token_used(site, ticket_id):
+    key = _used_key(site, ticket_id)
+    cache.set(key, True, settings.CHECKOUT_USED_TOKEN_TTL)
+    caches["shared"].set(key, True, settings.CHECKOUT_USED_TOKEN_TTL)
+
+
+def is_token_used(site, ticket_id):
+    key = _used_key(site, ticket_id)
+    if cache.get(key, False):
+        return True
+    if caches["shared"].get(key, False):
+        cache.set(key, True, settings.CHECKOUT_USED_TOKEN_TTL)
+        return True
+    return False
@@ -1,14 +1,31 @@
 from django.urls import path
 from . import views
 
-
 urlpatterns = [
     path("", views.home, name="home"),
     path("park/", views.select_vehicle, name="select_vehicle"),
     path("slots/<str:vehicle_type>/", views.view_slots, name="view_slots"),
     path("vehicle/<int:slot_id>/", views.vehicle_form, name="vehicle_form"),
+    path("reserve/", views.reserve, name="reserve"),
+    path(
+        "reservation/checkin/",
+        views.reservation_check_in,
+        name="reservation_check_in",
+    ),
     path("checkout/", views.checkout, name="checkout"),
-    path("token/<int:ticket_id>/", views.token_success, name="token_success"),
-    path("download/pdf/<int:ticket_id>/", views.download_pdf, name="download_pdf"),
-    path("qrcheckout/<int:token_id>/", views.qr_checkout, name="auto_checkout"),
+    path("token/<str:token>/", views.token_success, name="token_success"),
+    path("download/pdf/<str:token>/", views.download_pdf, name="download_pdf"),
+    path("receipt/<str:token>/", views.ticket_receipt, name="ticket_receipt"),
+    path("qr/<str:token>.png", views.ticket_qr, name="ticket_qr"),
+    path("qrcheckout/<str:token>/", views.qr_checkout, name="auto_checkout"),
+    path("plates/lookup/", views.plate_lookup, name="plate_lookup"),
+    path(
+        "api/forecast/<str:vehicle_type>/",
+        views.occupancy_forecast,
+        name="occupancy_forecast",
+    ),
+    path("pass/entry/", views.pass_entry, name="pass_entry"),
+    path("pass/exit/", views.pass_exit, name="pass_exit"),
+    path("edge/checkout/<str:ref>/", views.edge_checkout, name="edge_checkout"),
+    path("metrics/", views.metrics, name="metrics"),
 ]
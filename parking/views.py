@@ -1,20 +1,49 @@
 import logging
 import base64
+import time
+from datetime import datetime, timezone
+from functools import wraps
 
 from django.shortcuts import render, get_object_or_404, redirect
-from django.utils import timezone
+from django.urls import reverse
 from django.contrib import messages
-from django.http import HttpResponse
+from django.http import Http404, HttpResponse, JsonResponse
+from django.contrib.admin.views.decorators import staff_member_required
+from django.views.decorators.cache import cache_control
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import condition, require_POST
 from django.core.mail import EmailMessage
 from django.conf import settings
-
-from .models import Slot, Ticket, Floor, ParkingConfig
-from .forms import VehicleDetailsForm
-from services.slot_allocator import SlotAllocator
-from services.billing import BillingService
-from services.pdf_generator import generate_parking_token_pdf
-from services.qr_generator import generate_and_save_qr
-
+from django.utils.crypto import constant_time_compare
+
+from .models import Slot, Ticket, Floor, ParkingConfig, Reservation
+from .forms import ReservationForm, VehicleDetailsForm
+from .idempotency import IdempotencyConflict, IdempotentRequest
+from .plates import normalize_plate
+from .tokens import (
+    is_token_used,
+    mark_token_used,
+    reservation_code,
+    verify_checkout_code,
+    verify_checkout_token,
+    verify_reservation_code,
+)
+from .routers import replica_reads
+from .sites import site_databases
+from .metrics import REGISTRY, track_service
+from services.reservations import ReservationService, unheld_slots
+from services.slot_leases import exclude_foreign_leases
+from services.edge import EdgeGate
+from services.forecasting import OccupancyForecast
+from services.passes import GATE_DECISIONS, PassService
+from services.occupancy_versions import OccupancyVersions
+from services.ticketing import TicketService
+from services.plate_search import PlateSearch
+from services.slot_reconciler import SlotReconciler
+from services.pdf_generator import generate_parking_token_pdf, token_fields
+from services.receipts import RECEIPT_FORMATS, render_receipt
+from services import render_pool
+from services.qr_generator import generate_and_save_qr, qr_png
 
 logger = logging.getLogger(__name__)
 
@@ -27,9 +56,12 @@ def home(request):
     return render(request, "home.html")
 
 
+@replica_reads
 def select_vehicle(request):
     """Display vehicle type selection."""
-    vehicle_types = ParkingConfig.objects.values_list("vehicle_type", flat=True)
+    vehicle_types = ParkingConfig.objects.filter(site=request.site).values_list(
+        "vehicle_type", flat=True
+    )
     if not vehicle_types:
         return _render_error_page(
             request,
@@ -46,33 +78,96 @@ def select_vehicle(request):
 # =============================================
 
 
-def view_slots(request, vehicle_type):
-    """Display available slots for selected vehicle type and floor."""
+def _requested_floor(request):
     try:
-        floor_no = int(request.GET.get("floor", 1))
+        return int(request.GET.get("floor", 1))
     except (ValueError, TypeError):
-        floor_no = 1
+        return 1
 
-    floor = get_object_or_404(Floor, number=floor_no)
-    config = get_object_or_404(ParkingConfig, vehicle_type=vehicle_type.upper())
 
-    slots = (
-        Slot.objects.select_related("floor")
-        .filter(
-            floor=floor,
-            vehicle_type=vehicle_type.upper(),
-            is_available=True,
+def _slots_version(request, vehicle_type):
+    """`(version, bucket)` of the slot grid, or None where it is not tracked.
+
+    The version changes with slot states (`services.occupancy_versions`);
+    the bucket with the clock, so holds and leases starting or ending are
+    picked up within SLOT_PAGE_MAX_STALE_SECONDS.
+    """
+    if settings.EDGE_MODE:
+        return None
+    # Asked for by both validators; one cache read per request
+    if not hasattr(request, "_slots_version"):
+        request._slots_version = OccupancyVersions.get(
+            request.site, vehicle_type.upper(), _requested_floor(request)
         )
-        .order_by("section", "slot_number")
+    return (
+        request._slots_version,
+        int(time.time()) // settings.SLOT_PAGE_MAX_STALE_SECONDS,
+    )
+
+
+def _slots_etag(request, vehicle_type):
+    state = _slots_version(request, vehicle_type)
+    if state is None:
+        return None
+    version, bucket = state
+    return f"{request.site}-{version}-{bucket}"
+
+
+def _slots_last_modified(request, vehicle_type):
+    state = _slots_version(request, vehicle_type)
+    if state is None:
+        return None
+    version, bucket = state
+    changed = max(version // 10**9, bucket * settings.SLOT_PAGE_MAX_STALE_SECONDS)
+    return datetime.fromtimestamp(changed, tz=timezone.utc)
+
+
+@replica_reads
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=_slots_etag, last_modified_func=_slots_last_modified)
+def view_slots(request, vehicle_type):
+    """Display available slots for selected vehicle type and floor.
+
+    Tablets refreshing an unchanged grid get a 304 from the occupancy
+    version alone, without a query or a render.
+    """
+    if settings.EDGE_MODE:
+        return _edge_view_slots(request, vehicle_type.upper())
+
+    floor_no = _requested_floor(request)
+
+    floor = get_object_or_404(Floor, site=request.site, number=floor_no)
+    config = get_object_or_404(
+        ParkingConfig, site=request.site, vehicle_type=vehicle_type.upper()
     )
 
-    floors = Floor.objects.order_by("number")
+    # Slots held for an upcoming reservation or a pass, or leased to an edge
+    # gate, are not offered to walk-ins
+    slots = exclude_foreign_leases(
+        unheld_slots(
+            Slot.objects.select_related("floor").filter(
+                floor=floor,
+                vehicle_type=vehicle_type.upper(),
+                is_available=True,
+                is_blocked=False,
+            )
+        )
+    ).order_by("section", "slot_number")
+
+    floors = Floor.objects.filter(site=request.site).order_by("number")
+
+    # Fill-time estimate for this floor, and a better floor if it fills soon
+    forecasts = OccupancyForecast.floors(vehicle_type.upper(), site=request.site)
+    forecast = next((f for f in forecasts if f.floor_id == floor.id), None)
 
     context = {
         "slots": slots,
         "vehicle_type": vehicle_type.upper(),
         "floor": floor,
         "floors": floors,
+        "forecast": forecast,
+        "steer_to": OccupancyForecast.steer(forecasts, floor.number),
+        "floor_nav_cache_seconds": settings.FLOOR_NAV_CACHE_SECONDS,
         "base_price_for_type": config.base_price,
     }
     return render(request, "slots.html", context)
@@ -84,116 +179,296 @@ def view_slots(request, vehicle_type):
 
 
 def vehicle_form(request, slot_id):
-    """Handle vehicle details submission and generate token with QR & PDF."""
+    """Handle vehicle details submission and generate token with QR & PDF.
+
+    Submissions are idempotent per form nonce (or `Idempotency-Key`
+    header): a repeated POST gets the original token page back.
+    """
+    if settings.EDGE_MODE:
+        return _edge_vehicle_form(request, slot_id)
+
+    if request.method == "POST":
+        idempotent = IdempotentRequest(request)
+        # Before validating the slot: the original request has taken it
+        replay = _replay_booking(request, idempotent)
+        if replay:
+            return replay
+
     slot = _validate_slot(request, slot_id)
     if isinstance(slot, HttpResponse):
+        if request.method == "POST":
+            # The original may have claimed the key and taken the slot since
+            return _replay_booking(request, idempotent) or slot
         return slot
 
     if request.method == "POST":
         form = VehicleDetailsForm(request.POST)
         if form.is_valid():
-            allocated_slot = SlotAllocator.allocate(
-                vehicle_type=slot.vehicle_type,
-                floor=slot.floor,
-                section=slot.section,
-            )
-            if not allocated_slot:
-                messages.error(
-                    request, "Sorry, this slot was just taken by another customer."
+            if not idempotent.claim():
+                # A duplicate claimed the key after our check above
+                return _replay_booking(request, idempotent) or redirect(
+                    "view_slots", vehicle_type=slot.vehicle_type
                 )
-                return redirect("view_slots", vehicle_type=slot.vehicle_type)
-
-            # Create ticket with email
-            ticket = Ticket.objects.create(
-                vehicle_number=form.cleaned_data["vehicle_number"].strip().upper(),
-                phone=form.cleaned_data["phone"].strip(),
-                email=form.cleaned_data["email"].strip().lower(),
-                vehicle_type=slot.vehicle_type,
-                slot=allocated_slot,
-                initial_payment=form.cleaned_data["initial_payment"] or 0,
-            )
-            logger.info(f"Ticket {ticket.id} created for slot {allocated_slot}.")
+            try:
+                return idempotent.complete(_book(request, slot, form))
+            except Exception:
+                idempotent.release()
+                raise
+    else:
+        form = VehicleDetailsForm()
 
-            # Generate QR code and save to model
-            checkout_url = request.build_absolute_uri(f"/qrcheckout/{ticket.id}")
-            generate_and_save_qr(ticket, checkout_url)
+    return render(request, "vehicle_form.html", {"slot": slot, "form": form})
 
-            # Generate PDF with embedded QR
-            pdf_buffer = generate_parking_token_pdf(ticket, checkout_url)
 
-            # Send email with PDF attachment
-            _send_token_email(request, ticket, pdf_buffer, ticket.email)
+def _book(request, slot, form):
+    # Claim a slot and create the ticket with email, as one unit
+    ticket = TicketService.open(
+        vehicle_type=slot.vehicle_type,
+        floor=slot.floor,
+        section=slot.section,
+        vehicle_number=form.cleaned_data["vehicle_number"].strip().upper(),
+        phone=form.cleaned_data["phone"].strip(),
+        email=form.cleaned_data["email"].strip().lower(),
+        initial_payment=form.cleaned_data["initial_payment"] or 0,
+    )
+    if not ticket:
+        messages.error(request, "Sorry, this slot was just taken by another customer.")
+        return redirect("view_slots", vehicle_type=slot.vehicle_type)
+    logger.info("Ticket %s created for slot %s.", ticket.id, ticket.slot)
+    return _issue_token(request, ticket)
+
+
+def _issue_token(request, ticket):
+    """QR code, PDF and email of a new ticket, and its token page."""
+    # Generate QR code and save to model
+    checkout_url = _checkout_url(request, ticket)
+    generate_and_save_qr(ticket, checkout_url)
+
+    # Generate PDF with embedded QR
+    pdf_buffer = generate_parking_token_pdf(ticket, checkout_url)
+
+    # Send email with PDF attachment
+    _send_token_email(request, ticket, pdf_buffer, ticket.email)
+
+    # Thermal gates print a receipt; others auto-download via base64 data URL
+    fmt = _receipt_format(request)
+    if fmt not in RECEIPT_FORMATS:
+        logger.warning("Unknown receipt format %r, using the default.", fmt)
+        fmt = settings.RECEIPT_DEFAULT_FORMAT
+    context = {"ticket": ticket, "pdf_data_url": ""}
+    if fmt == "pdf":
+        pdf_base64 = base64.b64encode(pdf_buffer.getvalue()).decode("utf-8")
+        context["pdf_data_url"] = f"data:application/pdf;base64,{pdf_base64}"
+    else:
+        receipt_url = reverse("ticket_receipt", args=[ticket.checkout_token])
+        context["receipt_url"] = f"{receipt_url}?format={fmt}"
 
-            # Auto-download via base64 data URL
-            pdf_base64 = base64.b64encode(pdf_buffer.getvalue()).decode("utf-8")
-            pdf_data_url = f"data:application/pdf;base64,{pdf_base64}"
+    return render(request, "token_success.html", context)
 
-            return render(
-                request,
-                "token_success.html",
-                {"ticket": ticket, "pdf_data_url": pdf_data_url},
-            )
-    else:
-        form = VehicleDetailsForm()
 
-    return render(request, "vehicle_form.html", {"slot": slot, "form": form})
+def _replay_booking(request, idempotent):
+    """Stored response of an earlier submission with the same key, if any."""
+    try:
+        return idempotent.replay()
+    except IdempotencyConflict as exc:
+        logger.warning("Rejected duplicate booking submission: %s", exc)
+        return _render_error_page(
+            request,
+            "Duplicate Submission",
+            str(exc),
+            suggestion="Please wait a moment and check your email for the token.",
+            status=409,
+        )
 
 
 # =============================================
-# Checkout Views
+# Reservations
 # =============================================
 
 
-def checkout(request):
-    """Manual checkout via token entry."""
-    if request.method == "POST":
-        token_input = request.POST.get("token", "").strip()
-        return _process_checkout(request, token_input, is_qr_scan=False)
-    return render(request, "checkout.html")
+def reserve(request):
+    """Pre-book a slot in a floor section for an arrival window."""
+    if settings.EDGE_MODE:
+        return _render_error_page(
+            request,
+            "Reservations Unavailable",
+            "Reservations cannot be made at this gate right now.",
+            status=503,
+        )
 
+    if request.method == "POST":
+        form = ReservationForm(request.POST)
+        if form.is_valid():
+            data = form.cleaned_data
+            floor = Floor.objects.filter(
+                site=request.site, number=data["floor"]
+            ).first()
+            if floor is None:
+                form.add_error("floor", "There is no such floor.")
+            else:
+                reservation = ReservationService.reserve(
+                    data["vehicle_type"],
+                    floor,
+                    data["section"],
+                    data["start"],
+                    data["end"],
+                    vehicle_number=data["vehicle_number"].upper(),
+                    phone=data["phone"],
+                    email=data["email"],
+                )
+                if reservation is not None:
+                    logger.info(
+                        "Reservation %s holds slot %s.",
+                        reservation.id,
+                        reservation.slot,
+                    )
+                    return render(
+                        request,
+                        "reservation_success.html",
+                        {
+                            "reservation": reservation,
+                            "code": reservation_code(request.site, reservation.id),
+                            "grace_minutes": settings.RESERVATION_GRACE_MINUTES,
+                        },
+                    )
+                form.add_error(
+                    None, "Every slot of this section is already held at that time."
+                )
+    else:
+        form = ReservationForm()
 
-def qr_checkout(request, token_id):
-    """Auto checkout via QR scan."""
-    return _process_checkout(request, str(token_id), is_qr_scan=True)
+    return render(request, "reservation_form.html", {"form": form})
 
 
-def _process_checkout(request, token_input, is_qr_scan=False):
-    """Shared logic for both manual and QR checkout."""
-    if not token_input:
-        messages.error(request, "Please enter a token number.")
-        return render(request, "checkout.html")
+def reservation_check_in(request):
+    """Check a reservation in at the gate by its code: opens the ticket on
+    the held slot and issues its token as for a walk-in."""
+    if request.method != "POST":
+        return render(request, "reservation_check_in.html")
+    if settings.EDGE_MODE:
+        return _render_error_page(
+            request,
+            "Reservations Unavailable",
+            "Reservations cannot be checked in at this gate right now.",
+            status=503,
+        )
 
-    try:
-        token_id = int(token_input)
-        # Use select_related to avoid a second query for the slot
-        ticket = Ticket.objects.select_related("slot__floor").get(
-            id=token_id, check_out__isnull=True
+    code = request.POST.get("code", "").strip()
+    reservation_id = verify_reservation_code(request.site, code)
+    reservation = None
+    if reservation_id is not None:
+        reservation = (
+            Reservation.objects.select_related("slot__floor")
+            .filter(
+                id=reservation_id,
+                slot__floor__site=request.site,
+                status=Reservation.HELD,
+                end__gt=datetime.now(timezone.utc),
+            )
+            .first()
+        )
+    if reservation is None:
+        logger.warning("Invalid or used reservation code entered: '%s'", code)
+        return render(
+            request,
+            "reservation_check_in.html",
+            {"error": "This reservation code is not valid or no longer held."},
+            status=404,
         )
-    except (ValueError, Ticket.DoesNotExist):
-        logger.warning(f"Invalid or used token entered: '{token_input}'")
+
+    ticket = ReservationService.check_in(reservation)
+    if ticket is None:
         return _render_error_page(
             request,
-            "Invalid Token",
-            "The token was not found or has already been used.",
-            suggestion="Please check your token number or contact support.",
+            "Reserved Slot Not Free",
+            f"Slot {reservation.slot} is still occupied or closed for maintenance.",
+            suggestion="Please park on another slot from the Park Vehicle page.",
+            status=409,
         )
+    logger.info("Reservation %s checked in as ticket %s.", reservation.id, ticket.id)
+    return _issue_token(request, ticket)
+
 
-    # Perform checkout
-    ticket.check_out = timezone.now()
-    total, refund, due, hours = BillingService.calculate(ticket)
-    ticket.final_amount = total
-    ticket.save()
+# =============================================
+# Checkout Views
+# =============================================
+
+
+def checkout(request):
+    """Manual checkout: the checkout code printed on the token, or its full
+    signed token. Bare ticket numbers are not accepted."""
+    if request.method == "POST":
+        token_input = request.POST.get("token", "").strip()
+        if not token_input:
+            messages.error(request, "Please enter your token code.")
+            return render(request, "checkout.html")
+        ticket_id = verify_checkout_token(
+            request.site, token_input
+        ) or verify_checkout_code(request.site, token_input)
+        if ticket_id is None:
+            if settings.EDGE_MODE:
+                return _edge_checkout(request, token_input, is_qr_scan=False)
+            logger.warning("Invalid token code entered: '%s'", token_input)
+            return _render_invalid_token(request)
+        return _process_checkout(request, ticket_id, is_qr_scan=False)
+    return render(request, "checkout.html")
 
-    if ticket.slot:
-        ticket.slot.is_available = True
-        ticket.slot.save()
 
+def qr_checkout(request, token):
+    """Auto checkout via QR scan; the signed token is checked before any query."""
+    ticket_id = verify_checkout_token(request.site, token)
+    if ticket_id is None:
+        logger.warning("Rejected forged or malformed QR token: '%s'", token)
+        return _render_invalid_token(request)
+    return _process_checkout(request, ticket_id, is_qr_scan=True)
+
+
+def _process_checkout(request, ticket_id, is_qr_scan=False):
+    """Shared logic for both manual and QR checkout, once the token or code
+    has been verified."""
+    if is_token_used(request.site, ticket_id):
+        logger.warning("Used token presented for ticket %s", ticket_id)
+        return _render_invalid_token(request)
+    # Use select_related to avoid a second query for the slot
+    ticket = (
+        Ticket.objects.select_related("slot__floor")
+        .filter(id=ticket_id, site=request.site, check_out__isnull=True)
+        .first()
+    )
+    if ticket is None:
+        # The token was genuinely issued, so a miss means it is used for good
+        mark_token_used(request.site, ticket_id)
+        logger.warning("Used token presented for ticket %s", ticket_id)
+        return _render_invalid_token(request)
+
+    # Perform checkout; None if a concurrent checkout closed it first
+    bill = TicketService.check_out(ticket)
+    mark_token_used(request.site, ticket.id)
+    if bill is None:
+        logger.warning("Used token presented for ticket %s", ticket_id)
+        return _render_invalid_token(request)
+    return _render_bill(request, ticket, bill, is_qr_scan)
+
+
+def _render_invalid_token(request):
+    return _render_error_page(
+        request,
+        "Invalid Token",
+        "The token was not found or has already been used.",
+        suggestion="Please check your token number or contact support.",
+    )
+
+
+def _render_bill(request, ticket, bill, is_qr_scan):
+    total, refund, due, hours = bill
     success_msg = "Checkout completed successfully!"
     if is_qr_scan:
         success_msg += " (via QR scan)"
     messages.success(request, success_msg)
     logger.info(
-        f"Slot Freed: Slot ID {ticket.slot.id} is now available (Released by Ticket #{ticket.id})."
+        "Slot Freed: Slot ID %s is now available (Released by Ticket #%s).",
+        ticket.slot.id,
+        ticket.id,
     )
 
     return render(
@@ -210,22 +485,235 @@ def _process_checkout(request, token_input, is_qr_scan=False):
     )
 
 
+# =============================================
+# Edge Mode (gate running on its local journal)
+# =============================================
+
+
+def _edge_view_slots(request, vehicle_type):
+    """Slots of the gate's leased section, from the local snapshot."""
+    gate = EdgeGate.from_settings()
+    slots = gate.slots(vehicle_type)
+    base_price = gate.base_price(vehicle_type)
+    if not slots or base_price is None:
+        return _render_error_page(
+            request,
+            "Gate Not Ready",
+            f"This gate holds no {vehicle_type} slots.",
+            suggestion="Run `manage.py edge_gate lease` while the central database is reachable.",
+        )
+    floor = slots[0].floor
+    context = {
+        "slots": slots,
+        "vehicle_type": vehicle_type,
+        "floor": floor,
+        "floors": [floor],
+        "base_price_for_type": base_price,
+    }
+    return render(request, "slots.html", context)
+
+
+def _edge_vehicle_form(request, slot_id):
+    """Book against the local journal; the token PDF carries the edge reference."""
+    gate = EdgeGate.from_settings()
+    slot = gate.get_slot(slot_id)
+    if slot is None or not slot.is_available:
+        logger.warning("Attempted to book unknown or taken edge slot: %s", slot_id)
+        return _render_error_page(
+            request,
+            "Slot Taken",
+            "The selected slot is no longer available.",
+        )
+
+    if request.method == "POST":
+        form = VehicleDetailsForm(request.POST)
+        if form.is_valid():
+            ticket = gate.book(
+                vehicle_type=slot.vehicle_type,
+                vehicle_number=form.cleaned_data["vehicle_number"].strip().upper(),
+                phone=form.cleaned_data["phone"].strip(),
+                email=form.cleaned_data["email"].strip().lower(),
+                initial_payment=form.cleaned_data["initial_payment"] or 0,
+            )
+            if ticket is None:
+                messages.error(request, "Sorry, this gate has no free slots left.")
+                return redirect("view_slots", vehicle_type=slot.vehicle_type)
+            logger.info("Edge ticket %s created for slot %s.", ticket.id, ticket.slot)
+
+            checkout_url = request.build_absolute_uri(f"/edge/checkout/{ticket.id}/")
+            pdf_buffer = generate_parking_token_pdf(ticket, checkout_url)
+            pdf_base64 = base64.b64encode(pdf_buffer.getvalue()).decode("utf-8")
+            pdf_data_url = f"data:application/pdf;base64,{pdf_base64}"
+
+            return render(
+                request,
+                "token_success.html",
+                {"ticket": ticket, "pdf_data_url": pdf_data_url},
+            )
+    else:
+        form = VehicleDetailsForm()
+
+    return render(request, "vehicle_form.html", {"slot": slot, "form": form})
+
+
+def edge_checkout(request, ref):
+    """QR checkout for tokens issued by this gate in edge mode."""
+    if not settings.EDGE_MODE:
+        raise Http404
+    return _edge_checkout(request, ref, is_qr_scan=True)
+
+
+def _edge_checkout(request, ref, is_qr_scan):
+    result = EdgeGate.from_settings().check_out(ref)
+    if result is None:
+        logger.warning("Invalid or used edge token entered: '%s'", ref)
+        return _render_error_page(
+            request,
+            "Invalid Token",
+            "The token was not found or has already been used.",
+            suggestion="Tokens from another gate must be checked out there.",
+        )
+    ticket, bill = result
+    return _render_bill(request, ticket, bill, is_qr_scan)
+
+
+@staff_member_required
+def plate_lookup(request):
+    """Open tickets matching a typed plate, for customers who lost their token.
+
+    Staff only: the results include token numbers.
+    """
+    query = request.GET.get("q", "")
+    if len(normalize_plate(query)) < 3:
+        return JsonResponse(
+            {"error": "Enter at least 3 letters or digits of the plate."}, status=400
+        )
+    candidates = PlateSearch.lookup(query, site=request.site)
+    return JsonResponse(
+        {
+            "query": normalize_plate(query),
+            "candidates": [
+                {
+                    "token": ticket.id,
+                    "checkout_code": ticket.checkout_code,
+                    "vehicle_number": ticket.vehicle_number,
+                    "slot": str(ticket.slot),
+                    "check_in": ticket.check_in.isoformat(),
+                    "score": round(score, 3),
+                }
+                for ticket, score in candidates
+            ],
+        }
+    )
+
+
+@replica_reads
+@cache_control(max_age=60)
+def occupancy_forecast(request, vehicle_type):
+    """Free slots and minutes until full per floor, for entry signage."""
+    vehicle_type = vehicle_type.upper()
+    if vehicle_type not in dict(ParkingConfig.VEHICLE_CHOICES):
+        raise Http404(f"Unknown vehicle type {vehicle_type!r}")
+    forecasts = OccupancyForecast.floors(vehicle_type, site=request.site)
+    best = max(forecasts, key=lambda f: (f.fills_within, f.free), default=None)
+    return JsonResponse(
+        {
+            "site": request.site,
+            "vehicle_type": vehicle_type,
+            "recommended_floor": best.floor_number if best and best.free else None,
+            "floors": [
+                {
+                    "floor": f.floor_number,
+                    "free": f.free,
+                    "arrivals_per_hour": f.arrivals_per_hour,
+                    "departures_per_hour": f.departures_per_hour,
+                    "minutes_until_full": f.minutes_until_full,
+                }
+                for f in forecasts
+            ],
+        }
+    )
+
+
+def _gate_key_required(view):
+    """Refuse requests without the key of a gate in `PASS_GATE_KEYS`: its
+    name in the X-Parking-Gate header and its key in X-Parking-Gate-Key."""
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        gate = request.headers.get("X-Parking-Gate", "")
+        key = settings.PASS_GATE_KEYS.get(gate)
+        given = request.headers.get("X-Parking-Gate-Key", "")
+        if not key or not constant_time_compare(given, key):
+            logger.warning(
+                "Refused plate read from %s for gate %r without a valid gate key.",
+                request.META.get("REMOTE_ADDR"),
+                gate,
+            )
+            return JsonResponse({"open": False, "reason": "unauthorized"}, status=401)
+        return view(request, *args, **kwargs)
+
+    return wrapper
+
+
+@csrf_exempt
+@require_POST
+@_gate_key_required
+def pass_entry(request):
+    """Plate read at an entry gate: open the barrier for a valid pass.
+
+    The pass is checked against the in-memory pass cache; only recording
+    the stay touches the database. Gate cameras post `plate`; there is no
+    form, QR code or email.
+    """
+    entry, reason = PassService.check(request.POST.get("plate", ""), request.site)
+    if entry is None:
+        GATE_DECISIONS.inc(direction="entry", outcome=reason)
+        return JsonResponse({"open": False, "reason": reason}, status=403)
+    ticket = PassService.enter(entry)
+    if ticket is None:
+        GATE_DECISIONS.inc(direction="entry", outcome="full")
+        return JsonResponse({"open": False, "reason": "full"}, status=503)
+    GATE_DECISIONS.inc(direction="entry", outcome="open")
+    return JsonResponse(
+        {
+            "open": True,
+            "pass": entry.pass_id,
+            "ticket": ticket.id,
+            "slot_id": ticket.slot_id,
+        }
+    )
+
+
+@csrf_exempt
+@require_POST
+@_gate_key_required
+def pass_exit(request):
+    """Plate read at an exit gate: close the pass holder's stay."""
+    ticket = PassService.leave(request.POST.get("plate", ""), request.site)
+    if ticket is None:
+        GATE_DECISIONS.inc(direction="exit", outcome="no_stay")
+        return JsonResponse({"open": False, "reason": "no_stay"}, status=404)
+    GATE_DECISIONS.inc(direction="exit", outcome="open")
+    return JsonResponse(
+        {"open": True, "pass": ticket.parking_pass_id, "ticket": ticket.id}
+    )
+
+
 # =============================================
 # Token Success & PDF Download
 # =============================================
 
 
-def token_success(request, ticket_id):
-    ticket = get_object_or_404(Ticket.objects.select_related("slot"), id=ticket_id)
+def token_success(request, token):
+    ticket = _ticket_for_token(request, token)
     return render(request, "token_success.html", {"ticket": ticket})
 
 
-def download_pdf(request, ticket_id):
+def download_pdf(request, token):
     """Manual PDF download endpoint."""
-    ticket = get_object_or_404(Ticket.objects.select_related("slot"), id=ticket_id)
-    pdf_buffer = generate_parking_token_pdf(
-        ticket, request.build_absolute_uri(f"/qrcheckout/{ticket.id}")
-    )
+    ticket = _ticket_for_token(request, token)
+    pdf_buffer = generate_parking_token_pdf(ticket, _checkout_url(request, ticket))
 
     response = HttpResponse(pdf_buffer.getvalue(), content_type="application/pdf")
     response["Content-Disposition"] = (
@@ -234,6 +722,40 @@ def download_pdf(request, ticket_id):
     return response
 
 
+def ticket_receipt(request, token):
+    """Token in the gate's receipt format (`?format=` overrides), e.g. ESC/POS."""
+    fmt = _receipt_format(request)
+    if fmt not in RECEIPT_FORMATS:
+        raise Http404(f"Unknown receipt format {fmt!r}")
+    if fmt == "pdf":
+        return download_pdf(request, token)
+
+    ticket = _ticket_for_token(request, token)
+    args = (fmt, token_fields(ticket), _checkout_url(request, ticket))
+    # ESC/POS is a few hundred bytes of commands; only images are worth a worker
+    receipt = (
+        render_pool.render(render_receipt, *args)
+        if fmt.startswith("png")
+        else render_receipt(*args)
+    )
+
+    response = HttpResponse(receipt, content_type=RECEIPT_FORMATS[fmt])
+    extension = "png" if fmt.startswith("png") else "bin"
+    response["Content-Disposition"] = (
+        f'attachment; filename="EliteParking_Token_{ticket.id}.{extension}"'
+    )
+    return response
+
+
+def ticket_qr(request, token):
+    """QR code of an open ticket, rendered on demand (LRU-cached in memory)."""
+    ticket = _ticket_for_token(request, token, check_out__isnull=True)
+    png = qr_png(_checkout_url(request, ticket))
+    response = HttpResponse(png, content_type="image/png")
+    response["Cache-Control"] = "private, max-age=86400"
+    return response
+
+
 # =============================================
 # Helper Functions
 # =============================================
@@ -253,17 +775,21 @@ def _render_error_page(request, title, message, suggestion=None, status=404):
 def _validate_slot(request, slot_id):
     """Validate slot existence and availability."""
     try:
-        slot = Slot.objects.get(id=slot_id)
+        slot = Slot.objects.select_related("floor").get(
+            id=slot_id, floor__site=request.site
+        )
     except Slot.DoesNotExist:
-        logger.warning(f"Attempted to access non-existent slot_id: {slot_id}")
+        logger.warning("Attempted to access non-existent slot_id: %s", slot_id)
         return _render_error_page(
             request,
             "Slot Not Found",
             "The selected slot no longer exists.",
         )
 
-    if not slot.is_available:
-        logger.warning(f"Attempted to book an unavailable slot: {slot} (ID: {slot_id})")
+    if not slot.is_available or slot.is_blocked:
+        logger.warning(
+            "Attempted to book an unavailable slot: %s (ID: %s)", slot, slot_id
+        )
         return _render_error_page(
             request,
             "Slot Taken",
@@ -273,12 +799,42 @@ def _validate_slot(request, slot_id):
     return slot
 
 
+def _receipt_format(request):
+    """Receipt format asked for, else the one configured for the calling gate."""
+    gate = request.headers.get("X-Parking-Gate", "")
+    return request.GET.get("format") or settings.GATE_RECEIPT_FORMATS.get(
+        gate, settings.RECEIPT_DEFAULT_FORMAT
+    )
+
+
+def _ticket_for_token(request, token, **filters):
+    """Ticket of a signed checkout token of this site, else 404: ticket
+    pages and files carry the checkout link, so a ticket id is not enough."""
+    ticket_id = verify_checkout_token(request.site, token)
+    if ticket_id is None:
+        raise Http404("Invalid token")
+    return get_object_or_404(
+        Ticket.objects.select_related("slot__floor"),
+        id=ticket_id,
+        site=request.site,
+        **filters,
+    )
+
+
+def _checkout_url(request, ticket):
+    """Absolute QR checkout link of `ticket`, carrying its signed token."""
+    return request.build_absolute_uri(
+        reverse("auto_checkout", args=[ticket.checkout_token])
+    )
+
+
+@track_service("email")
 def _send_token_email(request, ticket, pdf_buffer, email):
     """Send token PDF via email, with error handling."""
     if not email:
         return
 
-    checkout_url = request.build_absolute_uri(f"/qrcheckout/{ticket.id}")
+    checkout_url = _checkout_url(request, ticket)
 
     subject = f"Elite Parking Token - {ticket.id}"
     body = f"""
@@ -288,7 +844,7 @@ def _send_token_email(request, ticket, pdf_buffer, email):
 
     Your parking token is attached.
 
-    Token No: {ticket.id}
+    Token No: {ticket.checkout_code}
     Vehicle: {ticket.vehicle_number}
     Slot: {ticket.slot}
     Check-in: {ticket.check_in.strftime('%d %b %Y, %I:%M %p')}
@@ -310,7 +866,10 @@ def _send_token_email(request, ticket, pdf_buffer, email):
         msg.send()
     except Exception as e:
         logger.error(
-            f"Failed to send token email to {email} for ticket {ticket.id}: {e}",
+            "Failed to send token email to %s for ticket %s: %s",
+            email,
+            ticket.id,
+            e,
             exc_info=True,
         )
         messages.warning(
@@ -318,6 +877,41 @@ def _send_token_email(request, ticket, pdf_buffer, email):
         )
 
 
+# =============================================
+# Metrics
+# =============================================
+
+
+def _metrics_allowed(request):
+    """Staff users, clients at `METRICS_ALLOWED_ADDRESSES` and scrapers with
+    the `METRICS_TOKEN` bearer token."""
+    if request.user.is_staff:
+        return True
+    if request.META.get("REMOTE_ADDR") in settings.METRICS_ALLOWED_ADDRESSES:
+        return True
+    token = settings.METRICS_TOKEN
+    given = request.headers.get("Authorization", "")
+    return bool(token) and constant_time_compare(given, f"Bearer {token}")
+
+
+def metrics(request):
+    """Prometheus scrape endpoint for the instrumentation middleware."""
+    if not settings.INSTRUMENTATION_ENABLED:
+        raise Http404
+    if not _metrics_allowed(request):
+        logger.warning(
+            "Refused metrics scrape from %s.", request.META.get("REMOTE_ADDR")
+        )
+        return HttpResponse(status=403)
+    for alias in site_databases():
+        SlotReconciler.observe(
+            using=alias, max_age=settings.METRICS_LEAKED_SLOTS_MAX_AGE
+        )
+    return HttpResponse(
+        REGISTRY.render(), content_type="text/plain; version=0.0.4; charset=utf-8"
+    )
+
+
 # =============================================
 # Error Handlers
 # =============================================
@@ -337,7 +931,8 @@ def custom_404(request, exception=None):
 
 def custom_500(request):
     logger.error(
-        f"500 Server Error: {request.path}",
+        "500 Server Error: %s",
+        request.path,
         exc_info=True,
         extra={"status_code": 500, "request": request},
     )
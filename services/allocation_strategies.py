@@ -0,0 +1,214 @@
+import random
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db.models import Case, Count, F, Max, OuterRef, Subquery, Value, When
+
+from parking.models import Floor, Slot
+from parking.sites import get_current_site
+from services.forecasting import OccupancyForecast
+from services.slot_leases import LeaseCoordinator, current_holder
+
+
+class AllocationStrategy:
+    """Chooses which free slot to claim for a booking.
+
+    `choose` receives `candidates`, a `select_for_update` queryset of free
+    slots for the vehicle type, and returns the first slot it wants locked,
+    or None. The requested `floor` and `section` are hints; a strategy may
+    move the booking elsewhere.
+    """
+
+    name = ""
+
+    def choose(self, candidates, vehicle_type, floor, section):
+        raise NotImplementedError
+
+
+class LowestNumberStrategy(AllocationStrategy):
+    """Lowest slot number in the requested floor and section."""
+
+    name = "lowest_number"
+
+    def choose(self, candidates, vehicle_type, floor, section):
+        return (
+            candidates.filter(floor=floor, section=section)
+            .order_by("slot_number")
+            .first()
+        )
+
+
+class LeastLoadedFloorStrategy(AllocationStrategy):
+    """Same section on the floor with the most free slots."""
+
+    name = "least_loaded_floor"
+
+    def choose(self, candidates, vehicle_type, floor, section):
+        floors = (
+            Slot.objects.filter(
+                floor__site=floor.site,
+                vehicle_type=vehicle_type,
+                section=section,
+                is_available=True,
+                is_blocked=False,
+            )
+            .values("floor")
+            .annotate(free=Count("id"))
+            .order_by("-free", "floor__number")
+        )
+        # The counts include slots held for reservations and passes, in
+        # leased sections or locked by another booking, none of which are
+        # in `candidates`; if the emptiest floor has no candidate left, try
+        # the next one.
+        in_section = candidates.filter(section=section).order_by("slot_number")
+        for row in floors:
+            slot = in_section.filter(floor_id=row["floor"]).first()
+            if slot:
+                return slot
+        return None
+
+
+class NearestExitStrategy(AllocationStrategy):
+    """Slot closest to the floor's lift/exit, by straight-line distance."""
+
+    name = "nearest_exit"
+
+    def choose(self, candidates, vehicle_type, floor, section):
+        dx = F("x") - Value(floor.exit_x)
+        dy = F("y") - Value(floor.exit_y)
+        return (
+            candidates.filter(floor=floor, section=section)
+            .annotate(exit_distance=dx * dx + dy * dy)
+            .order_by("exit_distance", "slot_number")
+            .first()
+        )
+
+
+class RandomWithinSectionStrategy(AllocationStrategy):
+    """First free slot at or after a random slot number, wrapping around.
+
+    Concurrent bookings start from different rows, so they rarely contend
+    for the same lock.
+    """
+
+    name = "random_within_section"
+
+    def choose(self, candidates, vehicle_type, floor, section):
+        in_section = candidates.filter(floor=floor, section=section)
+        highest = Slot.objects.filter(
+            vehicle_type=vehicle_type, floor=floor, section=section
+        ).aggregate(highest=Max("slot_number"))["highest"]
+        if highest is None:
+            return None
+        pivot = random.randint(1, highest)
+        slot = in_section.filter(slot_number__gte=pivot).order_by("slot_number").first()
+        if slot:
+            return slot
+        return in_section.filter(slot_number__lt=pivot).order_by("slot_number").first()
+
+
+class LeasedSectionStrategy(AllocationStrategy):
+    """Lowest free slot in a section leased to this worker.
+
+    Each worker allocates from its own floor sections, so concurrent workers
+    never lock the same rows. A lease that runs dry is swapped for the
+    emptiest unleased section; with every section leased, any free slot not
+    leased to another worker is used.
+    """
+
+    name = "leased_section"
+
+    def choose(self, candidates, vehicle_type, floor, section):
+        holder = current_holder()
+        for lease in LeaseCoordinator.held(holder, vehicle_type):
+            slot = self._first(candidates, lease)
+            if slot:
+                return slot
+            LeaseCoordinator.release(holder, lease.id)
+        lease = LeaseCoordinator.acquire(holder, vehicle_type)
+        if lease:
+            slot = self._first(candidates, lease)
+            if slot:
+                return slot
+        return (
+            candidates.filter(floor__site=floor.site)
+            .order_by("floor__number", "section", "slot_number")
+            .first()
+        )
+
+    @staticmethod
+    def _first(candidates, lease):
+        return (
+            candidates.filter(floor_id=lease.floor_id, section=lease.section)
+            .order_by("slot_number")
+            .first()
+        )
+
+
+class ForecastSteeringStrategy(AllocationStrategy):
+    """Requested section, moved to the floor that fills last when the
+    requested floor is forecast to fill soon (see `services.forecasting`)."""
+
+    name = "forecast_steering"
+
+    def choose(self, candidates, vehicle_type, floor, section):
+        target = OccupancyForecast.steer(
+            OccupancyForecast.floors(vehicle_type, site=floor.site), floor.number
+        )
+        floor_id = target.floor_id if target else floor.id
+        return (
+            candidates.filter(floor_id=floor_id)
+            .order_by(Case(When(section=section, then=0), default=1), "slot_number")
+            .first()
+        )
+
+
+class FirstFreeStrategy(AllocationStrategy):
+    """Lowest floor, section and slot number of the current site, ignoring
+    the hints; for arrivals without a chosen slot (pooled passes)."""
+
+    name = "first_free"
+
+    def choose(self, candidates, vehicle_type, floor, section):
+        # Floor numbers by subquery rather than a join, which would lock the
+        # floor rows along with the slot
+        floors = Floor.objects.filter(site=get_current_site())
+        return (
+            candidates.filter(floor__in=floors.values("id"))
+            .annotate(
+                floor_number=Subquery(
+                    floors.filter(id=OuterRef("floor_id")).values("number")
+                )
+            )
+            .order_by("floor_number", "section", "slot_number")
+            .first()
+        )
+
+
+STRATEGIES = {
+    strategy.name: strategy
+    for strategy in (
+        LowestNumberStrategy(),
+        LeastLoadedFloorStrategy(),
+        NearestExitStrategy(),
+        RandomWithinSectionStrategy(),
+        LeasedSectionStrategy(),
+        ForecastSteeringStrategy(),
+        FirstFreeStrategy(),
+    )
+}
+
+
+def get_strategy(vehicle_type, name=None):
+    """Resolve a strategy by name, or the one configured for `vehicle_type`."""
+    if name is None:
+        name = settings.SLOT_ALLOCATION_STRATEGIES.get(
+            vehicle_type, settings.SLOT_ALLOCATION_DEFAULT_STRATEGY
+        )
+    try:
+        return STRATEGIES[name]
+    except KeyError:
+        raise ImproperlyConfigured(
+            f"Unknown slot allocation strategy {name!r}; "
+            f"choose one of {', '.join(sorted(STRATEGIES))}."
+        )
@@ -2,34 +2,61 @@ import math
 from django.utils import timezone
 from django.core.cache import cache
 from parking.models import ParkingConfig
+from parking.sites import get_current_site
 
 
 class BillingService:
     CACHE_TTL = 86400  # 24 hours
 
     @staticmethod
-    def _get_config(vehicle_type):
+    def _get_config(vehicle_type, site):
         """Retrieve ParkingConfig from cache or database."""
-        cache_key = f"parking_config_{vehicle_type}"
+        cache_key = f"parking_config_{site}_{vehicle_type}"
         config = cache.get(cache_key)
         if not config:
-            config = ParkingConfig.objects.get(vehicle_type=vehicle_type)
+            config = ParkingConfig.objects.get(site=site, vehicle_type=vehicle_type)
             cache.set(cache_key, config, BillingService.CACHE_TTL)
         return config
 
     @staticmethod
-    def calculate(ticket):
-        config = BillingService._get_config(ticket.vehicle_type)
-        floor_increment = ticket.slot.floor.price_increment
+    def invalidate(vehicle_type, site=None):
+        """Drop the cached ParkingConfig, e.g. after tariffs change."""
+        cache.delete(f"parking_config_{site or get_current_site()}_{vehicle_type}")
+
+    @staticmethod
+    def calculate(ticket, now=None):
+        """Bill `ticket` as of `now` (defaults to the current time).
+
+        Stays on a pass cost nothing here; passes are billed monthly (see
+        `services.passes.PassBilling`).
+        """
+        if ticket.parking_pass_id:
+            now = now or timezone.now()
+            return 0, 0, 0, math.ceil((now - ticket.check_in).total_seconds() / 3600)
+        config = BillingService._get_config(ticket.vehicle_type, ticket.site)
+        return BillingService.price(
+            config,
+            ticket.slot.floor.price_increment,
+            ticket.check_in,
+            ticket.initial_payment,
+            now or timezone.now(),
+        )
+
+    @staticmethod
+    def price(config, floor_increment, check_in, initial_payment, now):
+        """Tariff arithmetic, free of database access.
+
+        Returns `(total, refund, due, hours)`.
+        """
         base_price = config.base_price + floor_increment
 
-        hours = math.ceil((timezone.now() - ticket.check_in).total_seconds() / 3600)
+        hours = math.ceil((now - check_in).total_seconds() / 3600)
 
         total = base_price
         if hours > config.base_hours:
             total += (hours - config.base_hours) * config.extra_per_hour
 
-        refund = max(ticket.initial_payment - total, 0)
-        due = max(total - ticket.initial_payment, 0)
+        refund = max(initial_payment - total, 0)
+        due = max(total - initial_payment, 0)
 
         return total, refund, due, hours
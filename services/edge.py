@@ -0,0 +1,473 @@
+"""Edge mode: gates that keep booking and checking out through DB outages.
+
+A gate leases a floor section from the central database and keeps a local
+snapshot of its slots and tariffs in an append-only SQLite journal on its
+own disk. Bookings and checkouts at the gate only touch that journal;
+`EdgeSync.replay` pushes journal entries to the central database in
+batches, detecting conflicts on `Slot.is_available` and `Ticket.check_out`.
+"""
+
+import json
+import logging
+import sqlite3
+import uuid
+from dataclasses import dataclass
+from datetime import datetime
+
+from django.conf import settings
+from django.db import router, transaction
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+from parking.models import Floor, ParkingConfig, Slot, SlotEvent, SlotLease, Ticket
+from services.billing import BillingService
+from services.reservations import reserving_passes
+from services.slot_events import SlotEventLog
+from services.slot_leases import LeaseCoordinator
+from services.slot_maintenance import settle_pending_blocks
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,
+    ref TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    created_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_ref ON entries (ref);
+CREATE TABLE IF NOT EXISTS cursor (id INTEGER PRIMARY KEY CHECK (id = 1), seq INTEGER);
+CREATE TABLE IF NOT EXISTS conflicts (seq INTEGER PRIMARY KEY, reason TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS slots (
+    slot_id INTEGER PRIMARY KEY,
+    floor_number INTEGER NOT NULL,
+    price_increment INTEGER NOT NULL,
+    section TEXT NOT NULL,
+    slot_number INTEGER NOT NULL,
+    vehicle_type TEXT NOT NULL,
+    is_available INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS tariffs (
+    vehicle_type TEXT PRIMARY KEY,
+    base_price INTEGER NOT NULL,
+    base_hours INTEGER NOT NULL,
+    extra_per_hour INTEGER NOT NULL
+);
+"""
+
+
+@dataclass
+class EdgeFloor:
+    number: int
+    price_increment: int
+
+    def __str__(self):
+        return f"Floor {self.number}"
+
+
+@dataclass
+class EdgeSlot:
+    id: int
+    floor: EdgeFloor
+    section: str
+    slot_number: int
+    vehicle_type: str
+    is_available: bool
+
+    def __str__(self):
+        return f"{self.floor}-{self.section}-{self.slot_number}"
+
+
+@dataclass
+class EdgeTicket:
+    """A ticket issued by the gate; `id` is its edge reference."""
+
+    id: str
+    vehicle_number: str
+    phone: str
+    email: str
+    vehicle_type: str
+    slot: EdgeSlot
+    check_in: datetime
+    initial_payment: int
+    check_out: datetime = None
+    final_amount: int = None
+    qr_url = None
+
+    @property
+    def checkout_code(self):
+        return self.id
+
+
+class EdgeJournal:
+    """Append-only journal of gate operations, in a local SQLite file.
+
+    Entries are never rewritten: replay progress is a separate cursor and
+    conflicts are recorded alongside.
+    """
+
+    def __init__(self, path):
+        self.path = str(path)
+        with self._connect() as db:
+            db.executescript(SCHEMA)
+
+    def _connect(self):
+        db = sqlite3.connect(self.path, timeout=5)
+        db.row_factory = sqlite3.Row
+        db.execute("PRAGMA journal_mode=WAL")
+        return db
+
+    def append(self, kind, ref, payload, db=None):
+        own = db is None
+        db = db or self._connect()
+        try:
+            db.execute(
+                "INSERT INTO entries (kind, ref, payload, created_at) VALUES (?, ?, ?, ?)",
+                (kind, ref, json.dumps(payload), timezone.now().isoformat()),
+            )
+            if own:
+                db.commit()
+        finally:
+            if own:
+                db.close()
+
+    def pending(self, limit):
+        with self._connect() as db:
+            row = db.execute("SELECT seq FROM cursor WHERE id = 1").fetchone()
+            after = row["seq"] if row else 0
+            return [
+                (
+                    entry["seq"],
+                    entry["kind"],
+                    entry["ref"],
+                    json.loads(entry["payload"]),
+                )
+                for entry in db.execute(
+                    "SELECT * FROM entries WHERE seq > ? ORDER BY seq LIMIT ?",
+                    (after, limit),
+                )
+            ]
+
+    def advance(self, seq, conflicts=()):
+        with self._connect() as db:
+            db.executemany(
+                "INSERT OR REPLACE INTO conflicts (seq, reason) VALUES (?, ?)",
+                conflicts,
+            )
+            db.execute("INSERT OR REPLACE INTO cursor (id, seq) VALUES (1, ?)", (seq,))
+
+    def conflicts(self):
+        with self._connect() as db:
+            return [tuple(row) for row in db.execute("SELECT * FROM conflicts")]
+
+    def backlog(self):
+        with self._connect() as db:
+            row = db.execute("SELECT seq FROM cursor WHERE id = 1").fetchone()
+            after = row["seq"] if row else 0
+            return db.execute(
+                "SELECT COUNT(*) FROM entries WHERE seq > ?", (after,)
+            ).fetchone()[0]
+
+
+class EdgeGate:
+    """Local booking and checkout against the gate's leased slots."""
+
+    def __init__(self, journal, gate_id):
+        self.journal = journal
+        self.gate_id = gate_id
+
+    @classmethod
+    def from_settings(cls):
+        return cls(EdgeJournal(settings.EDGE_JOURNAL_PATH), settings.PARKING_NODE_ID)
+
+    # ---- Central side: lease and snapshot (needs the central DB) ----
+
+    def refresh_lease(self, vehicle_type):
+        """Lease a section for this gate and snapshot its slots and tariffs."""
+        lease = SlotLease.objects.filter(
+            holder=self.gate_id,
+            vehicle_type=vehicle_type,
+            expires_at__gt=timezone.now(),
+        ).first() or LeaseCoordinator.acquire(self.gate_id, vehicle_type)
+        if lease is None:
+            return None
+        floor = Floor.objects.get(id=lease.floor_id)
+        config = ParkingConfig.objects.get(site=floor.site, vehicle_type=vehicle_type)
+        slots = Slot.objects.filter(floor=floor, section=lease.section).values_list(
+            "id", "slot_number", "is_available", "is_blocked"
+        )
+        # Slots reserved for passes are not booked here while the lease lasts
+        reserved = set(
+            reserving_passes(timezone.now(), lease.expires_at)
+            .filter(slot__floor=floor, slot__section=lease.section)
+            .values_list("slot_id", flat=True)
+        )
+        with self.journal._connect() as db:
+            booked_here = {
+                json.loads(row["payload"])["slot_id"]
+                for row in db.execute(
+                    "SELECT payload FROM entries WHERE kind = 'BOOK' AND ref NOT IN "
+                    "(SELECT ref FROM entries WHERE kind = 'CHECKOUT')"
+                )
+            }
+            db.execute("DELETE FROM slots WHERE vehicle_type = ?", (vehicle_type,))
+            db.executemany(
+                "INSERT INTO slots VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (
+                        slot_id,
+                        floor.number,
+                        floor.price_increment,
+                        lease.section,
+                        number,
+                        vehicle_type,
+                        int(
+                            available
+                            and not blocked
+                            and slot_id not in booked_here
+                            and slot_id not in reserved
+                        ),
+                    )
+                    for slot_id, number, available, blocked in slots
+                ],
+            )
+            db.execute(
+                "INSERT OR REPLACE INTO tariffs VALUES (?, ?, ?, ?)",
+                (
+                    vehicle_type,
+                    config.base_price,
+                    config.base_hours,
+                    config.extra_per_hour,
+                ),
+            )
+        return lease
+
+    # ---- Gate side: local disk only ----
+
+    def slots(self, vehicle_type):
+        with self.journal._connect() as db:
+            rows = db.execute(
+                "SELECT * FROM slots WHERE vehicle_type = ? "
+                "ORDER BY section, slot_number",
+                (vehicle_type,),
+            ).fetchall()
+        return [self._slot(row) for row in rows]
+
+    def get_slot(self, slot_id):
+        with self.journal._connect() as db:
+            row = db.execute(
+                "SELECT * FROM slots WHERE slot_id = ?", (slot_id,)
+            ).fetchone()
+        return self._slot(row) if row else None
+
+    def base_price(self, vehicle_type):
+        with self.journal._connect() as db:
+            row = db.execute(
+                "SELECT base_price FROM tariffs WHERE vehicle_type = ?", (vehicle_type,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def book(self, vehicle_type, vehicle_number, phone, email, initial_payment=0):
+        """Claim a leased slot and journal the booking. None if the lease is full."""
+        ref = f"{self.gate_id}-{uuid.uuid4().hex[:10]}"
+        now = timezone.now()
+        db = self.journal._connect()
+        try:
+            db.execute("BEGIN IMMEDIATE")
+            row = db.execute(
+                "SELECT * FROM slots WHERE vehicle_type = ? AND is_available = 1 "
+                "ORDER BY slot_number LIMIT 1",
+                (vehicle_type,),
+            ).fetchone()
+            if row is None:
+                db.rollback()
+                return None
+            db.execute(
+                "UPDATE slots SET is_available = 0 WHERE slot_id = ?", (row["slot_id"],)
+            )
+            payload = {
+                "slot_id": row["slot_id"],
+                "vehicle_number": vehicle_number,
+                "phone": phone,
+                "email": email,
+                "vehicle_type": vehicle_type,
+                "initial_payment": initial_payment,
+                "check_in": now.isoformat(),
+            }
+            self.journal.append("BOOK", ref, payload, db=db)
+            db.commit()
+        finally:
+            db.close()
+        return self._ticket(ref, payload, self._slot(row))
+
+    def check_out(self, ref):
+        """Bill and close a ticket booked at this gate. None if unknown or used."""
+        now = timezone.now()
+        db = self.journal._connect()
+        try:
+            db.execute("BEGIN IMMEDIATE")
+            entries = {
+                row["kind"]: json.loads(row["payload"])
+                for row in db.execute(
+                    "SELECT kind, payload FROM entries WHERE ref = ?", (ref,)
+                )
+            }
+            booking = entries.get("BOOK")
+            if booking is None or "CHECKOUT" in entries:
+                db.rollback()
+                return None
+            slot_row = db.execute(
+                "SELECT * FROM slots WHERE slot_id = ?", (booking["slot_id"],)
+            ).fetchone()
+            tariff = db.execute(
+                "SELECT * FROM tariffs WHERE vehicle_type = ?",
+                (booking["vehicle_type"],),
+            ).fetchone()
+            if slot_row is None or tariff is None:
+                db.rollback()
+                return None
+            ticket = self._ticket(ref, booking, self._slot(slot_row))
+            config = ParkingConfig(
+                base_price=tariff["base_price"],
+                base_hours=tariff["base_hours"],
+                extra_per_hour=tariff["extra_per_hour"],
+            )
+            total, refund, due, hours = BillingService.price(
+                config,
+                ticket.slot.floor.price_increment,
+                ticket.check_in,
+                ticket.initial_payment,
+                now,
+            )
+            ticket.check_out = now
+            ticket.final_amount = total
+            db.execute(
+                "UPDATE slots SET is_available = 1 WHERE slot_id = ?",
+                (booking["slot_id"],),
+            )
+            self.journal.append(
+                "CHECKOUT",
+                ref,
+                {"check_out": now.isoformat(), "final_amount": total},
+                db=db,
+            )
+            db.commit()
+        finally:
+            db.close()
+        return ticket, (total, refund, due, hours)
+
+    @staticmethod
+    def _slot(row):
+        return EdgeSlot(
+            id=row["slot_id"],
+            floor=EdgeFloor(row["floor_number"], row["price_increment"]),
+            section=row["section"],
+            slot_number=row["slot_number"],
+            vehicle_type=row["vehicle_type"],
+            is_available=bool(row["is_available"]),
+        )
+
+    @staticmethod
+    def _ticket(ref, booking, slot):
+        return EdgeTicket(
+            id=ref,
+            vehicle_number=booking["vehicle_number"],
+            phone=booking["phone"],
+            email=booking["email"],
+            vehicle_type=booking["vehicle_type"],
+            slot=slot,
+            check_in=datetime.fromisoformat(booking["check_in"]),
+            initial_payment=booking["initial_payment"],
+        )
+
+
+class EdgeSync:
+    """Replays a gate's journal to the central database."""
+
+    def __init__(self, journal, gate_id):
+        self.journal = journal
+        self.gate_id = gate_id
+
+    def replay(self, batch_size=100):
+        """Apply the next batch of entries in one transaction.
+
+        Returns `(applied, conflicts)`. Entries are idempotent by edge
+        reference, so a batch interrupted by an outage is simply retried.
+        """
+        entries = self.journal.pending(batch_size)
+        if not entries:
+            return 0, []
+        conflicts = []
+        with transaction.atomic(using=router.db_for_write(Ticket)):
+            for seq, kind, ref, payload in entries:
+                reason = (
+                    self._apply_booking(ref, payload)
+                    if kind == "BOOK"
+                    else self._apply_checkout(ref, payload)
+                )
+                if reason:
+                    logger.warning(
+                        "Edge sync conflict on %s (%s): %s", ref, kind, reason
+                    )
+                    conflicts.append((seq, reason))
+        self.journal.advance(entries[-1][0], conflicts)
+        return len(entries), conflicts
+
+    @staticmethod
+    def _apply_booking(ref, payload):
+        if Ticket.objects.filter(edge_ref=ref).exists():
+            return None
+        claimed = Slot.objects.filter(id=payload["slot_id"], is_available=True).update(
+            is_available=False
+        )
+        # The vehicle is physically parked either way, so the ticket is
+        # recorded; a conflict flags the slot for an operator to resolve.
+        Ticket.objects.create(
+            edge_ref=ref,
+            vehicle_number=payload["vehicle_number"],
+            phone=payload["phone"],
+            email=payload["email"],
+            vehicle_type=payload["vehicle_type"],
+            slot_id=payload["slot_id"],
+            check_in=datetime.fromisoformat(payload["check_in"]),
+            initial_payment=payload["initial_payment"],
+        )
+        if not claimed:
+            return "slot already occupied centrally"
+        SlotEventLog.record(
+            [payload["slot_id"]],
+            SlotEvent.ALLOCATE,
+            at=datetime.fromisoformat(payload["check_in"]),
+        )
+        return None
+
+    @staticmethod
+    def _apply_checkout(ref, payload):
+        ticket = Ticket.objects.filter(edge_ref=ref).first()
+        if ticket is None:
+            return "ticket missing centrally"
+        check_out = datetime.fromisoformat(payload["check_out"])
+        closed = Ticket.objects.filter(id=ticket.id, check_out__isnull=True).update(
+            check_out=check_out, final_amount=payload["final_amount"]
+        )
+        if not closed:
+            if ticket.check_out == check_out:
+                return None  # already replayed
+            return "ticket already checked out centrally"
+        if not ticket.slot_id:
+            return None
+        # A conflicting booking may have left another open ticket on the
+        # slot; it is only freed once none is left.
+        open_tickets = Ticket.objects.filter(
+            slot=OuterRef("pk"), check_out__isnull=True
+        )
+        released = (
+            Slot.objects.filter(id=ticket.slot_id)
+            .filter(~Exists(open_tickets))
+            .update(is_available=True)
+        )
+        if released:
+            SlotEventLog.record([ticket.slot_id], SlotEvent.RELEASE, at=check_out)
+            settle_pending_blocks([ticket.slot_id], at=check_out)
+        return None
@@ -0,0 +1,305 @@
+"""Occupancy forecasts per floor, for entry signage and floor steering.
+
+`RateModel` keeps hourly arrival and departure counts of every (floor,
+vehicle type) over the last `FORECAST_HISTORY_WEEKS` weeks in NumPy ring
+buffers. Rates per hour of the week are the mean over the weeks observed.
+Refits are incremental: at most once per `FORECAST_REFIT_SECONDS`, only the
+hours completed since the previous fit are read from `Ticket.check_in` /
+`check_out`. Forecasts run on the in-memory model plus one query for the
+current free slots.
+
+NumPy is imported on first use, like the render libraries (see
+`services.warmup`).
+"""
+
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import router
+from django.db.models import Count, Func, IntegerField, Q
+from django.utils import timezone
+
+from parking.models import Floor, Ticket
+from parking.sites import get_current_site
+
+HOURS_PER_WEEK = 7 * 24
+
+
+def _hour(when):
+    """Hours since the epoch of `when`."""
+    return int(when.timestamp() // 3600)
+
+
+def _hour_start(hour):
+    return datetime.fromtimestamp(hour * 3600, tz=dt_timezone.utc)
+
+
+class EpochHour(Func):
+    """Hours since the epoch of a datetime column, computed natively by the
+    database (`TruncHour` runs a Python function per row on SQLite)."""
+
+    template = "CAST(FLOOR(EXTRACT(EPOCH FROM %(expressions)s) / 3600) AS INTEGER)"
+    output_field = IntegerField()
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        return self.as_sql(
+            compiler,
+            connection,
+            template="CAST(strftime('%%%%s', %(expressions)s) AS INTEGER) / 3600",
+            **extra_context,
+        )
+
+
+class RateModel:
+    """Hourly arrival/departure counts per (floor id, vehicle type), one ring
+    buffer row per pair, for one database."""
+
+    def __init__(self, weeks):
+        import numpy as np
+
+        self.hours = weeks * HOURS_PER_WEEK
+        self.rows = {}  # (floor_id, vehicle_type) -> row
+        self.arrivals = np.zeros((0, self.hours))
+        self.departures = np.zeros((0, self.hours))
+        # Whether each ring hour holds data (history may be shorter than
+        # the window)
+        self.observed = np.zeros(self.hours, dtype=bool)
+        self.fitted_until = None  # hour, exclusive
+        self.fitted_at = None  # time.monotonic() of the last fit
+        self.lock = threading.Lock()
+
+    def _row_indexes(self, keys):
+        import numpy as np
+
+        new = [key for key in dict.fromkeys(keys) if key not in self.rows]
+        if new:
+            for key in new:
+                self.rows[key] = len(self.rows)
+            padding = np.zeros((len(new), self.hours))
+            self.arrivals = np.vstack([self.arrivals, padding])
+            self.departures = np.vstack([self.departures, padding])
+        return np.fromiter((self.rows[key] for key in keys), int, len(keys))
+
+    def _count(self, field, tickets, timestamp):
+        """Add the `tickets` per floor, vehicle type and hour of their
+        `timestamp` field to the `field` ("arrivals" or "departures") counts.
+
+        The database groups by hour, so at most one row per floor, vehicle
+        type and hour is read however many tickets there are.
+        """
+        import numpy as np
+
+        rows = list(
+            tickets.annotate(hour=EpochHour(timestamp))
+            .values_list("slot__floor_id", "vehicle_type", "hour")
+            .annotate(count=Count("id"))
+            .order_by()
+        )
+        if not rows:
+            return
+        indexes = self._row_indexes([(floor_id, kind) for floor_id, kind, _, _ in rows])
+        hours = np.fromiter((hour for _, _, hour, _ in rows), int, len(rows))
+        counts = np.fromiter((count for _, _, _, count in rows), float, len(rows))
+        np.add.at(getattr(self, field), (indexes, hours % self.hours), counts)
+
+    def fit(self, using, now=None):
+        """Read the hours completed since the last fit into the ring buffers."""
+        import numpy as np
+
+        now_hour = _hour(now or timezone.now())
+        start = now_hour - self.hours
+        if self.fitted_until is not None:
+            start = max(start, self.fitted_until)
+        else:
+            first = (
+                Ticket.objects.using(using)
+                .filter(check_in__gte=_hour_start(start))
+                .order_by("check_in")
+                .values_list("check_in", flat=True)
+                .first()
+            )
+            start = _hour(first) if first else now_hour
+        if start < now_hour:
+            ring = np.arange(start, now_hour) % self.hours
+            self.arrivals[:, ring] = 0
+            self.departures[:, ring] = 0
+            self.observed[ring] = True
+
+            tickets = Ticket.objects.using(using).filter(slot__isnull=False)
+            since, until = _hour_start(start), _hour_start(now_hour)
+            self._count(
+                "arrivals",
+                tickets.filter(check_in__gte=since, check_in__lt=until),
+                "check_in",
+            )
+            self._count(
+                "departures",
+                tickets.filter(check_out__gte=since, check_out__lt=until),
+                "check_out",
+            )
+        self.fitted_until = now_hour
+        self.fitted_at = time.monotonic()
+
+    def rates(self, keys, start_hour, horizon):
+        """`(arrivals, departures)` per hour, shape `(len(keys), horizon)`,
+        for the hours from `start_hour` on."""
+        import numpy as np
+
+        weeks = self.hours // HOURS_PER_WEEK
+        # Ring hour h falls on hour-of-week h % 168, as the ring spans whole weeks
+        observed = self.observed.reshape(weeks, HOURS_PER_WEEK).sum(axis=0)
+        observed = np.maximum(observed, 1)
+        hours_of_week = (start_hour + np.arange(horizon)) % HOURS_PER_WEEK
+        result = []
+        for counts in (self.arrivals, self.departures):
+            weekly = counts.reshape(len(self.rows), weeks, HOURS_PER_WEEK).sum(axis=1)
+            weekly = weekly / observed
+            rows = [self.rows.get(key) for key in keys]
+            rates = np.zeros((len(keys), horizon))
+            known = [i for i, row in enumerate(rows) if row is not None]
+            if known:
+                rates[known] = weekly[[rows[i] for i in known]][:, hours_of_week]
+            result.append(rates)
+        return tuple(result)
+
+
+def minutes_until_full(free, arrivals, departures, minute_of_hour):
+    """Minutes until each floor's free slots are used up by the net inflow,
+    or NaN where that does not happen within the horizon.
+
+    `free` has one entry per floor; `arrivals` and `departures` are hourly
+    rates, shape `(floors, horizon)`, starting with the current hour.
+    """
+    import numpy as np
+
+    free = np.asarray(free, dtype=float)
+    net = arrivals - departures
+    first_hour = (60 - minute_of_hour) / 60  # part of the current hour left
+    net[:, 0] *= first_hour
+    filled = np.cumsum(net, axis=1)
+    full = filled >= free[:, None]
+    fills = full.any(axis=1)
+    hour = full.argmax(axis=1)
+    floors = np.arange(len(free))
+    before = np.where(hour > 0, filled[floors, hour - 1], 0.0)
+    step = net[floors, hour]
+    fraction = np.clip(
+        np.divide(free - before, step, out=np.zeros_like(free), where=step > 0), 0, 1
+    )
+    starts = np.where(hour == 0, 0.0, (first_hour + hour - 1) * 60)
+    lengths = np.where(hour == 0, first_hour * 60, 60.0)
+    minutes = starts + fraction * lengths
+    return np.where(free <= 0, 0.0, np.where(fills, minutes, np.nan))
+
+
+_models = {}
+_models_lock = threading.Lock()
+
+
+def get_model(using, now=None):
+    """The rate model of `using`, refitted if it is older than
+    `FORECAST_REFIT_SECONDS`."""
+    with _models_lock:
+        if using not in _models:
+            _models[using] = RateModel(settings.FORECAST_HISTORY_WEEKS)
+        model = _models[using]
+    with model.lock:
+        if (
+            model.fitted_at is None
+            or time.monotonic() - model.fitted_at >= settings.FORECAST_REFIT_SECONDS
+        ):
+            model.fit(using, now=now)
+    return model
+
+
+@dataclass
+class FloorForecast:
+    floor_id: int
+    floor_number: int
+    free: int
+    arrivals_per_hour: float
+    departures_per_hour: float
+    minutes_until_full: float | None  # None: not within the horizon
+
+    @property
+    def fills_within(self):
+        """Minutes until full for ordering: floors that do not fill last."""
+        if self.minutes_until_full is None:
+            return float("inf")
+        return self.minutes_until_full
+
+
+class OccupancyForecast:
+    @staticmethod
+    def floors(vehicle_type, site=None, now=None):
+        """`FloorForecast` of every floor of `site` for `vehicle_type`, by
+        floor number."""
+        import numpy as np
+
+        site = site or get_current_site()
+        now = now or timezone.now()
+        using = router.db_for_read(Ticket)
+        floors = list(
+            Floor.objects.using(using)
+            .filter(site=site)
+            .annotate(
+                free=Count(
+                    "slot",
+                    filter=Q(
+                        slot__vehicle_type=vehicle_type,
+                        slot__is_available=True,
+                        slot__is_blocked=False,
+                    ),
+                )
+            )
+            .order_by("number")
+            .values_list("id", "number", "free")
+        )
+        if not floors:
+            return []
+        model = get_model(using, now=now)
+        keys = [(floor_id, vehicle_type) for floor_id, _, _ in floors]
+        with model.lock:
+            arrivals, departures = model.rates(
+                keys, _hour(now), settings.FORECAST_HORIZON_HOURS
+            )
+        minutes = minutes_until_full(
+            [free for _, _, free in floors],
+            arrivals,
+            departures,
+            now.minute + now.second / 60,
+        )
+        return [
+            FloorForecast(
+                floor_id=floor_id,
+                floor_number=number,
+                free=free,
+                arrivals_per_hour=round(float(arrivals[i, 0]), 2),
+                departures_per_hour=round(float(departures[i, 0]), 2),
+                minutes_until_full=(
+                    None if np.isnan(minutes[i]) else round(float(minutes[i]))
+                ),
+            )
+            for i, (floor_id, number, free) in enumerate(floors)
+        ]
+
+    @staticmethod
+    def steer(forecasts, floor_number):
+        """Floor to send an arrival to instead of `floor_number`, or None.
+
+        An arrival is steered when its floor fills within
+        `FORECAST_STEER_MINUTES` and another floor lasts longer.
+        """
+        requested = next((f for f in forecasts if f.floor_number == floor_number), None)
+        if (
+            requested is None
+            or requested.fills_within > settings.FORECAST_STEER_MINUTES
+        ):
+            return None
+        best = max(forecasts, key=lambda f: (f.fills_within, f.free))
+        if best.fills_within <= requested.fills_within or best.free == 0:
+            return None
+        return best
@@ -0,0 +1,54 @@
+"""Cached free-slot counts, for turning arrivals away from a full garage.
+
+Counts per (site, vehicle type) are kept in the cache for
+`ADMISSION_FREE_SLOTS_CACHE_SECONDS`. Allocations only make a cached count
+too high, which lets a request through to the normal checks; slots coming
+free (`RELEASE`/`UNBLOCK` events) drop the count at once, so a full garage
+reopens as soon as a car leaves.
+"""
+
+from django.conf import settings
+from django.core.cache import cache
+
+from parking.models import Slot, SlotEvent
+
+FREEING_EVENTS = {SlotEvent.RELEASE, SlotEvent.UNBLOCK}
+
+
+def _key(site, vehicle_type):
+    return f"free_slots_{site}_{vehicle_type}"
+
+
+class FreeSlotCounts:
+    @staticmethod
+    def get(site, vehicle_type):
+        key = _key(site, vehicle_type)
+        count = cache.get(key)
+        if count is None:
+            count = Slot.objects.filter(
+                floor__site=site,
+                vehicle_type=vehicle_type,
+                is_available=True,
+                is_blocked=False,
+            ).count()
+            cache.set(key, count, settings.ADMISSION_FREE_SLOTS_CACHE_SECONDS)
+        return count
+
+    @staticmethod
+    def invalidate(pairs):
+        """Drop the counts of `(site, vehicle_type)` pairs."""
+        cache.delete_many([_key(*pair) for pair in pairs])
+
+
+def invalidate_on_slot_freed(sender, events, using, **kwargs):
+    """`slot_state_changed` receiver dropping counts when slots come free."""
+    freed = {slot_id for slot_id, kind, _ in events if kind in FREEING_EVENTS}
+    if not freed:
+        return
+    pairs = (
+        Slot.objects.using(using)
+        .filter(id__in=freed)
+        .values_list("floor__site", "vehicle_type")
+        .distinct()
+    )
+    FreeSlotCounts.invalidate(list(pairs))
@@ -0,0 +1,58 @@
+"""Occupancy versions of the slot grid, for conditional GETs of `view_slots`.
+
+Each (site, vehicle type, floor) has a version, the time in nanoseconds of
+its last slot state change, kept in the cache. It is bumped when a change
+commits (`parking.signals.slot_state_changed`), so a tablet refreshing an
+unchanged grid gets a 304 without the view querying `Slot` or rendering.
+
+Versions live in the "shared" cache, so every worker process sees every
+bump; a per-process cache would answer 304 for grids changed by another
+worker. Holds and leases that start or end with the clock are not events, so
+validators also roll over every `SLOT_PAGE_MAX_STALE_SECONDS`.
+"""
+
+import time
+
+from django.core.cache import caches
+
+from parking.models import Slot
+
+KEY_TTL = 7 * 24 * 60 * 60
+
+
+def _key(site, vehicle_type, floor_number):
+    return f"slot_version_{site}_{vehicle_type}_{floor_number}"
+
+
+class OccupancyVersions:
+    @staticmethod
+    def get(site, vehicle_type, floor_number):
+        """Current version; a missing one (e.g. after a cache flush) starts now,
+        so validators issued before the flush no longer match."""
+        key = _key(site, vehicle_type, floor_number)
+        shared = caches["shared"]
+        version = shared.get(key)
+        if version is None:
+            shared.add(key, time.time_ns(), KEY_TTL)
+            version = shared.get(key) or time.time_ns()
+        return version
+
+    @staticmethod
+    def bump(grids):
+        """Mark `(site, vehicle_type, floor_number)` grids as changed now."""
+        version = time.time_ns()
+        caches["shared"].set_many(
+            {_key(*grid): version for grid in grids},
+            KEY_TTL,
+        )
+
+
+def bump_on_slot_change(sender, events, using, **kwargs):
+    """`slot_state_changed` receiver bumping the grids of the changed slots."""
+    grids = (
+        Slot.objects.using(using)
+        .filter(id__in={slot_id for slot_id, _, _ in events})
+        .values_list("floor__site", "vehicle_type", "floor__number")
+        .distinct()
+    )
+    OccupancyVersions.bump(list(grids))
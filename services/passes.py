@@ -0,0 +1,343 @@
+"""Monthly passes: plate-based entry and exit, and monthly batch billing.
+
+Gate decisions read `PassCache`, an in-memory snapshot of the valid passes
+of each database by site and normalized plate, so checking a plate takes
+microseconds and no query. The snapshot is reloaded in a background thread
+once it is older than `PASS_CACHE_REFRESH_SECONDS`, while gates keep
+reading the old one. Passes saved in this process are applied to it on
+commit; other processes see them after their next reload.
+
+A pass holder's stay is an ordinary `Ticket` linked to the pass, opened
+without QR code, PDF or email and billed nothing at checkout (see
+`BillingService.calculate`). `PassBilling` charges every pass its monthly
+fee, prorated by the days it was valid, one batch of passes at a time.
+"""
+
+import calendar
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+
+from django.conf import settings
+from django.db import connections, router, transaction
+from django.db.models import Count, Exists, OuterRef
+from django.utils import timezone
+
+from parking.metrics import REGISTRY
+from parking.models import Pass, PassInvoice, Slot, SlotEvent, Ticket
+from parking.plates import normalize_plate
+from parking.sites import get_current_site, site_database
+from services.slot_allocator import SlotAllocator
+from services.slot_events import SlotEventLog
+from services.ticketing import TicketService
+
+logger = logging.getLogger(__name__)
+
+GATE_DECISIONS = REGISTRY.counter(
+    "parking_pass_gate_decisions_total",
+    "Pass entries and exits at the gates, by outcome.",
+)
+
+
+@dataclass(frozen=True)
+class PassEntry:
+    pass_id: int
+    vehicle_number: str
+    phone: str
+    vehicle_type: str
+    slot_id: int | None  # None: pooled
+    valid_from: date
+    valid_until: date
+
+    @classmethod
+    def from_pass(cls, parking_pass):
+        return cls(
+            parking_pass.id,
+            parking_pass.vehicle_number,
+            parking_pass.phone,
+            parking_pass.vehicle_type,
+            parking_pass.slot_id,
+            parking_pass.valid_from,
+            parking_pass.valid_until,
+        )
+
+    def valid_on(self, day):
+        return self.valid_from <= day <= self.valid_until
+
+
+class PassCache:
+    """Active, unexpired passes of one database by (site, normalized plate).
+
+    Readers get the current dict without locking; loads and updates build a
+    new dict and swap it in.
+    """
+
+    def __init__(self):
+        self._passes = {}
+        self.loaded_at = None  # time.monotonic() of the last load
+        self._reloading = False
+        self._lock = threading.Lock()
+
+    def get(self, site, plate):
+        return self._passes.get((site, plate))
+
+    def load(self, using, today=None):
+        today = today or timezone.localdate()
+        rows = (
+            Pass.objects.using(using)
+            .filter(is_active=True, valid_until__gte=today)
+            .values_list(
+                "site",
+                "plate_normalized",
+                "id",
+                "vehicle_number",
+                "phone",
+                "vehicle_type",
+                "slot_id",
+                "valid_from",
+                "valid_until",
+            )
+        )
+        passes = {(site, plate): PassEntry(*fields) for site, plate, *fields in rows}
+        with self._lock:
+            self._passes = passes
+            self.loaded_at = time.monotonic()
+
+    def refresh(self, using):
+        """Load the snapshot on first use; later, reload it in the
+        background once it is older than `PASS_CACHE_REFRESH_SECONDS`."""
+        if self.loaded_at is None:
+            self.load(using)
+            return
+        if time.monotonic() - self.loaded_at < settings.PASS_CACHE_REFRESH_SECONDS:
+            return
+        with self._lock:
+            if self._reloading:
+                return
+            self._reloading = True
+        threading.Thread(
+            target=self._reload, args=(using,), name="pass-cache", daemon=True
+        ).start()
+
+    def _reload(self, using):
+        try:
+            self.load(using)
+        except Exception:
+            logger.exception("Reloading the pass cache of %s failed.", using)
+        finally:
+            self._reloading = False
+            connections[using].close()
+
+    def apply(self, parking_pass, deleted=False):
+        """Put a saved pass into the snapshot, or take a deleted one out."""
+        with self._lock:
+            passes = {
+                key: entry
+                for key, entry in self._passes.items()
+                if entry.pass_id != parking_pass.id
+            }
+            if (
+                not deleted
+                and parking_pass.is_active
+                and parking_pass.valid_until >= timezone.localdate()
+            ):
+                key = (parking_pass.site, parking_pass.plate_normalized)
+                passes[key] = PassEntry.from_pass(parking_pass)
+            self._passes = passes
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def get_cache(using):
+    with _caches_lock:
+        if using not in _caches:
+            _caches[using] = PassCache()
+        return _caches[using]
+
+
+def apply_saved_pass(sender, instance, using, **kwargs):
+    """`post_save` receiver updating this process's pass cache on commit."""
+    transaction.on_commit(lambda: get_cache(using).apply(instance), using=using)
+
+
+def apply_deleted_pass(sender, instance, using, **kwargs):
+    """`post_delete` receiver updating this process's pass cache on commit."""
+    transaction.on_commit(
+        lambda: get_cache(using).apply(instance, deleted=True), using=using
+    )
+
+
+class PassService:
+    @staticmethod
+    def check(plate, site=None, today=None):
+        """Gate decision for `plate`, from the pass cache alone.
+
+        Returns `(entry, None)` for a pass valid today, else `(None,
+        reason)` with reason "no_pass" or "not_valid_today".
+        """
+        site = site or get_current_site()
+        using = site_database(site)
+        cache = get_cache(using)
+        cache.refresh(using)
+        entry = cache.get(site, normalize_plate(plate))
+        if entry is None:
+            return None, "no_pass"
+        if not entry.valid_on(today or timezone.localdate()):
+            return None, "not_valid_today"
+        return entry, None
+
+    @staticmethod
+    def enter(entry, now=None):
+        """Open the stay of a pass holder on their reserved slot, or on the
+        first free slot of their vehicle type if the pass is pooled or the
+        reserved slot is taken or blocked.
+
+        A second read of a vehicle already inside returns its open ticket.
+        Returns None when no slot is free.
+        """
+        now = now or timezone.now()
+        with transaction.atomic(using=router.db_for_write(Ticket)):
+            # Reads of the same plate at two gates wait for each other here,
+            # so the second one finds the stay the first one opened.
+            Pass.objects.select_for_update().get(id=entry.pass_id)
+            inside = Ticket.objects.filter(
+                parking_pass_id=entry.pass_id, check_out__isnull=True
+            ).first()
+            if inside:
+                return inside
+            if entry.slot_id and Slot.objects.filter(
+                id=entry.slot_id, is_available=True, is_blocked=False
+            ).update(is_available=False):
+                slot = Slot.objects.get(id=entry.slot_id)
+                SlotEventLog.record(
+                    [slot.id], SlotEvent.ALLOCATE, at=now, using=slot._state.db
+                )
+            else:
+                slot = SlotAllocator.allocate(
+                    entry.vehicle_type, None, None, strategy="first_free"
+                )
+            if slot is None:
+                return None
+            return Ticket.objects.create(
+                parking_pass_id=entry.pass_id,
+                vehicle_number=entry.vehicle_number,
+                phone=entry.phone,
+                vehicle_type=entry.vehicle_type,
+                slot=slot,
+                check_in=now,
+            )
+
+    @staticmethod
+    def leave(plate, site=None, now=None):
+        """Close the open pass stay of `plate` and free its slot.
+
+        Returns the ticket, or None if the vehicle has no open pass stay
+        (its driver then checks out with a token as usual) or another read
+        closed it first.
+        """
+        site = site or get_current_site()
+        ticket = (
+            Ticket.objects.select_related("slot__floor")
+            .filter(
+                site=site,
+                plate_normalized=normalize_plate(plate),
+                parking_pass__isnull=False,
+                check_out__isnull=True,
+            )
+            .order_by("-check_in")
+            .first()
+        )
+        if ticket is None:
+            return None
+        if TicketService.check_out(ticket, now=now) is None:
+            return None
+        return ticket
+
+
+def previous_month(today=None):
+    """First day of the month before `today`."""
+    first = (today or timezone.localdate()).replace(day=1)
+    return (first - timedelta(days=1)).replace(day=1)
+
+
+class PassBilling:
+    @staticmethod
+    def run(month, using="default", batch_size=None):
+        """Invoice every active pass valid on any day of `month` (a date in
+        it): its monthly fee prorated by the days it was valid, and its
+        visits that month.
+
+        Passes already invoiced for the month are skipped, so a rerun only
+        bills the rest. Returns `(invoiced, amount)`.
+        """
+        batch_size = batch_size or settings.PASS_BILLING_BATCH_SIZE
+        first = month.replace(day=1)
+        days_in_month = calendar.monthrange(first.year, first.month)[1]
+        last = first.replace(day=days_in_month)
+        start = timezone.make_aware(datetime.combine(first, datetime.min.time()))
+        end = timezone.make_aware(
+            datetime.combine(last + timedelta(days=1), datetime.min.time())
+        )
+        passes = (
+            Pass.objects.using(using)
+            .filter(is_active=True, valid_from__lte=last, valid_until__gte=first)
+            .exclude(
+                Exists(
+                    PassInvoice.objects.filter(parking_pass=OuterRef("pk"), month=first)
+                )
+            )
+            .order_by("id")
+        )
+
+        invoiced = amount = 0
+        last_id = 0
+        while True:
+            batch = list(
+                passes.filter(id__gt=last_id).values_list(
+                    "id", "valid_from", "valid_until", "monthly_fee"
+                )[:batch_size]
+            )
+            if not batch:
+                break
+            last_id = batch[-1][0]
+            visits = dict(
+                Ticket.objects.using(using)
+                .filter(
+                    parking_pass_id__in=[pass_id for pass_id, *_ in batch],
+                    check_in__gte=start,
+                    check_in__lt=end,
+                )
+                .values_list("parking_pass_id")
+                .annotate(Count("id"))
+                .order_by()
+            )
+            invoices = []
+            for pass_id, valid_from, valid_until, fee in batch:
+                days = (min(valid_until, last) - max(valid_from, first)).days + 1
+                invoices.append(
+                    PassInvoice(
+                        parking_pass_id=pass_id,
+                        month=first,
+                        days=days,
+                        visits=visits.get(pass_id, 0),
+                        amount=round(fee * days / days_in_month),
+                    )
+                )
+            PassInvoice.objects.using(using).bulk_create(
+                invoices, ignore_conflicts=True
+            )
+            invoiced += len(invoices)
+            amount += sum(invoice.amount for invoice in invoices)
+
+        logger.info(
+            "Invoiced %s pass(es) on %s for %s: Rs %s.",
+            invoiced,
+            using,
+            f"{first:%b %Y}",
+            amount,
+        )
+        return invoiced, amount
@@ -1,24 +1,39 @@
-from reportlab.pdfgen import canvas
-from reportlab.lib.pagesizes import A4
-from reportlab.lib.utils import ImageReader
 from io import BytesIO
-import qrcode
-from decouple import config
+from parking.metrics import track_service
+from services.qr_generator import qr_png
+from services.render_pool import render
 
 
-BOX_SIZE = int(config("QR_BOX_SIZE"))
-BORDER = int(config("QR_BORDER"))
+def token_fields(ticket):
+    """Plain values printed on the token, so rendering needs no models."""
+    return {
+        "id": ticket.id,
+        "code": ticket.checkout_code,
+        "vehicle_number": ticket.vehicle_number,
+        "phone": ticket.phone,
+        "email": ticket.email,
+        "vehicle_type": ticket.vehicle_type,
+        "slot": str(ticket.slot),
+        "check_in": ticket.check_in.strftime("%d %B %Y, %I:%M %p"),
+        "initial_payment": ticket.initial_payment,
+    }
 
 
+@track_service("pdf")
 def generate_parking_token_pdf(ticket, checkout_url):
-    # Generate QR for PDF
-    qr = qrcode.QRCode(version=1, box_size=BOX_SIZE, border=BORDER)
-    qr.add_data(checkout_url)
-    qr.make(fit=True)
-    qr_img = qr.make_image(fill_color="black", back_color="white")
-    qr_buffer = BytesIO()
-    qr_img.save(qr_buffer, format="PNG")
-    qr_buffer.seek(0)
+    # QR for PDF, shared with the one rendered for the ticket page
+    png = qr_png(checkout_url)
+    return BytesIO(render(render_token_pdf, token_fields(ticket), png))
+
+
+def render_token_pdf(ticket, qr_png_bytes):
+    """PDF bytes of the token for `token_fields` values; runs in the render pool."""
+    # ReportLab is imported on first use (see services.warmup)
+    from reportlab.pdfgen import canvas
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib.utils import ImageReader
+
+    qr_buffer = BytesIO(qr_png_bytes)
 
     # Create PDF
     pdf_buffer = BytesIO()
@@ -46,21 +61,21 @@ def generate_parking_token_pdf(ticket, checkout_url):
 
     # Token & Details
     p.setFont("Helvetica-Bold", 28)
-    p.drawCentredString(width / 2, height - 500, f"TOKEN NO: {ticket.id}")
+    p.drawCentredString(width / 2, height - 500, f"TOKEN NO: {ticket['code']}")
 
     y = height - 570
     p.setFont("Helvetica-Bold", 16)
     details = [
-        ("Vehicle Number", ticket.vehicle_number),
-        ("Phone Number", ticket.phone),
-        ("Email", ticket.email or "N/A"),
+        ("Vehicle Number", ticket["vehicle_number"]),
+        ("Phone Number", ticket["phone"]),
+        ("Email", ticket["email"] or "N/A"),
         (
             "Vehicle Type",
-            "4-Wheeler" if ticket.vehicle_type == "CAR" else "2-Wheeler",
+            "4-Wheeler" if ticket["vehicle_type"] == "CAR" else "2-Wheeler",
         ),
-        ("Parking Slot", str(ticket.slot)),
-        ("Check-in Time", ticket.check_in.strftime("%d %B %Y, %I:%M %p")),
-        ("Initial Payment", f"₹{ticket.initial_payment}"),
+        ("Parking Slot", ticket["slot"]),
+        ("Check-in Time", ticket["check_in"]),
+        ("Initial Payment", f"₹{ticket['initial_payment']}"),
     ]
     for label, value in details:
         p.drawString(100, y, f"{label}:")
@@ -75,5 +90,4 @@ def generate_parking_token_pdf(ticket, checkout_url):
 
     p.showPage()
     p.save()
-    pdf_buffer.seek(0)
-    return pdf_buffer
+    return pdf_buffer.getvalue()
@@ -0,0 +1,167 @@
+"""Fuzzy plate lookup over open tickets, for customers who lost their token.
+
+Typed plates are compared by their normalized form ("RJ14-CC-1234" and
+"rj14 cc1234" both become "RJ14CC1234") and ranked by trigram similarity,
+so near misses such as "RJ14C1234" still find the ticket. On Postgres the
+pg_trgm index from migration 0011 answers the query; other databases use an
+in-process trigram index over open tickets, topped up with newly opened
+tickets on each lookup.
+"""
+
+import heapq
+import threading
+import time
+from collections import Counter, defaultdict
+
+from django.db import connections, router
+
+from parking.models import Ticket
+from parking.plates import normalize_plate, trigrams
+
+# Re-read this many ids below the highest indexed one on each refresh, so
+# tickets committed out of id order are still picked up.
+REFRESH_OVERLAP = 100
+# Rebuild from open tickets this often, dropping tickets closed meanwhile.
+REBUILD_SECONDS = 600
+
+
+class PlateIndex:
+    """Trigram -> open ticket ids, for one database.
+
+    Open tickets are bounded by the number of slots, so the index stays
+    small however many tickets the database holds.
+    """
+
+    def __init__(self):
+        self._grams = defaultdict(set)
+        self._tickets = {}  # id -> (site, normalized plate)
+        self._last_id = 0
+        self._built_at = None
+        self._lock = threading.Lock()
+
+    def add(self, ticket_id, site, plate):
+        with self._lock:
+            if ticket_id in self._tickets:
+                return
+            self._tickets[ticket_id] = (site, plate)
+            for gram in trigrams(plate):
+                self._grams[gram].add(ticket_id)
+            self._last_id = max(self._last_id, ticket_id)
+
+    def discard(self, ticket_ids):
+        with self._lock:
+            for ticket_id in ticket_ids:
+                entry = self._tickets.pop(ticket_id, None)
+                if entry is None:
+                    continue
+                for gram in trigrams(entry[1]):
+                    self._grams[gram].discard(ticket_id)
+
+    def refresh(self, using):
+        """Index tickets opened since the last refresh."""
+        if (
+            self._built_at is None
+            or time.monotonic() - self._built_at > REBUILD_SECONDS
+        ):
+            with self._lock:
+                self._grams.clear()
+                self._tickets.clear()
+                self._last_id = 0
+                self._built_at = time.monotonic()
+        rows = (
+            Ticket.objects.using(using)
+            .filter(id__gt=self._last_id - REFRESH_OVERLAP, check_out__isnull=True)
+            .values_list("id", "site", "plate_normalized")
+        )
+        for ticket_id, site, plate in rows.iterator():
+            self.add(ticket_id, site, plate)
+
+    def search(self, plate, site, limit):
+        """`(ticket_id, score)` of the best matches, by Dice similarity."""
+        grams = trigrams(plate)
+        shared = Counter()
+        scored = []
+        with self._lock:
+            for gram in grams:
+                shared.update(self._grams.get(gram, ()))
+            for ticket_id, count in shared.items():
+                ticket_site, ticket_plate = self._tickets[ticket_id]
+                if ticket_site == site:
+                    size = len(grams) + len(trigrams(ticket_plate))
+                    scored.append((2 * count / size, ticket_id))
+        return [
+            (ticket_id, score) for score, ticket_id in heapq.nlargest(limit, scored)
+        ]
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def get_index(using):
+    with _indexes_lock:
+        if using not in _indexes:
+            _indexes[using] = PlateIndex()
+        return _indexes[using]
+
+
+class PlateSearch:
+    MIN_SCORE = 0.3
+
+    @staticmethod
+    def lookup(query, site, limit=10):
+        """Open tickets of `site` whose plate resembles `query`, best first.
+
+        Returns `[(ticket, score)]` with scores in (0, 1].
+        """
+        plate = normalize_plate(query)
+        if not plate:
+            return []
+        using = router.db_for_read(Ticket)
+        if connections[using].vendor == "postgresql":
+            return PlateSearch._lookup_trigram(plate, site, limit, using)
+        return PlateSearch._lookup_in_memory(plate, site, limit, using)
+
+    @staticmethod
+    def _lookup_trigram(plate, site, limit, using):
+        from django.contrib.postgres.lookups import TrigramSimilar
+        from django.contrib.postgres.search import TrigramSimilarity
+        from django.db.models import F
+
+        # `%` uses the partial GIN index; similarity() only ranks its hits.
+        tickets = (
+            Ticket.objects.using(using)
+            .select_related("slot__floor")
+            .filter(TrigramSimilar(F("plate_normalized"), plate))
+            .filter(site=site, check_out__isnull=True)
+            .annotate(score=TrigramSimilarity("plate_normalized", plate))
+            .order_by("-score", "-check_in")[:limit]
+        )
+        return [(ticket, ticket.score) for ticket in tickets]
+
+    @staticmethod
+    def _lookup_in_memory(plate, site, limit, using):
+        index = get_index(using)
+        index.refresh(using)
+        # Over-fetch: some hits may have checked out since they were indexed.
+        hits = [
+            (ticket_id, score)
+            for ticket_id, score in index.search(plate, site, limit * 2)
+            if score >= PlateSearch.MIN_SCORE
+        ]
+        tickets = (
+            Ticket.objects.using(using)
+            .select_related("slot__floor")
+            .in_bulk([ticket_id for ticket_id, _ in hits])
+        )
+        closed = [
+            ticket_id
+            for ticket_id, _ in hits
+            if ticket_id not in tickets or tickets[ticket_id].check_out is not None
+        ]
+        index.discard(closed)
+        return [
+            (tickets[ticket_id], score)
+            for ticket_id, score in hits
+            if ticket_id not in closed
+        ][:limit]
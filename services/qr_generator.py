@@ -1,19 +1,62 @@
-import qrcode
+from functools import cache, lru_cache
 from io import BytesIO
 from decouple import config
+from django.conf import settings
+from django.core.files.base import ContentFile
+from parking.metrics import track_service
+from services.render_pool import render
 
+# qrcode/PIL and the QR_* settings are loaded on first use, so processes that
+# never render a code (management commands, non-web workers) skip them; web
+# workers load them up front through `services.warmup`.
 
-BOX_SIZE = int(config("QR_BOX_SIZE"))
-BORDER = int(config("QR_BORDER"))
 
+@cache
+def _options():
+    return {
+        "box_size": int(config("QR_BOX_SIZE")),
+        "border": int(config("QR_BORDER")),
+    }
 
-def generate_and_save_qr(ticket, url):
-    qr = qrcode.QRCode(version=1, box_size=BOX_SIZE, border=BORDER)
+
+def render_qr_png(url):
+    """PNG bytes of the QR code for `url`, rendered afresh (in this process)."""
+    import qrcode
+
+    qr = qrcode.QRCode(version=1, **_options())
     qr.add_data(url)
     qr.make(fit=True)
     img = qr.make_image(fill_color="black", back_color="white")
 
     buffer = BytesIO()
     img.save(buffer, format="PNG")
-    buffer.seek(0)
-    ticket.qr_code.save(f"qr_token_{ticket.id}.png", buffer)
+    return buffer.getvalue()
+
+
+def _render_in_pool(url):
+    return render(render_qr_png, url)
+
+
+@cache
+def _cached_renderer():
+    return lru_cache(maxsize=int(config("QR_CACHE_SIZE", default=512)))(_render_in_pool)
+
+
+def qr_png(url):
+    """PNG bytes of the QR code for `url`; recently used codes stay in memory,
+    others are rendered in the render pool.
+    """
+    return _cached_renderer()(url)
+
+
+@track_service("qr")
+def generate_and_save_qr(ticket, url):
+    """Render the ticket's QR code, and store it unless QR_STORE_FILES is off.
+
+    Without a stored file the code is regenerated on demand (see the
+    `ticket_qr` view), so media/qrcodes does not grow with every ticket.
+    """
+    png = qr_png(url)
+    if settings.QR_STORE_FILES:
+        # Named after the signed token, so stored images cannot be guessed
+        ticket.qr_code.save(f"qr_{ticket.checkout_token}.png", ContentFile(png))
@@ -0,0 +1,82 @@
+"""Lifecycle of stored QR images: purge closed tickets, migrate to sharded paths."""
+
+import logging
+import posixpath
+from datetime import timedelta
+
+from django.core.files.base import ContentFile
+from django.utils import timezone
+
+from parking.models import Ticket, qr_upload_to
+
+logger = logging.getLogger(__name__)
+
+
+def _batches(queryset, batch_size):
+    """Yield lists of tickets by ascending id, re-querying after each batch."""
+    last_id = 0
+    while True:
+        batch = list(queryset.filter(id__gt=last_id).order_by("id")[:batch_size])
+        if not batch:
+            return
+        yield batch
+        last_id = batch[-1].id
+
+
+class QRStorage:
+    @staticmethod
+    def purge(older_than_days, batch_size=500, using="default", now=None):
+        """Delete stored QR images of tickets checked out before the cutoff.
+
+        Returns the number of images removed. Tickets keep their row; their
+        `qr_code` is cleared in one UPDATE per batch.
+        """
+        cutoff = (now or timezone.now()) - timedelta(days=older_than_days)
+        tickets = (
+            Ticket.objects.using(using)
+            .filter(check_out__lt=cutoff)
+            .exclude(qr_code="")
+            .exclude(qr_code__isnull=True)
+            .only("id", "qr_code")
+        )
+        purged = 0
+        for batch in _batches(tickets, batch_size):
+            for ticket in batch:
+                ticket.qr_code.storage.delete(ticket.qr_code.name)
+            Ticket.objects.using(using).filter(
+                id__in=[ticket.id for ticket in batch]
+            ).update(qr_code="")
+            purged += len(batch)
+        return purged
+
+    @staticmethod
+    def migrate_layout(batch_size=500, using="default"):
+        """Move images stored flat in qrcodes/ into the hash-sharded layout.
+
+        Returns `(moved, missing)`; rows whose file no longer exists are
+        cleared so the image is regenerated on demand.
+        """
+        tickets = (
+            Ticket.objects.using(using)
+            .filter(qr_code__startswith="qrcodes/")
+            .exclude(qr_code__regex=r"^qrcodes/[0-9a-f]{2}/[0-9a-f]{2}/")
+            .only("id", "qr_code")
+        )
+        moved = missing = 0
+        for batch in _batches(tickets, batch_size):
+            for ticket in batch:
+                storage = ticket.qr_code.storage
+                old_name = ticket.qr_code.name
+                if not storage.exists(old_name):
+                    ticket.qr_code = ""
+                    missing += 1
+                else:
+                    with storage.open(old_name) as f:
+                        content = ContentFile(f.read())
+                    target = qr_upload_to(ticket, posixpath.basename(old_name))
+                    ticket.qr_code.name = storage.save(target, content)
+                    storage.delete(old_name)
+                    moved += 1
+            Ticket.objects.using(using).bulk_update(batch, ["qr_code"])
+            logger.info("Migrated %s QR images to the sharded layout.", len(batch))
+        return moved, missing
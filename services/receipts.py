@@ -0,0 +1,139 @@
+"""Compact receipts for gate thermal printers.
+
+The A4 token PDF needs a rasterising step on the kiosk and is slow to
+render and send. Gates with 58 mm or 80 mm thermal printers get the same
+ticket fields (`services.pdf_generator.token_fields`) as:
+
+- ESC/POS byte streams, with the QR code drawn by the printer itself
+  (`GS ( k`), so nothing is rasterised on either side;
+- narrow 1-bit PNGs at the printer's 203 dpi width, for printers driven
+  through an image driver.
+
+`RECEIPT_FORMATS` names every format, including the A4 "pdf"; gates pick
+one through `GATE_RECEIPT_FORMATS`.
+"""
+
+from functools import cache
+from io import BytesIO
+
+ESC = b"\x1b"
+GS = b"\x1d"
+
+# (characters per line in font A, QR module size in dots, width in dots)
+PAPER = {58: (32, 6, 384), 80: (48, 8, 576)}
+
+RECEIPT_FORMATS = {
+    "pdf": "application/pdf",
+    "escpos58": "application/octet-stream",
+    "escpos80": "application/octet-stream",
+    "png58": "image/png",
+    "png80": "image/png",
+}
+
+
+def _details(ticket):
+    return [
+        ("Vehicle", ticket["vehicle_number"]),
+        ("Type", "4-Wheeler" if ticket["vehicle_type"] == "CAR" else "2-Wheeler"),
+        ("Slot", ticket["slot"]),
+        ("Check-in", ticket["check_in"]),
+        ("Paid", f"Rs {ticket['initial_payment']}"),
+    ]
+
+
+def _qr_command(function, payload=b""):
+    """`GS ( k` for QR function `function` (cn 49) with `payload`."""
+    length = len(payload) + 2
+    return GS + b"(k" + bytes([length % 256, length // 256, 49, function]) + payload
+
+
+def render_escpos(ticket, checkout_url, paper_mm=80):
+    """ESC/POS bytes printing the token, with a native QR code, then a cut."""
+    columns, module, _ = PAPER[paper_mm]
+
+    def line(text):
+        return text[:columns].encode("cp437", errors="replace") + b"\n"
+
+    out = bytearray(ESC + b"@")  # initialise
+    out += ESC + b"a\x01"  # centre
+    out += GS + b"!\x11" + line("ELITE PARKING")  # double width and height
+    out += GS + b"!\x00" + line("Official Parking Token")
+    out += ESC + b"d\x01"
+
+    out += _qr_command(65, b"\x32\x00")  # model 2
+    out += _qr_command(67, bytes([module]))  # module size in dots
+    out += _qr_command(69, b"\x31")  # error correction M
+    out += _qr_command(80, b"\x30" + checkout_url.encode("ascii"))  # store
+    out += _qr_command(81, b"\x30")  # print
+    out += line("Scan for instant checkout")
+    out += ESC + b"d\x01"
+
+    out += ESC + b"E\x01" + GS + b"!\x01" + line(f"TOKEN NO: {ticket['code']}")
+    out += GS + b"!\x00" + ESC + b"E\x00"
+    out += ESC + b"a\x00"  # left
+    for label, value in _details(ticket):
+        out += line(f"{label + ':':<10}{value}")
+
+    out += (
+        ESC + b"a\x01" + ESC + b"d\x01" + line("Thank you for choosing Elite Parking")
+    )
+    out += ESC + b"d\x04" + GS + b"VB\x00"  # feed and partial cut
+    return bytes(out)
+
+
+@cache
+def _font(size):
+    from PIL import ImageFont
+
+    return ImageFont.load_default(size=size)
+
+
+def render_png(ticket, checkout_url, paper_mm=80):
+    """1-bit PNG of the token, as wide as the printable area of the paper."""
+    import qrcode
+    from PIL import Image, ImageDraw
+
+    _, _, width = PAPER[paper_mm]
+    title = _font(width // 12)
+    body = _font(width // 22)
+
+    # A fixed mask skips scoring all eight, most of qrcode's encoding time
+    qr = qrcode.QRCode(box_size=1, border=2, mask_pattern=0)
+    qr.add_data(checkout_url)
+    qr.make(fit=True)
+    modules = qr.make_image().get_image().convert("1")
+    scale = int(width * 0.7) // modules.width
+    code = modules.resize((modules.width * scale,) * 2, Image.NEAREST)
+
+    canvas = Image.new("1", (width, width * 3), 1)
+    draw = ImageDraw.Draw(canvas)
+    y = 8
+
+    def centred(text, font):
+        nonlocal y
+        left, top, right, bottom = draw.textbbox((0, 0), text, font=font)
+        draw.text(((width - right) // 2, y), text, font=font, fill=0)
+        y += bottom + 8
+
+    centred("ELITE PARKING", title)
+    canvas.paste(code, ((width - code.width) // 2, y))
+    y += code.height + 8
+    centred(f"TOKEN NO: {ticket['code']}", title)
+    for label, value in _details(ticket):
+        draw.text((8, y), f"{label}: {value}", font=body, fill=0)
+        y += body.size + 6
+    y += 8
+    centred("Thank you for choosing Elite Parking", body)
+
+    buffer = BytesIO()
+    canvas.crop((0, 0, width, y)).save(buffer, format="PNG", optimize=True)
+    return buffer.getvalue()
+
+
+def render_receipt(fmt, ticket, checkout_url):
+    """Receipt bytes of `token_fields` values in format `fmt` (see RECEIPT_FORMATS)."""
+    if fmt.startswith("escpos"):
+        return render_escpos(ticket, checkout_url, int(fmt[len("escpos") :]))
+    if fmt.startswith("png"):
+        return render_png(ticket, checkout_url, int(fmt[len("png") :]))
+    raise ValueError(f"Unknown receipt format {fmt!r}")
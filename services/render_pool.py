@@ -0,0 +1,149 @@
+"""Process pool for CPU-bound token rendering (QR codes and PDFs).
+
+ReportLab and qrcode are pure Python: rendered in a request thread they hold
+the GIL and stall every other request of the worker. `render()` runs them in
+a bounded pool of worker processes that import ReportLab once at start.
+Submissions beyond `RENDER_POOL_MAX_PENDING`, results slower than
+`RENDER_POOL_TIMEOUT_SECONDS` and a broken pool all fall back to rendering
+inline, and are counted so saturation shows up on /metrics/.
+
+The pool belongs to the process that created it; a forked child (e.g. a
+gunicorn worker under --preload) starts its own on first use.
+"""
+
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import get_context
+
+from django.conf import settings
+
+from parking.metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+RENDER_DURATION = REGISTRY.histogram(
+    "parking_render_duration_seconds",
+    "Wall time of a QR/PDF render as seen by the request, per mode.",
+)
+RENDER_PENDING = REGISTRY.gauge(
+    "parking_render_pool_pending", "Renders submitted to the pool and not finished."
+)
+RENDER_FALLBACKS = REGISTRY.counter(
+    "parking_render_fallbacks_total",
+    "Renders done inline instead of in the pool, per reason.",
+)
+
+
+def _init_worker():
+    from services.warmup import preload_render_libraries
+
+    preload_render_libraries()
+
+
+def _ping():
+    return os.getpid()
+
+
+class RenderPool:
+    def __init__(self, workers, max_pending, timeout):
+        self.workers = workers
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(workers + max_pending)
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=get_context("spawn"),
+                    initializer=_init_worker,
+                )
+            return self._executor
+
+    def start(self):
+        """Start every worker process now rather than on the first render."""
+        if self.workers:
+            executor = self._get_executor()
+            for future in [executor.submit(_ping) for _ in range(self.workers)]:
+                future.result()
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+    def run(self, func, *args):
+        """`func(*args)` in a worker process, or inline when the pool cannot take it.
+
+        `func` must be a picklable module-level function of plain data.
+        """
+        if not self.workers:
+            return self._inline(func, args)
+        if not self._slots.acquire(blocking=False):
+            return self._fallback("saturated", func, args)
+
+        start = time.perf_counter()
+        try:
+            future = self._get_executor().submit(func, *args)
+        except BrokenProcessPool:
+            self._slots.release()
+            self.shutdown()
+            return self._fallback("broken", func, args)
+        RENDER_PENDING.inc()
+        future.add_done_callback(self._finished)
+
+        try:
+            result = future.result(timeout=self.timeout)
+        except FutureTimeout:
+            future.cancel()
+            return self._fallback("timeout", func, args)
+        except BrokenProcessPool:
+            self.shutdown()
+            return self._fallback("broken", func, args)
+        RENDER_DURATION.observe(time.perf_counter() - start, mode="pool")
+        return result
+
+    def _finished(self, future):
+        RENDER_PENDING.dec()
+        self._slots.release()
+
+    def _inline(self, func, args):
+        start = time.perf_counter()
+        result = func(*args)
+        RENDER_DURATION.observe(time.perf_counter() - start, mode="inline")
+        return result
+
+    def _fallback(self, reason, func, args):
+        RENDER_FALLBACKS.inc(reason=reason)
+        logger.warning("Rendering %s inline: pool %s.", func.__name__, reason)
+        return self._inline(func, args)
+
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+
+
+def get_render_pool():
+    global _pool, _pool_pid
+    with _pool_lock:
+        if _pool is None or _pool_pid != os.getpid():
+            _pool = RenderPool(
+                settings.RENDER_POOL_WORKERS,
+                settings.RENDER_POOL_MAX_PENDING,
+                settings.RENDER_POOL_TIMEOUT_SECONDS,
+            )
+            _pool_pid = os.getpid()
+        return _pool
+
+
+def render(func, *args):
+    return get_render_pool().run(func, *args)
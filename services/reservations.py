@@ -0,0 +1,160 @@
+from bisect import bisect_left
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import router, transaction
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+from parking.models import Pass, Reservation, Slot, SlotEvent, Ticket
+from services.slot_events import SlotEventLog
+
+
+class IntervalIndex:
+    """Sorted per-slot hold intervals answering "free between t1 and t2?".
+
+    Holds on one slot never overlap, so sorted by start their ends are sorted
+    too and a single bisect finds the only hold that could collide.
+    """
+
+    def __init__(self, intervals=()):
+        self._starts = {}
+        self._ends = {}
+        for slot_id, start, end in sorted(intervals, key=lambda i: (i[0], i[1])):
+            self._starts.setdefault(slot_id, []).append(start)
+            self._ends.setdefault(slot_id, []).append(end)
+
+    def is_free(self, slot_id, start, end):
+        starts = self._starts.get(slot_id)
+        if not starts:
+            return True
+        # Holds beginning before `end`; only the last of them can reach `start`.
+        i = bisect_left(starts, end)
+        return i == 0 or self._ends[slot_id][i - 1] <= start
+
+    def free(self, slot_ids, start, end):
+        return [slot_id for slot_id in slot_ids if self.is_free(slot_id, start, end)]
+
+
+def active_holds(start, end):
+    """Reservations holding a slot at any point in [start, end)."""
+    return Reservation.objects.filter(
+        status=Reservation.HELD, start__lt=end, end__gt=start
+    )
+
+
+def reserving_passes(start, end):
+    """Active passes with a reserved slot, valid on any day of [start, end)."""
+    return Pass.objects.filter(
+        slot__isnull=False,
+        is_active=True,
+        valid_from__lte=timezone.localdate(end),
+        valid_until__gte=timezone.localdate(start),
+    )
+
+
+def unheld_slots(queryset, now=None):
+    """Exclude slots held within the walk-in lookahead or reserved for a
+    pass, as anti-joins."""
+    now = now or timezone.now()
+    lookahead = now + timedelta(minutes=settings.RESERVATION_LOOKAHEAD_MINUTES)
+    return queryset.exclude(
+        Exists(active_holds(now, lookahead).filter(slot=OuterRef("pk")))
+    ).exclude(Exists(reserving_passes(now, lookahead).filter(slot=OuterRef("pk"))))
+
+
+class ReservationService:
+    @staticmethod
+    def build_index(slot_ids, start, end):
+        """Index the holds on `slot_ids` overlapping [start, end), in one query."""
+        return IntervalIndex(
+            active_holds(start, end)
+            .filter(slot_id__in=slot_ids)
+            .values_list("slot_id", "start", "end")
+        )
+
+    @staticmethod
+    def free_slots(vehicle_type, floor, section, start, end):
+        """Slots of the section with no hold overlapping [start, end), and
+        not reserved for a pass then."""
+        slots = list(
+            Slot.objects.filter(
+                vehicle_type=vehicle_type,
+                floor=floor,
+                section=section,
+                is_blocked=False,
+            )
+            .exclude(Exists(reserving_passes(start, end).filter(slot=OuterRef("pk"))))
+            .order_by("-is_available", "slot_number")
+        )
+        index = ReservationService.build_index([s.id for s in slots], start, end)
+        return [s for s in slots if index.is_free(s.id, start, end)]
+
+    @staticmethod
+    def reserve(vehicle_type, floor, section, start, end, **details):
+        """Hold the first free slot of the section for [start, end).
+
+        `details` are the customer fields of `Reservation` (vehicle_number,
+        phone, email). Returns None when the section is fully held.
+        """
+        with transaction.atomic(using=router.db_for_write(Reservation)):
+            for slot in ReservationService.free_slots(
+                vehicle_type, floor, section, start, end
+            ):
+                # Serialise reservations per slot, then confirm no hold slipped in
+                # between reading the index and taking the lock.
+                Slot.objects.select_for_update().filter(id=slot.id).first()
+                if active_holds(start, end).filter(slot=slot).exists():
+                    continue
+                return Reservation.objects.create(
+                    slot=slot,
+                    vehicle_type=vehicle_type,
+                    start=start,
+                    end=end,
+                    **details,
+                )
+            return None
+
+    @staticmethod
+    def check_in(reservation, now=None):
+        """Turn a held reservation into a ticket on its slot.
+
+        Returns the ticket, or None if the slot is still occupied (e.g. a
+        walk-in overstayed) or blocked; the caller can then allocate another slot.
+        """
+        using = router.db_for_write(Reservation, instance=reservation)
+        with transaction.atomic(using=using):
+            now = now or timezone.now()
+            claimed = (
+                Slot.objects.using(using)
+                .filter(id=reservation.slot_id, is_available=True, is_blocked=False)
+                .update(is_available=False)
+            )
+            if not claimed:
+                return None
+            SlotEventLog.record(
+                [reservation.slot_id], SlotEvent.ALLOCATE, at=now, using=using
+            )
+            ticket = Ticket.objects.using(using).create(
+                vehicle_number=reservation.vehicle_number,
+                phone=reservation.phone,
+                email=reservation.email,
+                vehicle_type=reservation.vehicle_type,
+                slot_id=reservation.slot_id,
+                check_in=now,
+            )
+            reservation.status = Reservation.FULFILLED
+            reservation.ticket = ticket
+            reservation.save(update_fields=["status", "ticket"])
+            return ticket
+
+    @staticmethod
+    def expire_no_shows(now=None, using=None):
+        """Release holds whose customer has not arrived within the grace period."""
+        now = now or timezone.now()
+        cutoff = now - timedelta(minutes=settings.RESERVATION_GRACE_MINUTES)
+        return (
+            Reservation.objects.db_manager(using)
+            .filter(status=Reservation.HELD, start__lt=cutoff)
+            .update(status=Reservation.EXPIRED)
+        )
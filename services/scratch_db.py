@@ -0,0 +1,92 @@
+"""Throwaway databases for benchmarks and simulations."""
+
+import shutil
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+
+from django.db import connections
+
+from parking.models import Floor, ParkingConfig, Slot
+
+CAR_SECTIONS = ("A", "B", "C", "D")
+BIKE_SECTIONS = ("E", "F", "G")
+
+
+@contextmanager
+def scratch_database(alias="default", in_memory=False):
+    """Run against a throwaway copy of the schema, never the real data.
+
+    SQLite scratch databases are files so worker threads and processes can
+    share them, unless `in_memory` is set (single-process, fastest).
+    """
+    connection = connections[alias]
+    test_settings = connection.settings_dict.setdefault("TEST", {})
+    saved_name = test_settings.get("NAME")
+    tmp_dir = None
+    if connection.vendor == "sqlite" and in_memory:
+        test_settings["NAME"] = None
+    elif connection.vendor == "sqlite":
+        tmp_dir = tempfile.mkdtemp(prefix="parking-scratch-")
+        test_settings["NAME"] = str(Path(tmp_dir) / "scratch.sqlite3")
+    old_name = connection.settings_dict["NAME"]
+    connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+    try:
+        yield connection
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        # SQLite ignores close() while NAME points at an in-memory database;
+        # now that NAME is restored, this really drops the scratch copy.
+        connection.close()
+        test_settings["NAME"] = saved_name
+        if tmp_dir:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+def seed_layout(
+    floors=10,
+    slots_per_section=50,
+    price_increment=5,
+    car_base_price=50,
+    bike_base_price=30,
+    using="default",
+):
+    """Bulk-create the standard floor/section layout and tariffs."""
+    floor_objs = Floor.objects.using(using).bulk_create(
+        Floor(number=n, price_increment=(n - 1) * price_increment)
+        for n in range(1, floors + 1)
+    )
+    slots = []
+    for floor in floor_objs:
+        for row, section in enumerate(CAR_SECTIONS + BIKE_SECTIONS):
+            vehicle_type = "CAR" if section in CAR_SECTIONS else "BIKE"
+            width = 2.5 if vehicle_type == "CAR" else 1.0
+            slots.extend(
+                Slot(
+                    floor=floor,
+                    section=section,
+                    slot_number=n,
+                    vehicle_type=vehicle_type,
+                    x=n * width,
+                    y=row * 6.0,
+                )
+                for n in range(1, slots_per_section + 1)
+            )
+    Slot.objects.using(using).bulk_create(slots, batch_size=1000)
+    ParkingConfig.objects.using(using).bulk_create(
+        [
+            ParkingConfig(
+                vehicle_type="BIKE",
+                base_price=bike_base_price,
+                base_hours=5,
+                extra_per_hour=5,
+            ),
+            ParkingConfig(
+                vehicle_type="CAR",
+                base_price=car_base_price,
+                base_hours=5,
+                extra_per_hour=10,
+            ),
+        ]
+    )
+    return floor_objs
@@ -0,0 +1,218 @@
+"""Discrete-event simulation of a garage for capacity and tariff planning.
+
+Arrivals and departures are replayed on a simulated clock through the real
+`TicketService.open` (and therefore `SlotAllocator`), `Ticket` rows and
+`TicketService.check_out` (and therefore `BillingService`), so a day of
+traffic runs in seconds. Always run it against a scratch database (see `services.scratch_db`).
+"""
+
+import csv
+import heapq
+import itertools
+import random
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass, field
+from datetime import timedelta
+from multiprocessing import get_context
+
+import django
+from django.utils import timezone
+
+from parking.models import Floor
+from services.billing import BillingService
+from services.scratch_db import (
+    BIKE_SECTIONS,
+    CAR_SECTIONS,
+    scratch_database,
+    seed_layout,
+)
+from services.ticketing import TicketService
+
+SECTIONS = {"CAR": CAR_SECTIONS, "BIKE": BIKE_SECTIONS}
+
+
+@dataclass(order=True)
+class Arrival:
+    at: float  # seconds since the start of the simulation
+    vehicle_type: str = field(compare=False)
+    stay: float = field(compare=False)  # seconds
+
+
+@dataclass
+class Scenario:
+    """Layout and tariffs to simulate; the swept parameters of a run."""
+
+    floors: int = 10
+    slots_per_section: int = 50
+    price_increment: int = 5
+    car_base_price: int = 50
+    bike_base_price: int = 30
+    strategy: str = None
+
+
+@dataclass
+class SimulationReport:
+    scenario: dict
+    arrivals: dict
+    rejections: dict
+    revenue: int
+    # (minutes since start, occupied CAR slots, occupied BIKE slots)
+    occupancy: list
+
+    @property
+    def rejection_rate(self):
+        total = sum(self.arrivals.values())
+        return sum(self.rejections.values()) / total if total else 0.0
+
+    @property
+    def peak_occupancy(self):
+        return max((car + bike for _, car, bike in self.occupancy), default=0)
+
+
+def synthetic_arrivals(hours, rates, mean_stay_hours, seed=None):
+    """Poisson arrivals with exponentially distributed stays.
+
+    `rates` maps vehicle type to arrivals per hour.
+    """
+    rng = random.Random(seed)
+    horizon = hours * 3600
+    arrivals = []
+    for vehicle_type, per_hour in rates.items():
+        if per_hour <= 0:
+            continue
+        t = rng.expovariate(per_hour / 3600)
+        while t < horizon:
+            stay = rng.expovariate(1 / (mean_stay_hours * 3600))
+            arrivals.append(Arrival(t, vehicle_type, stay))
+            t += rng.expovariate(per_hour / 3600)
+    arrivals.sort()
+    return arrivals
+
+
+def load_arrivals(path):
+    """Read a recorded stream: CSV with arrival_minutes, vehicle_type, stay_minutes."""
+    with open(path, newline="") as f:
+        arrivals = [
+            Arrival(
+                float(row["arrival_minutes"]) * 60,
+                row["vehicle_type"].strip().upper(),
+                float(row["stay_minutes"]) * 60,
+            )
+            for row in csv.DictReader(f)
+        ]
+    arrivals.sort()
+    return arrivals
+
+
+class ParkingSimulator:
+    ARRIVAL, DEPARTURE, SAMPLE = 0, 1, 2
+
+    def __init__(self, strategy=None, sample_minutes=15, seed=None, start=None):
+        self.strategy = strategy
+        self.sample_seconds = sample_minutes * 60
+        self.rng = random.Random(seed)
+        self.start = start or timezone.now().replace(
+            hour=0, minute=0, second=0, microsecond=0
+        )
+
+    def run(self, arrivals, scenario=None):
+        floors = list(Floor.objects.order_by("number"))
+        occupied = {"CAR": 0, "BIKE": 0}
+        counts = {"CAR": 0, "BIKE": 0}
+        rejections = {"CAR": 0, "BIKE": 0}
+        revenue = 0
+        occupancy = []
+
+        seq = itertools.count()
+        events = [(a.at, next(seq), self.ARRIVAL, a) for a in arrivals]
+        horizon = arrivals[-1].at if arrivals else 0
+        events.extend(
+            (t, next(seq), self.SAMPLE, None)
+            for t in range(0, int(horizon) + 1, self.sample_seconds)
+        )
+        heapq.heapify(events)
+
+        while events:
+            at, _, kind, payload = heapq.heappop(events)
+            now = self.start + timedelta(seconds=at)
+            if kind == self.SAMPLE:
+                occupancy.append((at / 60, occupied["CAR"], occupied["BIKE"]))
+            elif kind == self.ARRIVAL:
+                counts[payload.vehicle_type] += 1
+                ticket = self._park(payload, floors, now)
+                if ticket is None:
+                    rejections[payload.vehicle_type] += 1
+                    continue
+                occupied[payload.vehicle_type] += 1
+                heapq.heappush(
+                    events, (at + payload.stay, next(seq), self.DEPARTURE, ticket)
+                )
+            else:
+                total, _, _, _ = TicketService.check_out(payload, now=now)
+                revenue += total
+                occupied[payload.vehicle_type] -= 1
+
+        return SimulationReport(
+            scenario=asdict(scenario) if scenario else {},
+            arrivals=counts,
+            rejections=rejections,
+            revenue=revenue,
+            occupancy=occupancy,
+        )
+
+    def _park(self, arrival, floors, now):
+        """Try the driver's preferred floor/section, then circle the other floors."""
+        section = self.rng.choice(SECTIONS[arrival.vehicle_type])
+        preferred = self.rng.randrange(len(floors))
+        for floor in floors[preferred:] + floors[:preferred]:
+            ticket = TicketService.open(
+                arrival.vehicle_type,
+                floor,
+                section,
+                strategy=self.strategy,
+                vehicle_number=f"SIM{int(arrival.at)}",
+                phone="0000000000",
+                check_in=now,
+            )
+            if ticket:
+                return ticket
+        return None
+
+
+def run_scenario(scenario, arrivals, seed=None):
+    """Seed a scratch database for `scenario`, simulate and tear it down."""
+    with scratch_database(in_memory=True):
+        for vehicle_type in SECTIONS:
+            BillingService.invalidate(vehicle_type)
+        seed_layout(
+            floors=scenario.floors,
+            slots_per_section=scenario.slots_per_section,
+            price_increment=scenario.price_increment,
+            car_base_price=scenario.car_base_price,
+            bike_base_price=scenario.bike_base_price,
+        )
+        simulator = ParkingSimulator(strategy=scenario.strategy, seed=seed)
+        report = simulator.run(arrivals, scenario)
+        for vehicle_type in SECTIONS:
+            BillingService.invalidate(vehicle_type)
+        return report
+
+
+def run_sweep(scenarios, arrivals, processes=1, seed=None):
+    """Simulate each scenario against the same arrival stream.
+
+    With `processes > 1` scenarios run in parallel worker processes, each
+    with its own in-memory database.
+    """
+    if processes <= 1:
+        return [run_scenario(scenario, arrivals, seed) for scenario in scenarios]
+    with ProcessPoolExecutor(
+        max_workers=processes,
+        mp_context=get_context("spawn"),
+        initializer=django.setup,
+    ) as pool:
+        futures = [
+            pool.submit(run_scenario, scenario, arrivals, seed)
+            for scenario in scenarios
+        ]
+        return [future.result() for future in futures]
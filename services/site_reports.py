@@ -0,0 +1,48 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from django.db import connections
+from django.db.models import Count, Q, Sum
+from django.utils import timezone
+
+from parking.models import Site, Slot, Ticket
+from parking.routers import use_replicas
+from parking.sites import site_codes, use_site
+
+
+def _site_summary(code, since):
+    with use_site(code), use_replicas():
+        try:
+            slots = Slot.objects.filter(floor__site=code).aggregate(
+                total=Count("id"), free=Count("id", filter=Q(is_available=True))
+            )
+            tickets = Ticket.objects.filter(site=code).aggregate(
+                open=Count("id", filter=Q(check_out__isnull=True)),
+                closed=Count("id", filter=Q(check_out__gte=since)),
+                revenue=Sum("final_amount", filter=Q(check_out__gte=since)),
+            )
+        finally:
+            # Each worker thread opens its own connections; don't leak them.
+            connections.close_all()
+    return {
+        "site": code,
+        "slots": slots["total"],
+        "occupied": slots["total"] - slots["free"],
+        "open_tickets": tickets["open"],
+        "closed_tickets": tickets["closed"],
+        "revenue": tickets["revenue"] or 0,
+    }
+
+
+def occupancy_report(codes=None, since=None, max_workers=8):
+    """Occupancy and revenue per site, querying every site's database in parallel.
+
+    `since` bounds the closed-ticket and revenue figures (default: midnight).
+    """
+    codes = codes or site_codes()
+    since = since or timezone.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    names = dict(Site.objects.filter(code__in=codes).values_list("code", "name"))
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(codes))) as pool:
+        rows = list(pool.map(lambda code: _site_summary(code, since), codes))
+    for row in rows:
+        row["name"] = names.get(row["site"], row["site"])
+    return rows
@@ -1,27 +1,41 @@
-from django.db import transaction
-from parking.models import Slot
+from django.db import router, transaction
+from parking.models import Slot, SlotEvent
+from services.allocation_strategies import get_strategy
+from services.reservations import unheld_slots
+from services.slot_events import SlotEventLog
+from services.slot_leases import exclude_foreign_leases
 
 
 class SlotAllocator:
     @staticmethod
-    @transaction.atomic
-    def allocate(vehicle_type, floor, section):
-        slot = (
-            Slot.objects.select_for_update(skip_locked=True)
-            .filter(
-                vehicle_type=vehicle_type,
-                floor=floor,
-                section=section,
-                is_available=True,
+    def allocate(vehicle_type, floor, section, strategy=None):
+        """Claim a free slot, chosen by the strategy configured for the vehicle type.
+
+        `strategy` overrides the configured strategy by name. Slots held by a
+        reservation starting soon are left for their pre-booked customer,
+        slots reserved for a pass to its holder, and sections leased to
+        another node (see `services.slot_leases`) to it.
+        Blocked slots are skipped (see `services.slot_maintenance`).
+        """
+        with transaction.atomic(using=router.db_for_write(Slot)):
+            candidates = exclude_foreign_leases(
+                unheld_slots(
+                    Slot.objects.select_for_update(skip_locked=True).filter(
+                        vehicle_type=vehicle_type,
+                        is_available=True,
+                        is_blocked=False,
+                    )
+                )
+            )
+            slot = get_strategy(vehicle_type, strategy).choose(
+                candidates, vehicle_type, floor, section
             )
-            .order_by("slot_number")
-            .first()
-        )
 
-        if not slot:
-            return None
+            if not slot:
+                return None
 
-        slot.is_available = False
-        slot.save(update_fields=["is_available"])
+            slot.is_available = False
+            slot.save(update_fields=["is_available"])
+            SlotEventLog.record([slot.id], SlotEvent.ALLOCATE, using=slot._state.db)
 
-        return slot
+            return slot
@@ -0,0 +1,145 @@
+"""Append-only slot event log with periodic snapshots.
+
+Every change of a slot's state is logged as a `SlotEvent` in the same
+transaction as the change. `SlotEventLog.snapshot` folds the events logged
+since the previous `OccupancySnapshot` into a new one, so `occupancy_at`
+rebuilds the state of every slot at any past time from one snapshot read
+plus the short tail of events after it.
+"""
+
+from datetime import timedelta
+
+from django.db import router, transaction
+from django.utils import timezone
+
+from parking.models import OccupancySnapshot, SlotEvent
+from parking.signals import slot_state_changed
+
+# Only events older than this are folded into a snapshot, so a transaction
+# that committed late with a lower event id is never skipped.
+SETTLE_SECONDS = 60
+
+
+def _to_bytes(bits):
+    return bits.to_bytes((bits.bit_length() + 7) // 8, "little")
+
+
+class OccupancyBitmap:
+    """Occupied and blocked flags of every slot, one bit per slot id."""
+
+    def __init__(self, occupied=0, blocked=0):
+        self.occupied = occupied
+        self.blocked = blocked
+
+    @classmethod
+    def from_snapshot(cls, snapshot):
+        if snapshot is None:
+            return cls()
+        return cls(
+            int.from_bytes(bytes(snapshot.occupied), "little"),
+            int.from_bytes(bytes(snapshot.blocked), "little"),
+        )
+
+    def apply(self, slot_id, kind):
+        bit = 1 << slot_id
+        if kind == SlotEvent.ALLOCATE:
+            self.occupied |= bit
+        elif kind == SlotEvent.RELEASE:
+            self.occupied &= ~bit
+        elif kind == SlotEvent.BLOCK:
+            self.blocked |= bit
+        elif kind == SlotEvent.UNBLOCK:
+            self.blocked &= ~bit
+
+    def is_occupied(self, slot_id):
+        return bool(self.occupied >> slot_id & 1)
+
+    def is_blocked(self, slot_id):
+        return bool(self.blocked >> slot_id & 1)
+
+    def occupied_ids(self):
+        bits, slot_id = self.occupied, 0
+        while bits:
+            if bits & 1:
+                yield slot_id
+            bits >>= 1
+            slot_id += 1
+
+    def occupied_count(self):
+        return self.occupied.bit_count()
+
+
+class SlotEventLog:
+    @staticmethod
+    def record(slot_ids, kind, at=None, using=None):
+        """Log `kind` for `slot_ids`; call inside the transaction making the change.
+
+        `slot_state_changed` is sent once that transaction commits.
+        """
+        at = at or timezone.now()
+        using = using or router.db_for_write(SlotEvent)
+        SlotEvent.objects.using(using).bulk_create(
+            SlotEvent(slot_id=slot_id, kind=kind, at=at) for slot_id in slot_ids
+        )
+        events = [(slot_id, kind, at) for slot_id in slot_ids]
+        transaction.on_commit(
+            lambda: slot_state_changed.send(SlotEvent, events=events, using=using),
+            using=using,
+        )
+
+    @staticmethod
+    def snapshot(using=None, now=None):
+        """Fold settled events since the latest snapshot into a new one.
+
+        Returns the new snapshot, or None if there was nothing to fold.
+        """
+        using = using or router.db_for_write(OccupancySnapshot)
+        cutoff = (now or timezone.now()) - timedelta(seconds=SETTLE_SECONDS)
+        latest = (
+            OccupancySnapshot.objects.using(using).order_by("-last_event_id").first()
+        )
+        last_event_id = latest.last_event_id if latest else 0
+        bitmap = OccupancyBitmap.from_snapshot(latest)
+        folded = None
+        events = (
+            SlotEvent.objects.using(using)
+            .filter(id__gt=last_event_id)
+            .order_by("id")
+            .values_list("id", "slot_id", "kind", "at")
+        )
+        for event_id, slot_id, kind, at in events.iterator():
+            # Stop at the first unsettled event so snapshots cover an
+            # unbroken prefix of the log.
+            if at >= cutoff:
+                break
+            bitmap.apply(slot_id, kind)
+            folded = (event_id, at)
+        if folded is None:
+            return None
+        return OccupancySnapshot.objects.using(using).create(
+            at=folded[1],
+            last_event_id=folded[0],
+            occupied=_to_bytes(bitmap.occupied),
+            blocked=_to_bytes(bitmap.blocked),
+        )
+
+    @staticmethod
+    def occupancy_at(when, using=None):
+        """`OccupancyBitmap` of every slot as of `when`."""
+        using = using or router.db_for_read(OccupancySnapshot)
+        snapshot = (
+            OccupancySnapshot.objects.using(using)
+            .filter(at__lte=when)
+            .order_by("-last_event_id")
+            .first()
+        )
+        bitmap = OccupancyBitmap.from_snapshot(snapshot)
+        events = (
+            SlotEvent.objects.using(using)
+            .filter(id__gt=snapshot.last_event_id if snapshot else 0, at__lte=when)
+            .order_by("id")
+            .values_list("slot_id", "kind")
+        )
+        for slot_id, kind in events.iterator():
+            bitmap.apply(slot_id, kind)
+        return bitmap
@@ -0,0 +1,135 @@
+import os
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, router, transaction
+from django.db.models import Count, Exists, OuterRef
+from django.utils import timezone
+
+from parking.models import Slot, SlotLease
+from parking.sites import get_current_site
+
+# Leases this process believes it holds: (holder, vehicle_type) -> [SlotLease].
+# Checked before every leased allocation, so the hot path never queries
+# SlotLease until a heartbeat is due or a lease runs dry.
+_held = {}
+_held_lock = threading.Lock()
+
+
+def current_holder():
+    """Lease holder for this worker process: the node id plus the pid.
+
+    Workers of one app server hold separate leases so they do not contend
+    with each other either. Edge gates hold leases as the node itself.
+    """
+    return f"{settings.PARKING_NODE_ID}:{os.getpid()}"
+
+
+def active_leases(now=None):
+    return SlotLease.objects.filter(expires_at__gt=now or timezone.now())
+
+
+def exclude_foreign_leases(queryset, holder=None, now=None):
+    """Drop slots in sections leased to another holder, as one anti-join."""
+    holder = holder or current_holder()
+    return queryset.exclude(
+        Exists(
+            active_leases(now)
+            .filter(floor=OuterRef("floor"), section=OuterRef("section"))
+            .exclude(holder=holder)
+        )
+    )
+
+
+class LeaseCoordinator:
+    @staticmethod
+    def acquire(holder, vehicle_type, ttl=None, now=None):
+        """Lease the unleased (or expired) section with the most free slots.
+
+        Returns the `SlotLease`, or None if every section is leased or full.
+        """
+        now = now or timezone.now()
+        expires_at = now + timedelta(seconds=ttl or settings.SLOT_LEASE_TTL_SECONDS)
+        taken = set(active_leases(now).values_list("floor_id", "section"))
+        sections = (
+            Slot.objects.filter(
+                floor__site=get_current_site(),
+                vehicle_type=vehicle_type,
+                is_available=True,
+                is_blocked=False,
+            )
+            .values("floor_id", "section")
+            .annotate(free=Count("id"))
+            .order_by("-free", "floor_id", "section")
+        )
+        for row in sections:
+            key = (row["floor_id"], row["section"])
+            if key in taken:
+                continue
+            try:
+                with transaction.atomic(using=router.db_for_write(SlotLease)):
+                    # Take over an expired lease row, or create a new one; the
+                    # unique (floor, section) constraint settles races.
+                    updated = SlotLease.objects.filter(
+                        floor_id=key[0], section=key[1], expires_at__lte=now
+                    ).update(holder=holder, expires_at=expires_at, created_at=now)
+                    if not updated:
+                        SlotLease.objects.create(
+                            holder=holder,
+                            floor_id=key[0],
+                            section=key[1],
+                            vehicle_type=vehicle_type,
+                            expires_at=expires_at,
+                            created_at=now,
+                        )
+            except IntegrityError:
+                continue
+            lease = SlotLease.objects.get(floor_id=key[0], section=key[1])
+            with _held_lock:
+                _held.setdefault((holder, vehicle_type), []).append(lease)
+            return lease
+        return None
+
+    @staticmethod
+    def renew(holder, ttl=None, now=None):
+        """Extend every unexpired lease of `holder` (the heartbeat)."""
+        now = now or timezone.now()
+        expires_at = now + timedelta(seconds=ttl or settings.SLOT_LEASE_TTL_SECONDS)
+        return active_leases(now).filter(holder=holder).update(expires_at=expires_at)
+
+    @staticmethod
+    def release(holder, lease_id=None):
+        leases = SlotLease.objects.filter(holder=holder)
+        if lease_id is not None:
+            leases = leases.filter(id=lease_id)
+        with _held_lock:
+            for key in [key for key in _held if key[0] == holder]:
+                _held[key] = [
+                    lease
+                    for lease in _held[key]
+                    if lease_id is not None and lease.id != lease_id
+                ]
+        return leases.delete()[0]
+
+    @staticmethod
+    def held(holder, vehicle_type, now=None):
+        """The holder's leases for `vehicle_type`, heartbeating when due.
+
+        Leases are renewed once less than half their TTL remains. A lease
+        that could not be renewed (it expired and was taken over) is
+        forgotten.
+        """
+        now = now or timezone.now()
+        key = (holder, vehicle_type)
+        with _held_lock:
+            leases = list(_held.get(key, ()))
+        half_ttl = timedelta(seconds=settings.SLOT_LEASE_TTL_SECONDS / 2)
+        if any(lease.expires_at - now < half_ttl for lease in leases):
+            LeaseCoordinator.renew(holder, now=now)
+            leases = list(
+                active_leases(now).filter(holder=holder, vehicle_type=vehicle_type)
+            )
+            with _held_lock:
+                _held[key] = leases
+        return leases
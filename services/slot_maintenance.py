@@ -0,0 +1,75 @@
+"""Take slots out of service for maintenance, in bulk.
+
+Blocking is separate from occupancy: `Slot.is_blocked` keeps a slot away
+from the allocator while `is_available` still says whether a vehicle is
+parked there. Occupied slots are not blocked under their vehicle; they get
+`block_pending` and are blocked when their ticket checks out
+(`settle_pending_blocks`). Every call issues a fixed number of set-based
+updates however many slots it touches.
+"""
+
+from django.db import router, transaction
+
+from parking.models import Slot, SlotEvent
+from services.slot_events import SlotEventLog
+
+
+def settle_pending_blocks(slot_ids, using=None, at=None):
+    """Block those of the just-released `slot_ids` that were waiting for it.
+
+    Call in the transaction freeing the slots; returns the ids blocked.
+    """
+    using = using or router.db_for_write(Slot)
+    pending = Slot.objects.using(using).filter(id__in=slot_ids, block_pending=True)
+    blocked = list(pending.values_list("id", flat=True))
+    if blocked:
+        Slot.objects.using(using).filter(id__in=blocked).update(
+            is_blocked=True, block_pending=False
+        )
+        SlotEventLog.record(blocked, SlotEvent.BLOCK, at=at, using=using)
+    return blocked
+
+
+class SlotMaintenance:
+    @staticmethod
+    def block(slots, now=None):
+        """Block the slots of queryset `slots`.
+
+        Free slots are blocked at once; occupied ones are marked to be
+        blocked at checkout. Returns `(blocked, deferred)` counts.
+        """
+        using = slots.db
+        with transaction.atomic(using=using):
+            # Lock the free slots so the allocator (skip_locked) passes them by
+            # instead of claiming one between the select and the update.
+            free = list(
+                slots.select_for_update()
+                .filter(is_available=True, is_blocked=False)
+                .values_list("id", flat=True)
+            )
+            Slot.objects.using(using).filter(id__in=free).update(
+                is_blocked=True, block_pending=False
+            )
+            deferred = slots.filter(
+                is_available=False, is_blocked=False, block_pending=False
+            ).update(block_pending=True)
+            if free:
+                SlotEventLog.record(free, SlotEvent.BLOCK, at=now, using=using)
+        return len(free), deferred
+
+    @staticmethod
+    def unblock(slots, now=None):
+        """Return the slots of queryset `slots` to service, cancelling
+        pending blocks. Returns the number of blocked slots released."""
+        using = slots.db
+        with transaction.atomic(using=using):
+            blocked = list(
+                slots.select_for_update()
+                .filter(is_blocked=True)
+                .values_list("id", flat=True)
+            )
+            Slot.objects.using(using).filter(id__in=blocked).update(is_blocked=False)
+            slots.filter(block_pending=True).update(block_pending=False)
+            if blocked:
+                SlotEventLog.record(blocked, SlotEvent.UNBLOCK, at=now, using=using)
+        return len(blocked)
@@ -0,0 +1,104 @@
+"""Find and free slots marked unavailable with no open ticket on them.
+
+A slot is claimed and its ticket created in one transaction
+(`TicketService.open`), but older code paths, crashed workers and manual
+edits can still leave a slot taken with nobody parked in it. Such leaked
+slots shrink capacity silently until they are reclaimed here.
+"""
+
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Subquery
+from django.utils import timezone
+
+from parking.metrics import REGISTRY
+from parking.models import Slot, SlotEvent, Ticket
+from services.slot_events import SlotEventLog
+from services.slot_maintenance import settle_pending_blocks
+
+logger = logging.getLogger(__name__)
+
+LEAKED_SLOTS = REGISTRY.gauge(
+    "parking_leaked_slots", "Unavailable slots with no open ticket, per database."
+)
+RECLAIMED_SLOTS = REGISTRY.counter(
+    "parking_reclaimed_slots_total", "Leaked slots freed by the reconciler."
+)
+
+
+def leaked_slots(using="default"):
+    """Unavailable slots with no open ticket, found with one anti-join.
+
+    Each slot is annotated with `since`, the time of its latest logged
+    event, or None if no event was ever logged for it.
+    """
+    open_tickets = Ticket.objects.filter(slot=OuterRef("pk"), check_out__isnull=True)
+    latest_event = SlotEvent.objects.filter(slot_id=OuterRef("pk")).order_by("-at")
+    return (
+        Slot.objects.using(using)
+        .filter(is_available=False)
+        .filter(~Exists(open_tickets))
+        .annotate(since=Subquery(latest_event.values("at")[:1]))
+    )
+
+
+class SlotReconciler:
+    @staticmethod
+    def observe(using="default", max_age=0):
+        """Refresh the leaked-slots gauge of `using`; returns the count.
+
+        With `max_age`, a count taken by any worker in the last `max_age`
+        seconds is read from the shared cache instead of counted again.
+        """
+        key = f"leaked_slots:{using}"
+        count = caches["shared"].get(key) if max_age else None
+        if count is None:
+            count = leaked_slots(using).count()
+            if max_age:
+                caches["shared"].set(key, count, max_age)
+        LEAKED_SLOTS.set(count, database=using)
+        return count
+
+    @staticmethod
+    def reclaim(using="default", grace_seconds=None, include_untracked=False, now=None):
+        """Free leaked slots that have been taken for longer than the grace period.
+
+        Slots without any logged event (taken before the event log existed,
+        or by hand in the admin) are only freed with `include_untracked`.
+        Returns `(leaked, freed_ids)`.
+        """
+        if grace_seconds is None:
+            grace_seconds = settings.SLOT_LEAK_GRACE_SECONDS
+        cutoff = (now or timezone.now()) - timedelta(seconds=grace_seconds)
+        leaked = list(leaked_slots(using))
+        LEAKED_SLOTS.set(len(leaked), database=using)
+        candidates = [
+            slot.id
+            for slot in leaked
+            if (slot.since is None and include_untracked)
+            or (slot.since is not None and slot.since < cutoff)
+        ]
+        if not candidates:
+            return len(leaked), []
+
+        with transaction.atomic(using=using):
+            # Re-check under the row locks: a ticket may have been opened since.
+            freed = list(
+                leaked_slots(using)
+                .select_for_update()
+                .filter(id__in=candidates)
+                .values_list("id", flat=True)
+            )
+            Slot.objects.using(using).filter(id__in=freed).update(is_available=True)
+            SlotEventLog.record(freed, SlotEvent.RELEASE, using=using)
+            settle_pending_blocks(freed, using=using)
+
+        RECLAIMED_SLOTS.inc(len(freed), database=using)
+        caches["shared"].delete(f"leaked_slots:{using}")
+        for slot_id in freed:
+            logger.warning("Reclaimed leaked slot %s on %s.", slot_id, using)
+        return len(leaked), freed
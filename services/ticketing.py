@@ -0,0 +1,77 @@
+from django.db import router, transaction
+from django.utils import timezone
+
+from parking.metrics import REGISTRY
+from parking.models import Slot, SlotEvent, Ticket
+from services.billing import BillingService
+from services.slot_allocator import SlotAllocator
+from services.slot_events import SlotEventLog
+from services.slot_maintenance import settle_pending_blocks
+
+FAILED_OPENS = REGISTRY.counter(
+    "parking_ticket_open_failures_total",
+    "Ticket openings that failed and were rolled back.",
+)
+
+
+class TicketService:
+    @staticmethod
+    def open(vehicle_type, floor, section, strategy=None, **details):
+        """Claim a slot and open a ticket on it in one transaction.
+
+        `details` are the remaining `Ticket` fields (vehicle_number, phone,
+        ...). If creating the ticket fails, the claim is rolled back with it
+        rather than leaving the slot taken by nobody. Returns None when no
+        slot is free.
+        """
+        try:
+            with transaction.atomic(using=router.db_for_write(Slot)):
+                slot = SlotAllocator.allocate(
+                    vehicle_type, floor, section, strategy=strategy
+                )
+                if not slot:
+                    return None
+                return Ticket.objects.create(
+                    vehicle_type=vehicle_type, slot=slot, **details
+                )
+        except Exception:
+            FAILED_OPENS.inc(vehicle_type=vehicle_type)
+            raise
+
+    @staticmethod
+    def check_out(ticket, now=None):
+        """Close an open ticket: bill it and free its slot, blocking the slot
+        instead if maintenance is waiting for it.
+
+        Returns `(total, refund, due, hours)` from `BillingService.calculate`,
+        or None if the ticket was already closed, e.g. by a concurrent
+        checkout; its slot is then left alone.
+        """
+        using = router.db_for_write(Ticket, instance=ticket)
+        check_out = now or timezone.now()
+        with transaction.atomic(using=using):
+            total, refund, due, hours = BillingService.calculate(ticket, now=check_out)
+            closed = (
+                Ticket.objects.using(using)
+                .filter(pk=ticket.pk, check_out__isnull=True)
+                .update(check_out=check_out, final_amount=total)
+            )
+            if not closed:
+                return None
+            ticket.check_out = check_out
+            ticket.final_amount = total
+
+            if ticket.slot:
+                ticket.slot.is_available = True
+                ticket.slot.save(update_fields=["is_available"])
+                SlotEventLog.record(
+                    [ticket.slot_id],
+                    SlotEvent.RELEASE,
+                    at=check_out,
+                    using=ticket.slot._state.db,
+                )
+                settle_pending_blocks(
+                    [ticket.slot_id], using=ticket.slot._state.db, at=check_out
+                )
+
+        return total, refund, due, hours
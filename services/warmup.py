@@ -0,0 +1,62 @@
+"""Warm-up for web workers.
+
+ReportLab, qrcode and PIL are imported lazily so management commands and
+other non-web processes do not pay for them. Web workers call `warm_up()`
+from wsgi.py/asgi.py instead, so the first booking a worker serves is not
+slowed down by imports, font loading and template compilation, and the
+render pool's processes are started. With `gunicorn --preload` this runs
+once in the master, before forking; each worker then starts its own render
+pool on first use.
+"""
+
+import logging
+import time
+
+from django.conf import settings
+from django.template.loader import get_template
+
+from services.render_pool import get_render_pool
+
+logger = logging.getLogger(__name__)
+
+PDF_FONTS = ("Helvetica", "Helvetica-Bold", "Helvetica-Oblique")
+TEMPLATES = (
+    "slots.html",
+    "vehicle_form.html",
+    "token_success.html",
+    "bill.html",
+    "checkout.html",
+)
+
+
+def preload_render_libraries():
+    """Import ReportLab, qrcode and PIL and load the PDF fonts.
+
+    Also the initializer of the render pool's worker processes.
+    """
+    from reportlab.pdfbase import pdfmetrics
+    from reportlab.pdfgen import canvas  # noqa: F401
+
+    from services.qr_generator import render_qr_png
+
+    for font in PDF_FONTS:
+        pdfmetrics.getFont(font)
+    # Imports qrcode and PIL's PNG encoder; bypasses the QR cache
+    render_qr_png("warm-up")
+
+
+def warm_up():
+    if not settings.WEB_WARM_UP:
+        return
+    start = time.perf_counter()
+
+    preload_render_libraries()
+    import numpy  # noqa: F401  (occupancy forecasts on slot pages)
+
+    for name in TEMPLATES:
+        get_template(name)
+    get_render_pool().start()
+
+    logger.info(
+        "Web worker warmed up in %.0f ms.", (time.perf_counter() - start) * 1000
+    )